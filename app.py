@@ -1,12 +1,12 @@
 import streamlit as st
-import pypdf
+import logging
 import os
-import re
 from datetime import datetime
-from openai import OpenAI
-import hashlib
 import sys
-import unicodedata
+import time
+
+# Duração de cada execução do script (o Streamlit roda o arquivo inteiro a cada clique)
+inicio_rerun = time.perf_counter()
 
 #Configuração da página
 st.set_page_config(
@@ -224,102 +224,80 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Adiciona o diretório atual ao path para importações
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-def carregar_configuracoes():
-    config = {
-        "api_key": "",
-        "modelo": "gpt-4o-mini",
-        "max_tokens": 800
-    }
-
-    # Tenta o Streamlit Secrets
-    try:
-        if "OPENAI_API_KEY" in st.secrets:
-            chave = st.secrets["OPENAI_API_KEY"]
-            if chave and chave.strip():
-                config["api_key"] = chave.strip()
-                print("DEBUG: Chave carregada via st.secrets")
-                return config
-    except Exception as e:
-        print(f"DEBUG: Erro lendo st.secrets: {e}")
+# Adiciona o diretório atual ao path para importações (uma vez: o script roda de novo a cada clique)
+diretorio_app = os.path.dirname(os.path.abspath(__file__))
+if diretorio_app not in sys.path:
+    sys.path.append(diretorio_app)
 
-    # Tenta variável de ambiente 
-    chave_env = os.environ.get("OPENAI_API_KEY")
-    if chave_env and chave_env.strip():
-        config["api_key"] = chave_env.strip()
-        print("DEBUG: Chave carregada do ambiente")
-        return config
+from clientes_openai import obter_cliente, status_chave
+from cache_buscas import obter_cache_buscas
+from cache_respostas import obter_cache_respostas
+from busca import MODO_PADRAO, MODOS_BUSCA, extrair_contexto_para_ia
+from inicializacao import invalidar_inicializacao, obter_inicializacao, sugerir_buscas
+from metricas import observar, resumo, texto_prometheus, total_contador
+from sessoes import TRECHO_INDISPONIVEL, compactar_resultados, registrar_sessao, relatorio_memoria, resolver_resultados
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
-    # Tenta tb de arquivos .env em locais comuns
-    locais_arquivos = [
-        ".env",
-        "api_key.env",
-        os.path.join(os.path.dirname(__file__), ".env"),
-        os.path.join(os.path.dirname(__file__), "api_key.env"),
-        "config/.env", 
-        ".env.local",
-    ]
-    
-    for arquivo in locais_arquivos:
-        if os.path.exists(arquivo):
-            try:
-                print(f"Tentando carregar de: {arquivo}")
-                with open(arquivo, "r", encoding="utf-8") as f:
-                    for linha in f:
-                        linha = linha.strip()
-                        if linha.startswith("#") or not linha:
-                            continue
-                        if linha.startswith("OPENAI_API_KEY="):
-                            config["api_key"] = linha.split("=", 1)[1].strip().strip('"').strip("'")
-                            print(f"Chave encontrada em {arquivo}, comprimento: {len(config['api_key'])}")
-                        elif linha.startswith("MODEL="):
-                            config["modelo"] = linha.split("=", 1)[1].strip().strip('"').strip("'")
-            except Exception as e:
-                print(f"Erro ao ler {arquivo}: {e}")
-                continue
-    
-    return config
+log = logging.getLogger("gambot.app")
 
-# Carrega as configs iniciais
-CONFIG_INICIAL = carregar_configuracoes()
-print(f"DEBUG: Config carregada - Chave: {bool(CONFIG_INICIAL['api_key'])}, Modelo: {CONFIG_INICIAL['modelo']}")
+# Configuração, observador, pré-aquecimento e motor: montados na primeira execução do processo
+inicializacao = obter_inicializacao("data", st.secrets)
+CONFIG_INICIAL = inicializacao["config"]
+observador = inicializacao["observador"]
+motor = inicializacao["motor"]
 
 # Funções principais
 def inicializar_openai(api_key):
-    """Inicializa o cliente da OpenAI de forma segura."""
+    """
+    Retorna o cliente da OpenAI compartilhado pelo processo para essa chave.
+    A conexão é reaproveitada entre perguntas e a chave só é validada quando muda.
+    """
     if not api_key or not api_key.strip():
-        print("DEBUG: API Key vazia ou apenas espaços.")
+        log.debug("API Key vazia ou apenas espaços.")
         return None
     
     try:
-        # remove possíveis espaços ou caracteres extras
-        chave_limpa = api_key.strip()
-        
-        # verifica se a chave parece válida
-        if not chave_limpa.startswith("sk-"):
-            # Tenta extrair a chave se estiver em texto maior
-            match = re.search(r'sk-[a-zA-Z0-9]{20,}', chave_limpa)
-            if match:
-                chave_limpa = match.group(0)
-            else:
-                return None
-        
-        # Inicializa o cliente
-        client = OpenAI(api_key=chave_limpa)
-        
-        # Testa a conexão com uma chamada teste
-        try:
-            client.models.list(timeout=5)
-        except Exception as test_e:
-            print(f"DEBUG: Aviso no teste de conexão: {test_e}")
-        
-        return client
+        return obter_cliente(api_key)
     except Exception as e:
-        print(f"Erro ao inicializar OpenAI: {type(e).__name__}: {str(e)}")
+        log.error("Erro ao inicializar OpenAI: %s: %s", type(e).__name__, e)
         return None
 
+def mostrar_trechos(resultados, expandido=True):
+    """Trechos encontrados agrupados por documento (até 5 por documento)."""
+    arquivos_agrupados = {}
+    for resultado in resultados:
+        arquivo = resultado['arquivo']
+        if arquivo not in arquivos_agrupados:
+            arquivos_agrupados[arquivo] = []
+        arquivos_agrupados[arquivo].append(resultado)
+    
+    for arquivo, ocorrencias in arquivos_agrupados.items():
+        with st.expander(f"📄 **{arquivo}** ({len(ocorrencias)} ocorrência(s))", expanded=expandido):
+            for i, ocorrencia in enumerate(ocorrencias[:5], 1):
+                rotulo = f" · {ocorrencia['rotulo']}" if ocorrencia.get('rotulo') else ""
+                st.markdown(f"**Página {ocorrencia['pagina']}{rotulo}**")
+                # Apenas o trecho curto visual, não a página inteira
+                st.markdown(ocorrencia['contexto'], unsafe_allow_html=True)
+                st.caption(f"Tipo: {ocorrencia['tipo']}")
+                if i < len(ocorrencias[:5]):
+                    st.divider()
+
+def buscar_mostrando_parciais(pergunta, modo):
+    """
+    Busca pelo motor. Se os documentos ainda estão sendo indexados, mostra
+    resultados provisórios conforme cada documento é lido e retorna a busca final.
+    """
+    area_parcial = st.empty()
+    busca = None
+    for busca in motor.buscar_progressivo(pergunta, modo):
+        if busca["parcial"]:
+            with area_parcial.container():
+                st.info(f"⏳ Resultados provisórios: {busca['documentos']} de {busca['total']} documento(s) lidos. "
+                        "A lista é atualizada conforme a indexação avança.")
+                mostrar_trechos(busca["resultados"])
+    area_parcial.empty()
+    return busca
+
 # Inicialização do estado da sessão
 if "contador_buscas" not in st.session_state:
     st.session_state.contador_buscas = 0
@@ -333,8 +311,6 @@ if "resultados" not in st.session_state:
     st.session_state.resultados = []
 if "resposta_ia" not in st.session_state:
     st.session_state.resposta_ia = ""
-if "contexto_ia" not in st.session_state:
-    st.session_state.contexto_ia = ""
 if "mostrar_fontes" not in st.session_state:
     st.session_state.mostrar_fontes = False
 if "faq_clicada" not in st.session_state:
@@ -342,17 +318,8 @@ if "faq_clicada" not in st.session_state:
 if "openai_api_key" not in st.session_state:
     st.session_state.openai_api_key = ""
 
-# Verificação dos PDFs
-# Verifica se a pasta data existe
-if not os.path.exists("data"):
-    os.makedirs("data")
-    print("Pasta 'data' criada")
-
-# Lista PDFs
-pdfs = []
-if os.path.exists("data"):
-    pdfs = [f for f in os.listdir("data") if f.lower().endswith(".pdf")]
-    print(f"DEBUG: {len(pdfs)} PDF(s) encontrado(s): {pdfs}")
+# Lista PDFs (última verificação do observador, sem listar a pasta a cada rerun)
+pdfs = observador.arquivos
 
 # Sidebar com as configs
 with st.sidebar:
@@ -430,6 +397,12 @@ with st.sidebar:
             st.session_state.openai_api_key = ""
             st.warning("API Key não configurada")
     
+    # Cria o cliente assim que a chave muda; a validação roda uma vez em segundo plano
+    if st.session_state.openai_api_key:
+        inicializar_openai(st.session_state.openai_api_key)
+        if (status_chave(st.session_state.openai_api_key) or "").startswith("falhou"):
+            st.caption("⚠️ Não foi possível validar a chave com a OpenAI")
+    
     # Ativar/Desativar IA
     usar_ia = st.checkbox(
         "Usar IA (ChatGPT)",
@@ -438,6 +411,16 @@ with st.sidebar:
         key="usar_ia_checkbox"
     )
     
+    # Modo de recuperação dos trechos
+    rotulo_modo = st.radio(
+        "Modo de busca:",
+        list(MODOS_BUSCA.values()),
+        index=list(MODOS_BUSCA).index(MODO_PADRAO),
+        help="Palavras-chave (BM25), similaridade vetorial local ou a fusão dos dois",
+        key="modo_busca_radio"
+    )
+    modo_busca = next(m for m, rotulo in MODOS_BUSCA.items() if rotulo == rotulo_modo)
+    
     st.divider()
     
     # Status do sistema
@@ -446,18 +429,26 @@ with st.sidebar:
     if pdfs:
         st.success(f"✅ {len(pdfs)} PDF(s) carregado(s)")
         for pdf in pdfs[:5]:
-            try:
-                caminho_pdf = os.path.join("data", pdf)
-                tamanho = os.path.getsize(caminho_pdf) / 1024
-                st.write(f"• **{pdf}** ({tamanho:.1f} KB)")
-            except:
-                st.write(f"• **{pdf}**")
+            tamanho = observador.foto_atual.get(pdf, (0, 0))[0] / 1024
+            st.write(f"• **{pdf}** ({tamanho:.1f} KB)")
         if len(pdfs) > 5:
             st.write(f"... e mais {len(pdfs) - 5} arquivo(s)")
     else:
         st.error("❌ Nenhum PDF na pasta 'data'")
         st.info("Copie seus PDFs para a pasta 'data'")
     
+    # Progresso da indexação (feita em segundo plano)
+    progresso = observador.progresso
+    if progresso["indexando"] or not observador.pronto:
+        fracao = progresso["concluido"] / progresso["total"] if progresso["total"] else 0.0
+        st.progress(fracao, text=f"Indexando documentos... {progresso['mensagem']}")
+        if st.button("Atualizar status", key="atualizar_status_indexacao"):
+            st.rerun()
+    elif progresso["mensagem"]:
+        st.caption(f"Índice: {progresso['mensagem']}")
+    if progresso["erro"]:
+        st.error(f"Erro na indexação: {progresso['erro']}")
+    
     st.divider()
     
     # Contador de buscas
@@ -467,272 +458,92 @@ with st.sidebar:
     with col_status2:
         st.metric("IA", st.session_state.contador_ia)
     
+    # Cache de respostas da IA (compartilhado por todas as sessões)
+    metricas_cache = obter_cache_respostas().metricas()
+    if metricas_cache["acertos"] + metricas_cache["falhas"]:
+        st.caption(
+            f"Cache de respostas: {metricas_cache['taxa_acerto']:.0%} de acertos "
+            f"({metricas_cache['acertos']}/{metricas_cache['acertos'] + metricas_cache['falhas']}), "
+            f"{metricas_cache['segundos_economizados']:.1f}s economizados"
+        )
+    metricas_buscas = obter_cache_buscas().metricas()
+    if metricas_buscas["acertos"] + metricas_buscas["falhas"]:
+        st.caption(
+            f"Cache de buscas: {metricas_buscas['taxa_acerto']:.0%} de acertos "
+            f"({metricas_buscas['acertos']}/{metricas_buscas['acertos'] + metricas_buscas['falhas']}), "
+            f"{metricas_buscas['entradas']} busca(s) guardada(s)"
+        )
+    
     st.caption(f"🕒 {datetime.now().strftime('%H:%M:%S')}")
     
+    # Painel de desempenho: tempos por etapa somando todas as sessões do processo
+    with st.expander("📈 Desempenho (admin)"):
+        # Tabelas e exportação só são montadas com o painel ligado (o expander roda o código mesmo fechado)
+        if st.toggle("Mostrar métricas", key="mostrar_desempenho"):
+            etapas = resumo()["etapas"]
+            if etapas:
+                st.dataframe(
+                    [{
+                        "Etapa": e["etapa"] + "".join(f" {v}" for v in e["rotulos"].values()),
+                        "N": e["total"],
+                        "p50 (ms)": round(e["p50"], 1),
+                        "p95 (ms)": round(e["p95"], 1),
+                        "Máx (ms)": round(e["max"], 1),
+                    } for e in etapas],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+            else:
+                st.caption("Nenhuma etapa medida ainda.")
+            st.caption(
+                f"Buscas: {total_contador('buscas')} · "
+                f"Respostas IA: {total_contador('respostas_ia', origem='openai')} "
+                f"(+{total_contador('respostas_ia', origem='cache')} do cache) · "
+                f"Tokens: {total_contador('tokens', tipo='entrada')} entrada / {total_contador('tokens', tipo='saida')} saída"
+            )
+            # Memória: estado de cada sessão e o armazém de trechos que elas compartilham
+            memoria = relatorio_memoria()
+            armazem = memoria["armazem"]
+            st.caption(
+                f"Memória das sessões: {memoria['total_sessoes'] / 1024:.1f} KB em {len(memoria['sessoes'])} sessão(ões) · "
+                f"Trechos compartilhados: {armazem['trechos']} ({armazem['bytes'] / 1024:.1f} de "
+                f"{armazem['limite_bytes'] / 1024 / 1024:.0f} MB)"
+            )
+            if memoria["sessoes"]:
+                st.dataframe(
+                    [{
+                        "Sessão": s["sessao"][:8],
+                        "KB": round(s["bytes"] / 1024, 1),
+                        "Maiores chaves": ", ".join(f"{k} ({b / 1024:.1f} KB)" for k, b in s["chaves"]),
+                        "Parada (s)": round(s["segundos_parada"]),
+                    } for s in memoria["sessoes"][:20]],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+            st.download_button(
+                "Baixar métricas (Prometheus)",
+                texto_prometheus(),
+                file_name="gambot_metricas.prom",
+                mime="text/plain",
+                key="baixar_metricas",
+            )
+            if st.button("Recarregar configuração", key="recarregar_configuracao",
+                         help="Relê a chave, o modelo e as opções do .env sem reiniciar o app"):
+                invalidar_inicializacao()
+                st.rerun()
+    
     st.divider()
     
     # FAQ
     st.header("Perguntas Frequentes")
     
-    faq_perguntas = {
-        "Calendário Acadêmico": "Como funciona o calendário acadêmico da UFPA?",
-        "Carga Horária": "Qual é a carga horária total do curso?",
-        "Disciplinas": "Quais são as disciplinas obrigatórias?",
-        "Trancamento": "Como faço para trancar a matrícula?",
-        "Matrícula": "Quais são os procedimentos para matrícula?",
-        "TCC": "Como funciona o Trabalho de Conclusão de Curso?",
-        "Regulamento": "Onde encontro o regulamento completo?",
-        "Estrutura": "Qual é a estrutura do curso?",
-        "Professores": "Como contatar os professores?",
-        "Avaliação": "Como são as avaliações e frequência?",
-        "Transferência": "Como solicitar transferência de curso?",
-        "Diploma": "Como solicitar segunda via do diploma?",
-        "Bolsas": "Existem bolsas de estudo disponíveis?",
-        "Campus": "Quais são os campi da UFPA?"
-    }
-    
-    for pergunta_faq, texto in faq_perguntas.items():
-        if st.button(pergunta_faq, key=f"faq_{hashlib.md5(pergunta_faq.encode()).hexdigest()[:8]}"):
+    for pergunta_faq, texto, chave_botao in inicializacao["faq"]:
+        if st.button(pergunta_faq, key=chave_botao):
             st.session_state.pergunta_manual = texto
             st.session_state.usar_ia_pergunta = True
             st.session_state.faq_clicada = True
             st.rerun()
 
-# Dicionário de sinônimos
-SINONIMOS = {
-    "carga horária": ["CH", "horas", "h", "carga", "horária"],
-    "disciplina": ["matéria", "componente curricular", "curso"],
-    "obrigatória": ["compulsória", "mandatória", "obrigatório"],
-    "trancamento": ["cancelamento", "suspensão", "interrupção"],
-    "matrícula": ["inscrição", "registro", "cadastro"],
-    "regulamento": ["norma", "regra", "resolução", "estatuto"],
-    "curso": ["graduação", "bacharelado", "licenciatura"],
-    "aluno": ["discente", "estudante"],
-    "professor": ["docente", "ensinante"],
-    "coordenador": ["coordenador de curso", "diretor de curso"],
-    "nota": ["conceito", "avaliação", "pontuação"],
-    "frequência": ["presença", "assiduidade"],
-    "aprovação": ["aprovado", "passou"],
-    "reprovação": ["reprovado", "não passou"],
-    "exame": ["prova", "teste", "avaliação"],
-    "calendário": ["cronograma", "agenda", "datas"],
-    "biblioteca": ["acervo", "coleção", "livros"],
-    "laboratório": ["lab", "experimental", "prática"],
-    "estágio": ["prática profissional", "experiência profissional"],
-    "tcc": ["trabalho de conclusão de curso", "monografia", "projeto final"],
-    "graduação": ["formação", "curso superior"],
-    "mestrado": ["pós-graduação", "mestrado acadêmico", "mestrado profissional"],
-    "doutorado": ["pós-graduação", "doutorado acadêmico", "doutorado profissional"],
-    "pesquisa": ["investigação", "estudo", "projeto de pesquisa"],
-    "extensão": ["projeto de extensão", "ação comunitária", "serviço à comunidade"],
-    "monitoria": ["auxílio docente", "assistência de ensino"],
-    "bolsa": ["auxílio financeiro", "financiamento", "subsídio"],
-    "edital": ["chamada", "convocação", "seleção"],
-    "processo seletivo": ["vestibular", "concurso", "seleção"],
-    "transferência": ["mudança de curso", "troca de curso", "mobilidade"],
-    "diploma": ["certificado", "certificação", "título"],
-    "histórico": ["registro acadêmico", "boletim", "notas"],
-    "secretaria": ["setor administrativo", "administração acadêmica"],
-    "coordenação": ["direção", "gerência", "administração"],
-    "reitoria": ["administração superior", "gestão universitária"],
-    "campus": ["unidade", "polo", "sede"],
-    "ativo": ["regular", "matriculado", "frequentando"],
-    "trancado": ["suspenso", "interrompido", "cancelado"],
-    "formado": ["egresso", "graduado", "diplomado"],
-    "evasão": ["abandono", "desistência", "saída"],
-    "período": ["semestre", "fase", "etapa", "nível", "periodo"],
-    "jubilamento": ["desligamento", "expulsão", "eliminação", "cancelamento de matrícula"],
-    "trancamento de matrícula": ["trancar matrícula", "suspender matrícula", "cancelar matrícula temporariamente"],
-    "histórico escolar": ["boletim", "registro acadêmico", "notas", "histórico acadêmico"],
-    "prazo": ["período", "tempo", "data limite", "vencimento", "limite"],
-    "solicitar": ["pedir", "requerer", "requisitar", "obter", "conseguir"],
-    "componente curricular": ["disciplina", "matéria", "curso", "unidade curricular"],
-    "artigo": ["art.", "art", "artigo"],
-    "parágrafo": ["§", "parágrafo único", "paragrafo"],
-    "inciso": ["inc.", "inciso", "item"],
-    "resolução": ["norma", "regra", "decisão", "deliberação"]
-}
-
-# Funções de busca
-def normalizar_texto(texto):
-    """Remove acentos e coloca em minúsculas para comparação."""
-    if not texto: return ""
-    return unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII').lower()
-
-def buscar_inteligente(pergunta_usuario):
-    """
-    Busca por ranking: pontua as páginas que contêm mais termos da pergunta.
-    Substitui a lógica sequencial antiga.
-    """
-    if not pergunta_usuario:
-        return []
-    
-    print(f"DEBUG: Iniciando busca por ranking para: '{pergunta_usuario}'")
-    
-    # Preparar os termos de busca
-    termos_busca = set()
-    palavras_irrelevantes = {"quais", "qual", "como", "quando", "onde", "porque", "que", "para", "com", "dos", "das", "pelo", "pela", "estou", "quero", "saber"}
-    palavras = pergunta_usuario.lower().split()
-    
-    for palavra in palavras:
-        limpa = re.sub(r'[^\w]', '', palavra)
-        if len(limpa) > 2 and limpa not in palavras_irrelevantes:
-            termos_busca.add(limpa)
-            if limpa in SINONIMOS:
-                for sin in SINONIMOS[limpa][:2]: # Top 2 sinônimos
-                    termos_busca.add(sin)
-    
-    #confia nos sinônimos
-    print(f"DEBUG: Termos considerados: {termos_busca}")
-    
-    # Varrer PDFs e pontuar
-    melhores_paginas = []
-    
-    if not pdfs: return []
-        
-    for pdf in pdfs:
-        caminho = os.path.join("data", pdf)
-        try:
-            with open(caminho, "rb") as f:
-                reader = pypdf.PdfReader(f)
-                
-                for i, page in enumerate(reader.pages):
-                    texto_pagina = page.extract_text()
-                    if not texto_pagina: continue
-                    
-                    texto_pagina_norm = normalizar_texto(texto_pagina)
-                    pontos = 0
-                    termos_encontrados_na_pagina = []
-                    
-                    # Sistema de Pontuação
-                    for termo in termos_busca:
-                        termo_norm = normalizar_texto(termo)
-                        if termo_norm in texto_pagina_norm:
-                            pontos += 1
-                            termos_encontrados_na_pagina.append(termo)
-                            # Densidade
-                            if texto_pagina_norm.count(termo_norm) > 2:
-                                pontos += 0.5
-                    
-                    if pontos > 0:
-                        # Baseado no primeiro termo encontrado
-                        termo_visual = termos_encontrados_na_pagina[0] if termos_encontrados_na_pagina else ""
-                        pos = texto_pagina.lower().find(termo_visual.lower()) if termo_visual else 0
-                        inicio = max(0, pos - 150)
-                        fim = min(len(texto_pagina), pos + 150)
-                        trecho = texto_pagina[inicio:fim].replace("\n", " ")
-                        
-                        melhores_paginas.append({
-                            "arquivo": pdf,
-                            "pagina": i + 1,
-                            "pontos": pontos,
-                            "termos_encontrados": termos_encontrados_na_pagina,
-                            "texto_para_ia": texto_pagina, # Página completa para IA
-                            "contexto": f"...{trecho}...", # Visual curto
-                            "tipo": f"Relevância: {pontos:.1f}"
-                        })
-                        
-        except Exception as e:
-            print(f"Erro ao ler {pdf}: {e}")
-            
-    # Ordenar e retornar TOP 10
-    melhores_paginas.sort(key=lambda x: x['pontos'], reverse=True)
-    top_resultados = melhores_paginas[:10]
-    
-    print(f"DEBUG: Retornando top {len(top_resultados)} páginas de {len(melhores_paginas)} encontradas.")
-    return top_resultados
-
-# IA
-def extrair_contexto_para_ia(resultados, max_tokens=12000):
-    """
-    Extrai contexto enviando páginas completas para a IA e remove duplicatas.
-    """
-    if not resultados:
-        return "Nenhum documento relevante encontrado."
-    
-    # um SET para evitar páginas duplicadas se multiplos termos cairem na mesma página
-    paginas_processadas = set()
-    contextos = []
-    tokens_estimados = 0
-    
-    # Ordenar resultados (já vêm ordenados por pontuação do buscar_inteligente, mas mantemos lógica)
-    for resultado in resultados:
-        chave_unica = (resultado['arquivo'], resultado['pagina'])
-        
-        # Se já foi essa página para a IA neste prompt, pula
-        if chave_unica in paginas_processadas:
-            continue
-            
-        paginas_processadas.add(chave_unica)
-        
-        # Pega o texto COMPLETO da página
-        texto_pagina = resultado.get("texto_para_ia", resultado.get("contexto", ""))
-        
-        # Limpeza (remove tags HTML no visual)
-        texto_limpo = re.sub(r'<[^>]+>', '', texto_pagina)
-        texto_limpo = re.sub(r'\s+', ' ', texto_limpo).strip()
-        
-        cabecalho = f"\n--- [Documento: {resultado['arquivo']} | Página: {resultado['pagina']}] ---\n"
-        bloco_completo = cabecalho + texto_limpo
-        
-        # Estimativa simples de tokens
-        tokens_bloco = len(bloco_completo) / 3.5
-        
-        if tokens_estimados + tokens_bloco <= max_tokens:
-            contextos.append(bloco_completo)
-            tokens_estimados += tokens_bloco
-        else:
-            print(f"DEBUG: Limite de tokens atingido ({int(tokens_estimados)}).")
-            break
-    
-    print(f"DEBUG: Contexto gerado com aprox. {int(tokens_estimados)} tokens de {len(paginas_processadas)} páginas únicas.")
-    return "\n".join(contextos)
-
-def gerar_resposta_ia(pergunta, contexto, cliente_openai):
-    """Gera resposta usando a OpenAI API."""
-    if not cliente_openai:
-        return None, "API Key não configurada ou inválida."
-    
-    try:
-        sistema_prompt = """Você é o Gambot, um assistente virtual especializado em regulamentos e 
-        procedimentos da Universidade Federal do Pará (UFPA).
-        
-        SUA MISSÃO:
-        Responder dúvidas acadêmicas baseando-se ESTRITAMENTE nos documentos fornecidos no contexto.
-        
-        REGRAS:
-        1. Contexto é a Verdade: Use APENAS o texto fornecido abaixo.
-        2. Citação Obrigatória: Para CADA afirmação, cite a fonte (Ex: "Segundo o Regulamento, Art. 15...").
-        3. Honestidade Intelectual: Se a resposta não estiver EXPLICITAMENTE no contexto, diga: "Não encontrei essa informação específica nos documentos fornecidos". NÃO invente. Se a resposta puder ser inferida claramente a partir do texto (ex: datas, prazos implícitos), explique a inferência e cite o trecho usado.
-        4. Clareza: Responda de forma direta, organizada (use tópicos se necessário) e em tom profissional/acadêmico.
-        
-        Contexto dos documentos (Páginas extraídas dos PDFs):
-        {contexto}
-        """
-        
-        prompt_usuario = f"""Pergunta do usuário: {pergunta}
-
-        Com base APENAS no contexto acima, responda à pergunta. Cite artigos, parágrafos e páginas sempre que possível."""
-        
-        response = cliente_openai.chat.completions.create(
-            model=CONFIG_INICIAL["modelo"],
-            messages=[
-                {"role": "system", "content": sistema_prompt.format(contexto=contexto)},
-                {"role": "user", "content": prompt_usuario}
-            ],
-            temperature=0.3,
-            max_tokens=CONFIG_INICIAL["max_tokens"],
-        )
-        
-        resposta = response.choices[0].message.content
-        return resposta, None
-        
-    except Exception as e:
-        error_type = type(e).__name__
-        error_msg = str(e)
-        print(f"DEBUG: Erro na API OpenAI - Tipo: {error_type}, Mensagem: {error_msg}")
-        return None, f"Erro na API da OpenAI ({error_type}): {error_msg[:200]}"
-
 # Layout principal
 st.markdown("<h1 style='text-align: center; font-family: Arial, sans-serif; color: #011627;'>GAMBOT</h1>", unsafe_allow_html=True)
 st.markdown("<h3 style='text-align: center; color: #6BA368;'>Assistente Acadêmico Inteligente</h3>", unsafe_allow_html=True)
@@ -785,7 +596,6 @@ with col_esquerda:
         st.session_state.resultados = []
         st.session_state.resposta_ia = ""
         st.session_state.pergunta_manual = ""
-        st.session_state.contexto_ia = ""
         st.session_state.usar_ia_pergunta = False
         st.session_state.mostrar_fontes = False
         st.session_state.faq_clicada = False
@@ -832,46 +642,60 @@ if buscar_tradicional and pergunta:
     st.session_state.pergunta_manual = pergunta
     st.session_state.usar_ia_pergunta = False
     
+    # Enquanto o primeiro índice não fica pronto, mostra resultados provisórios
     with st.spinner("Buscando nos documentos..."):
-        resultados_inteligente = buscar_inteligente(pergunta)
-        
-        st.session_state.resultados = resultados_inteligente
+        # A sessão guarda só registros compactos; os textos ficam no armazém compartilhado
+        busca = buscar_mostrando_parciais(pergunta, modo_busca)
+        st.session_state.resultados = compactar_resultados(busca["resultados"], busca["versao"])
         st.session_state.resposta_ia = ""
 
 # Busca com IA
 elif buscar_com_ia and pergunta and chave_disponivel and usar_ia:
-    print(f"DEBUG: chave_atual no momento da busca com IA: {st.session_state.openai_api_key[:15]}...")
     st.session_state.contador_buscas += 1
     st.session_state.contador_ia += 1
     st.session_state.pergunta_manual = pergunta
     st.session_state.usar_ia_pergunta = True
     
     with st.spinner("Buscando e analisando com IA..."):
-        # Busca os trechos/páginas relevantes
-        resultados_inteligente = buscar_inteligente(pergunta)
-        st.session_state.resultados = resultados_inteligente
-        
-        # Prepara o contexto
-        contexto = extrair_contexto_para_ia(resultados_inteligente)
-        st.session_state.contexto_ia = contexto
-        
-        # Chama a OpenAI
-        cliente = inicializar_openai(st.session_state.openai_api_key)
-        if cliente:
-            resposta, erro = gerar_resposta_ia(pergunta, contexto, cliente)
-            if erro:
-                st.error(erro)
-                st.session_state.resposta_ia = f"**Erro:** {erro}"
-            else:
-                st.session_state.resposta_ia = resposta
-        else:
-            st.session_state.resposta_ia = "**Erro:** Não foi possível conectar à OpenAI. Verifique sua API Key."
+        # Perguntas frequentes já vêm com busca e contexto prontos
+        busca = buscar_mostrando_parciais(pergunta, modo_busca)
+        st.session_state.resultados = compactar_resultados(busca["resultados"], busca["versao"])
+    
+    # Respostas já geradas para a mesma pergunta (ou equivalente) e o mesmo contexto vêm do cache
+    if CONFIG_INICIAL["streaming"]:
+        # Mostra o texto conforme chega; ao final a área normal de resposta assume
+        area_streaming = st.empty()
+        
+        def mostrar_parcial(texto):
+            with area_streaming.container():
+                st.subheader("Resposta do Gambot:")
+                st.markdown(texto + " ▌")
+        
+        resultado_ia = motor.responder(pergunta, busca, modo_busca, st.session_state.openai_api_key, ao_receber=mostrar_parcial)
+        area_streaming.empty()
+    else:
+        with st.spinner("Gerando resposta..."):
+            resultado_ia = motor.responder(pergunta, busca, modo_busca, st.session_state.openai_api_key)
+    
+    if resultado_ia["degradado"]:
+        # OpenAI fora do ar ou lenta demais: fica a busca tradicional, sem esperar mais
+        st.warning(f"⚠️ {resultado_ia['erro']} Mostrando os trechos encontrados pela busca tradicional.")
+        st.session_state.usar_ia_pergunta = False
+        st.session_state.resposta_ia = ""
+    elif resultado_ia["erro"]:
+        st.error(resultado_ia["erro"])
+        st.session_state.resposta_ia = f"**Erro:** {resultado_ia['erro']}"
+    else:
+        st.session_state.resposta_ia = resultado_ia["resposta"]
+        if resultado_ia["do_cache"]:
+            st.caption("⚡ Resposta recuperada do cache")
 
 # Resultados exibição
 if st.session_state.resultados:
     st.divider()
     
-    resultados = st.session_state.resultados
+    # Textos resolvidos só para esta exibição (não ficam na sessão)
+    resultados = resolver_resultados(st.session_state.resultados, observador.indice)
     arquivos_unicos = set(r['arquivo'] for r in resultados)
     
     col_stat1, col_stat2, col_stat3 = st.columns(3)
@@ -896,29 +720,19 @@ if st.session_state.resultados:
                 if st.button("📄 Mostrar Fontes", type="secondary"):
                     st.session_state.mostrar_fontes = not st.session_state.mostrar_fontes
             
-            if st.session_state.mostrar_fontes and st.session_state.contexto_ia:
+            if st.session_state.mostrar_fontes:
                 with st.expander("Contexto usado pela IA", expanded=True):
-                    st.text_area("Texto enviado ao GPT:", st.session_state.contexto_ia, height=300)
+                    if all(r["disponivel"] for r in resultados):
+                        # Remontado dos mesmos trechos, na mesma ordem: é o texto que foi enviado
+                        st.text_area("Texto enviado ao GPT:", extrair_contexto_para_ia(resultados), height=300)
+                    else:
+                        # Sem algum dos trechos, o texto remontado não seria o que foi enviado
+                        st.info(TRECHO_INDISPONIVEL)
         
         st.divider()
         st.subheader("Trechos Encontrados nos Documentos (Visualização)")
     
-    arquivos_agrupados = {}
-    for resultado in resultados:
-        arquivo = resultado['arquivo']
-        if arquivo not in arquivos_agrupados:
-            arquivos_agrupados[arquivo] = []
-        arquivos_agrupados[arquivo].append(resultado)
-    
-    for arquivo, ocorrencias in arquivos_agrupados.items():
-        with st.expander(f"📄 **{arquivo}** ({len(ocorrencias)} ocorrência(s))", expanded=not st.session_state.usar_ia_pergunta):
-            for i, ocorrencia in enumerate(ocorrencias[:5], 1):
-                st.markdown(f"**Página {ocorrencia['pagina']}**")
-                # Apenas o trecho curto visual, não a página inteira
-                st.markdown(ocorrencia['contexto'], unsafe_allow_html=True)
-                st.caption(f"Tipo: {ocorrencia['tipo']}")
-                if i < len(ocorrencias[:5]):
-                    st.divider()
+    mostrar_trechos(resultados, expandido=not st.session_state.usar_ia_pergunta)
 
 elif ("resultados" in st.session_state and not st.session_state.resultados and 
       st.session_state.pergunta_manual):
@@ -935,36 +749,7 @@ elif ("resultados" in st.session_state and not st.session_state.resultados and
         4. **Sinônimos** das palavras-chave
         """)
         
-        sugestoes = []
-        pergunta_lower = pergunta.lower()
-        
-        if re.search(r'\b6.*(per[ií]odo|n[ií]vel)\b', pergunta_lower):
-            sugestoes.extend(["6º Nível", "sexto nível", "6º Período"])
-        
-        if re.search(r'\bdisciplina\b', pergunta_lower):
-            sugestoes.extend(["Componente Curricular", "matéria", "60h Teórica"])
-        
-        if re.search(r'\btrancamento\b', pergunta_lower):
-            sugestoes.extend(["trancamento de matrícula", "Art. 15", "cancelamento"])
-        
-        if re.search(r'\bhistórico\b', pergunta_lower):
-            sugestoes.extend(["Histórico Escolar", "registro acadêmico", "boletim"])
-        
-        if re.search(r'\bcalendário\b', pergunta_lower):
-            sugestoes.extend(["Calendário Acadêmico", "períodos letivos", "datas"])
-        
-        if re.search(r'\bart\.\b', pergunta_lower):
-            sugestoes.extend(["Art. 15", "Art. 24", "Art. 1º"])
-        
-        if not sugestoes:
-            sugestoes = [
-                "60h Teórica",
-                "MODULO OBRIGATÓRIA", 
-                "Art. 15",
-                "Resolução",
-                "CH Total",
-                "Componente Curricular"
-            ]
+        sugestoes = sugerir_buscas(pergunta)
         
         cols = st.columns(3)
         for i, sugestao in enumerate(sugestoes[:6]):
@@ -976,24 +761,24 @@ elif ("resultados" in st.session_state and not st.session_state.resultados and
     if pdfs and st.button("Mostrar conteúdo dos PDFs para referência"):
         st.info("Conteúdo inicial dos PDFs carregados:")
         
+        documentos = {d["arquivo"]: d for d in observador.documentos}
         for pdf in pdfs[:2]:
             with st.expander(f"{pdf}", expanded=False):
-                try:
-                    caminho = os.path.join("data", pdf)
-                    with open(caminho, "rb") as f:
-                        reader = pypdf.PdfReader(f)
-                        texto = ""
-                        for page_num, page in enumerate(reader.pages[:3]):
-                            texto_pagina = page.extract_text()
-                            if texto_pagina:
-                                texto += f"**Página {page_num+1}:**\n"
-                                texto += texto_pagina[:500] + "\n...\n\n"
-                        if texto:
-                            st.text(texto[:2000])
-                        else:
-                            st.warning("Não foi possível extrair texto deste PDF. Pode ser um PDF escaneado.")
-                except Exception as e:
-                    st.error(f"Erro ao ler {pdf}: {e}")
+                documento = documentos.get(pdf)
+                if documento is None:
+                    st.error(f"Erro ao ler {pdf}")
+                    continue
+                texto = ""
+                for pagina in documento["paginas"][:3]:
+                    # Texto como está no PDF, com cabeçalho e rodapé
+                    texto_pagina = pagina.get("texto_bruto") or pagina["texto"]
+                    if texto_pagina:
+                        texto += f"**Página {pagina['numero']}:**\n"
+                        texto += texto_pagina[:500] + "\n...\n\n"
+                if texto:
+                    st.text(texto[:2000])
+                else:
+                    st.warning("Não foi possível extrair texto deste PDF. Pode ser um PDF escaneado.")
 
 # Rodapé
 st.divider()
@@ -1024,13 +809,9 @@ with col_footer3:
     Python 3.12
     """)
 
-# Mensagem de inicialização 
-if __name__ == "__main__":
-    print("\n" + "="*60)
-    print("GAMBOT UFPA - Sistema Inteligente de Busca")
-    print("="*60)
-    print(f"PDFs carregados: {len(pdfs)}")
-    print(f"OpenAI: {'Configurada' if st.session_state.openai_api_key else 'Não configurada'}")
-    print(f"IA: {'Ativada' if usar_ia else 'Desativada'}")
-    print(f"Acesse: http://localhost:8501")
-    print("="*60)
+# Bytes que esta sessão guarda, para o relatório de memória
+contexto_execucao = get_script_run_ctx()
+if contexto_execucao is not None:
+    registrar_sessao(contexto_execucao.session_id, st.session_state)
+
+observar("rerun_app", time.perf_counter() - inicio_rerun)
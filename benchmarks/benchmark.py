@@ -0,0 +1,289 @@
+"""
+Benchmark da ingestão, indexação, busca e montagem de contexto.
+
+Gera um corpus sintético (ou usa uma pasta de PDFs existente), mede a
+vazão da ingestão, o tempo de montagem do índice, as latências (p50/p95/
+p99) da busca fria e aquecida em cada modo, o custo de
+extrair_contexto_para_ia e o pico de memória. A IA é simulada por um
+cliente falso, sem rede. O resultado vai para um JSON que pode ser
+comparado com uma execução anterior:
+
+    python benchmarks/benchmark.py --paginas 500 --saida atual.json
+    python benchmarks/benchmark.py --paginas 500 --saida novo.json --comparar atual.json --limite 0.15
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ingestao
+from busca import MODOS_BUSCA, buscar_inteligente, extrair_contexto_para_ia
+from cache_buscas import obter_cache_buscas
+from gerador_pdfs import gerar_corpus
+from ia import gerar_resposta_ia
+from indice import Indice
+from vetorial import IndiceVetorial
+
+PERGUNTAS = [
+    "Como faço o trancamento de matrícula?",
+    "Qual o prazo para aproveitamento de estudos?",
+    "Quantas horas de atividades complementares preciso?",
+    "O que diz o Art. 15?",
+    "Qual a carga horária do estágio supervisionado?",
+    "Como funciona a banca do trabalho de conclusão de curso?",
+    "Quais disciplinas optativas existem?",
+    "Frequência mínima para aprovação",
+    "reprovação por falta jubilamento",
+    "pré-requisito de cálculo",
+    "mobilidade acadêmica e transferência",
+    "requerimento na secretaria acadêmica",
+]
+
+
+class ClienteFalso:
+    """Imita o cliente da OpenAI (chat.completions.create com e sem stream)."""
+
+    def __init__(self, latencia=0.0, pedacos=40):
+        self.latencia = latencia
+        self.pedacos = pedacos
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._criar))
+
+    def _criar(self, model, messages, stream=False, **kwargs):
+        texto = "Segundo o Regulamento, Art. 15, a resposta está no documento. "
+        if not stream:
+            time.sleep(self.latencia)
+            mensagem = SimpleNamespace(content=texto * 4)
+            return SimpleNamespace(choices=[SimpleNamespace(message=mensagem)])
+        return self._transmitir(texto)
+
+    def _transmitir(self, texto):
+        for _ in range(self.pedacos):
+            time.sleep(self.latencia / self.pedacos)
+            delta = SimpleNamespace(content=texto[:16])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def percentis(amostras):
+    """p50/p95/p99 e média em milissegundos."""
+    if not amostras:
+        return {}
+    ordenadas = sorted(amostras)
+
+    def p(fracao):
+        return ordenadas[min(len(ordenadas) - 1, int(round(fracao * (len(ordenadas) - 1))))] * 1000
+
+    return {
+        "p50": p(0.50),
+        "p95": p(0.95),
+        "p99": p(0.99),
+        "media": sum(ordenadas) / len(ordenadas) * 1000,
+    }
+
+
+def cronometrar(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+def montar_indice(documentos):
+    indice = Indice(documentos)
+    indice.vetorial = IndiceVetorial(indice)
+    return indice
+
+
+def medir(pasta, repeticoes=20, trabalhadores=None, latencia_ia=0.0):
+    """Executa todas as medições sobre os PDFs da pasta e retorna as métricas."""
+    pasta_cache = tempfile.mkdtemp(prefix="gambot-bench-cache-")
+    metricas = {}
+    try:
+        # Ingestão fria: sem cache no disco nem em memória
+        ingestao._documentos_em_memoria.clear()
+        documentos, segundos = cronometrar(ingestao.carregar_corpus, pasta, pasta_cache, trabalhadores)
+        paginas = sum(len(d["paginas"]) for d in documentos)
+        metricas["ingestao_fria_s"] = segundos
+        metricas["ingestao_fria_paginas_por_s"] = paginas / segundos if segundos else 0.0
+
+        # Ingestão a partir do cache no disco (reinício do processo)
+        ingestao._documentos_em_memoria.clear()
+        documentos, segundos = cronometrar(ingestao.carregar_corpus, pasta, pasta_cache, trabalhadores)
+        metricas["ingestao_cache_s"] = segundos
+
+        indice, segundos = cronometrar(montar_indice, documentos)
+        metricas["indexacao_s"] = segundos
+
+        # Busca fria: primeira execução de cada pergunta no índice recém-montado
+        # (fria e quente calculam o ranking de verdade; o cache de buscas é medido à parte)
+        for modo in MODOS_BUSCA:
+            frias, quentes, contexto, do_cache = [], [], [], []
+            for pergunta in PERGUNTAS:
+                _, segundos = cronometrar(buscar_inteligente, pergunta, indice, modo, usar_cache=False)
+                frias.append(segundos)
+            for _ in range(repeticoes):
+                for pergunta in PERGUNTAS:
+                    resultados, segundos = cronometrar(buscar_inteligente, pergunta, indice, modo, usar_cache=False)
+                    quentes.append(segundos)
+                    _, segundos = cronometrar(extrair_contexto_para_ia, resultados)
+                    contexto.append(segundos)
+            obter_cache_buscas().limpar()
+            for pergunta in PERGUNTAS:
+                buscar_inteligente(pergunta, indice, modo)
+            for _ in range(repeticoes):
+                for pergunta in PERGUNTAS:
+                    _, segundos = cronometrar(buscar_inteligente, pergunta, indice, modo)
+                    do_cache.append(segundos)
+            metricas[f"busca_fria_{modo}_ms"] = percentis(frias)
+            metricas[f"busca_quente_{modo}_ms"] = percentis(quentes)
+            metricas[f"busca_cache_{modo}_ms"] = percentis(do_cache)
+            metricas[f"contexto_{modo}_ms"] = percentis(contexto)
+
+        # Pipeline completo com a IA simulada (mede o nosso custo, não o da OpenAI)
+        cliente = ClienteFalso(latencia_ia)
+        respostas = []
+        for pergunta in PERGUNTAS:
+            inicio = time.perf_counter()
+            contexto = extrair_contexto_para_ia(buscar_inteligente(pergunta, indice, usar_cache=False))
+            gerar_resposta_ia(pergunta, contexto, cliente, ao_receber=lambda texto: None)
+            respostas.append(time.perf_counter() - inicio)
+        metricas["resposta_ia_simulada_ms"] = percentis(respostas)
+
+        # Pico de memória do índice e das buscas (separado porque o tracemalloc deixa tudo mais lento)
+        del indice
+        gc.collect()
+        tracemalloc.start()
+        indice = montar_indice(documentos)
+        for pergunta in PERGUNTAS:
+            extrair_contexto_para_ia(buscar_inteligente(pergunta, indice, "hibrido", usar_cache=False))
+        metricas["memoria_pico_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+        corpus = {
+            "arquivos": len(documentos),
+            "paginas": paginas,
+            "paginas_sem_texto": sum(1 for d in documentos for p in d["paginas"] if not p["texto"].strip()),
+            "trechos": indice.total_fragmentos,
+        }
+        return corpus, metricas
+    finally:
+        shutil.rmtree(pasta_cache, ignore_errors=True)
+
+
+def achatar(metricas, prefixo=""):
+    """{"a": {"p50": 1}} -> {"a.p50": 1}."""
+    planas = {}
+    for nome, valor in metricas.items():
+        if isinstance(valor, dict):
+            planas.update(achatar(valor, f"{prefixo}{nome}."))
+        else:
+            planas[f"{prefixo}{nome}"] = valor
+    return planas
+
+
+def tolerancia_absoluta(nome):
+    """Diferença mínima para contar como regressão (evita ruído em medidas de frações de ms)."""
+    if "_por_s" in nome:
+        return 0.0
+    if "_ms" in nome:
+        return 0.5
+    if nome.endswith("_mb"):
+        return 1.0
+    return 0.05
+
+
+def comparar(atual, anterior, limite):
+    """
+    Compara as métricas de duas execuções. Retorna a lista de regressões
+    (piora relativa acima de `limite` e maior que a tolerância absoluta).
+    Vazão (`_por_s`) piora quando cai; tempos e memória pioram quando sobem.
+    """
+    atuais, anteriores = achatar(atual["metricas"]), achatar(anterior["metricas"])
+    regressoes = []
+    print(f"{'métrica':45} {'anterior':>12} {'atual':>12} {'variação':>9}")
+    for nome in sorted(atuais.keys() & anteriores.keys()):
+        novo, velho = atuais[nome], anteriores[nome]
+        if not velho:
+            continue
+        variacao = (novo - velho) / velho
+        piora = -variacao if "_por_s" in nome else variacao
+        regrediu = piora > limite and abs(novo - velho) > tolerancia_absoluta(nome)
+        marca = "  <-- regressão" if regrediu else ""
+        print(f"{nome:45} {velho:12.3f} {novo:12.3f} {variacao:+8.1%}{marca}")
+        if regrediu:
+            regressoes.append(nome)
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de ingestão, busca e contexto do Gambot.")
+    parser.add_argument("--pasta", help="pasta de PDFs existente (em vez do corpus sintético)")
+    parser.add_argument("--paginas", type=int, default=200, help="páginas do corpus sintético (10 a 5000)")
+    parser.add_argument("--paginas-por-arquivo", type=int, default=50)
+    parser.add_argument("--fracao-imagem", type=float, default=0.05, help="fração de páginas só com imagem")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=20, help="repetições das buscas aquecidas")
+    parser.add_argument("--trabalhadores", type=int, default=None, help="processos de extração")
+    parser.add_argument("--latencia-ia", type=float, default=0.0, help="latência simulada da IA (segundos)")
+    parser.add_argument("--saida", default="benchmark.json", help="arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--limite", type=float, default=0.10, help="piora relativa tolerada (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    pasta_corpus = None
+    pasta = args.pasta
+    if not pasta:
+        pasta = pasta_corpus = tempfile.mkdtemp(prefix="gambot-bench-corpus-")
+        gerar_corpus(pasta, args.paginas, args.paginas_por_arquivo, args.fracao_imagem, semente=args.semente)
+
+    try:
+        # Mensagens de depuração da aplicação vão para stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            corpus, metricas = medir(pasta, args.repeticoes, args.trabalhadores, args.latencia_ia)
+    finally:
+        if pasta_corpus:
+            shutil.rmtree(pasta_corpus, ignore_errors=True)
+
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("saida", "comparar")},
+        "corpus": corpus,
+        "metricas": metricas,
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    print(f"Corpus: {corpus['arquivos']} arquivo(s), {corpus['paginas']} página(s), {corpus['trechos']} trecho(s)")
+    print(f"Ingestão fria: {metricas['ingestao_fria_paginas_por_s']:.1f} páginas/s | "
+          f"indexação: {metricas['indexacao_s']:.2f}s | memória: {metricas['memoria_pico_mb']:.1f} MB")
+    for modo in MODOS_BUSCA:
+        quente = metricas[f"busca_quente_{modo}_ms"]
+        print(f"Busca {modo}: p50 {quente['p50']:.2f}ms p95 {quente['p95']:.2f}ms p99 {quente['p99']:.2f}ms")
+    print(f"Resultados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            anterior = json.load(f)
+        regressoes = comparar(resultado, anterior, args.limite)
+        if regressoes:
+            print(f"{len(regressoes)} métrica(s) pioraram mais de {args.limite:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Gerador de PDFs sintéticos no formato dos documentos da UFPA.
+
+Produz regulamentos com estrutura legal (CAPÍTULO, Art., §,
+incisos e alíneas), páginas de matriz curricular (código, componente e
+carga horária) e, opcionalmente, páginas só com imagem (sem texto
+extraível, como um PDF escaneado). Não depende de bibliotecas externas:
+o PDF é escrito direto, com a fonte Helvetica e codificação WinAnsi.
+
+    python benchmarks/gerador_pdfs.py --paginas 500 --saida /tmp/corpus
+"""
+import argparse
+import os
+import random
+import zlib
+
+PALAVRAS = (
+    "matrícula trancamento disciplina componente curricular colegiado curso discente docente "
+    "coordenação prazo semestre período letivo aproveitamento estudos frequência avaliação "
+    "nota conceito estágio supervisionado atividades complementares extensão trabalho conclusão "
+    "orientador banca requerimento secretaria acadêmica carga horária crédito pré-requisito "
+    "reprovação jubilamento integralização currículo optativa obrigatória monitoria mobilidade "
+    "transferência reingresso diplomação colação grau calendário resolução conselho"
+).split()
+
+NOMES_COMPONENTES = (
+    "CÁLCULO FÍSICA ÁLGEBRA LINEAR PROGRAMAÇÃO ESTRUTURAS DADOS CIRCUITOS ELETRÔNICA SINAIS SISTEMAS "
+    "REDES COMPUTADORES BANCO SOFTWARE CONTROLE PROCESSOS TEORIA COMPUTAÇÃO ARQUITETURA COMPILADORES"
+).split()
+
+LINHAS_POR_PAGINA = 52
+CARACTERES_POR_LINHA = 95
+
+
+def _escapar(texto):
+    """Texto para string literal do PDF (WinAnsi)."""
+    dados = texto.encode("cp1252", "replace")
+    return dados.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _quebrar(texto, largura=CARACTERES_POR_LINHA):
+    linhas, atual = [], ""
+    for palavra in texto.split():
+        if atual and len(atual) + 1 + len(palavra) > largura:
+            linhas.append(atual)
+            atual = palavra
+        else:
+            atual = f"{atual} {palavra}" if atual else palavra
+    if atual:
+        linhas.append(atual)
+    return linhas
+
+
+def _frase(rng, minimo=8, maximo=22):
+    palavras = [rng.choice(PALAVRAS) for _ in range(rng.randint(minimo, maximo))]
+    return " ".join(palavras).capitalize() + "."
+
+
+class GeradorRegulamento:
+    """Gera o texto das páginas mantendo a numeração de artigos entre páginas."""
+
+    def __init__(self, semente=0):
+        self.rng = random.Random(semente)
+        self.artigo = 0
+        self.capitulo = 0
+        self.codigo = 1000
+
+    def _blocos_artigo(self):
+        rng = self.rng
+        self.artigo += 1
+        blocos = [f"Art. {self.artigo}º {_frase(rng)}"]
+        for inciso in ("I", "II", "III", "IV")[:rng.randint(0, 4)]:
+            blocos.append(f"{inciso} - {_frase(rng, 5, 12)}")
+        if rng.random() < 0.3:
+            blocos.extend(f"{letra}) {_frase(rng, 4, 9)}" for letra in "abc"[:rng.randint(1, 3)])
+        for p in range(rng.randint(0, 2)):
+            blocos.append(f"§ {p + 1}º {_frase(rng)}")
+        return blocos
+
+    def pagina_regulamento(self):
+        linhas = []
+        while len(linhas) < LINHAS_POR_PAGINA:
+            if self.rng.random() < 0.08:
+                self.capitulo += 1
+                linhas.extend(["", f"CAPÍTULO {self.capitulo}", _frase(self.rng, 3, 6).upper().rstrip(".")])
+            for bloco in self._blocos_artigo():
+                linhas.extend(_quebrar(bloco))
+        return linhas[:LINHAS_POR_PAGINA]
+
+    def pagina_matriz(self, nivel):
+        rng = self.rng
+        linhas = [f"{nivel}º Nível", "Componente Curricular CH Detalhada Tipo Natureza"]
+        while len(linhas) < LINHAS_POR_PAGINA - 2:
+            self.codigo += 1
+            nome = " ".join(rng.choice(NOMES_COMPONENTES) for _ in range(rng.randint(1, 3)))
+            ch = rng.choice((30, 45, 60, 68, 90))
+            natureza = rng.choice(("OBRIGATÓRIA", "OPTATIVA"))
+            linhas.append(f"EC{self.codigo:05d} {nome} - {ch}h 0h Ead MODULO {natureza}")
+            linhas.append(f"{ch}h Teórica 0h Prática 0h Estágio 0h Extensão")
+        linhas.append(f"CH Total: {rng.randint(300, 450)}hrs.")
+        return linhas
+
+
+def _conteudo_texto(linhas):
+    partes = [b"BT /F1 10 Tf 13 TL 40 800 Td"]
+    for linha in linhas:
+        partes.append(b"(" + _escapar(linha) + b") Tj T*")
+    partes.append(b"ET")
+    return b"\n".join(partes)
+
+
+# Ruído aleatório (0-255) convertido em tons claros (fundo) ou em "tinta" borrada
+_TABELA_FUNDO = bytes(225 + b % 31 for b in range(256))
+_TABELA_TINTA = bytes(40 + b % 71 if b % 2 else 225 + b % 31 for b in range(256))
+
+
+def _imagem_digitalizada(rng, largura=400, altura=560):
+    """Imagem em tons de cinza com 'linhas de texto' borradas (página escaneada)."""
+    linhas = bytearray()
+    for y in range(altura):
+        tinta = (y // 8) % 2 == 0 and 40 < y < altura - 40
+        linhas += rng.randbytes(largura).translate(_TABELA_TINTA if tinta else _TABELA_FUNDO)
+    return zlib.compress(bytes(linhas)), largura, altura
+
+
+def escrever_pdf(caminho, paginas, semente=0):
+    """
+    Escreve um PDF. `paginas` é uma lista de listas de linhas de texto
+    ou None para uma página só com imagem.
+    """
+    rng = random.Random(semente)
+    objetos = []   # conteúdo de cada objeto (o número é a posição + 1)
+
+    def novo(conteudo=b""):
+        objetos.append(conteudo)
+        return len(objetos)
+
+    catalogo = novo()
+    raiz_paginas = novo()
+    fonte = novo(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    filhos = []
+    for linhas in paginas:
+        if linhas is None:
+            dados, largura, altura = _imagem_digitalizada(rng)
+            imagem = novo(
+                b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>\nstream\n" % (largura, altura, len(dados))
+                + dados + b"\nendstream"
+            )
+            conteudo = b"q 515 0 0 720 40 60 cm /Im0 Do Q"
+            recursos = b"<< /XObject << /Im0 %d 0 R >> >>" % imagem
+        else:
+            conteudo = zlib.compress(_conteudo_texto(linhas))
+            recursos = b"<< /Font << /F1 %d 0 R >> >>" % fonte
+        filtro = b"" if linhas is None else b" /Filter /FlateDecode"
+        stream = novo(b"<< /Length %d%s >>\nstream\n" % (len(conteudo), filtro) + conteudo + b"\nendstream")
+        filhos.append(novo(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources %s /Contents %d 0 R >>"
+            % (raiz_paginas, recursos, stream)
+        ))
+
+    objetos[catalogo - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % raiz_paginas
+    objetos[raiz_paginas - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % f for f in filhos), len(filhos)
+    )
+
+    saida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    posicoes = []
+    for numero, conteudo in enumerate(objetos, 1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n" % numero + conteudo + b"\nendobj\n"
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % p for p in posicoes)
+    saida += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, catalogo, inicio_xref)
+
+    with open(caminho, "wb") as f:
+        f.write(saida)
+
+
+def gerar_corpus(pasta, paginas=100, paginas_por_arquivo=50, fracao_imagem=0.05, fracao_matriz=0.2, semente=42):
+    """
+    Gera `paginas` páginas distribuídas em PDFs de até `paginas_por_arquivo`
+    páginas. Retorna a lista de caminhos gerados.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    rng = random.Random(semente)
+    caminhos = []
+    restantes = paginas
+    numero = 0
+    while restantes > 0:
+        numero += 1
+        quantidade = min(paginas_por_arquivo, restantes)
+        restantes -= quantidade
+        gerador = GeradorRegulamento(semente + numero)
+        matriz = rng.random() < fracao_matriz
+        conteudo = []
+        for i in range(quantidade):
+            if rng.random() < fracao_imagem:
+                conteudo.append(None)
+            elif matriz:
+                conteudo.append(gerador.pagina_matriz(i % 10 + 1))
+            else:
+                conteudo.append(gerador.pagina_regulamento())
+        nome = f"{'matriz' if matriz else 'regulamento'}_{numero:04d}.pdf"
+        caminho = os.path.join(pasta, nome)
+        escrever_pdf(caminho, conteudo, semente + numero)
+        caminhos.append(caminho)
+    return caminhos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera PDFs sintéticos de regulamentos e matrizes curriculares.")
+    parser.add_argument("--saida", required=True, help="pasta onde os PDFs serão gravados")
+    parser.add_argument("--paginas", type=int, default=100, help="total de páginas (ex.: 10 a 5000)")
+    parser.add_argument("--paginas-por-arquivo", type=int, default=50)
+    parser.add_argument("--fracao-imagem", type=float, default=0.05, help="fração de páginas só com imagem")
+    parser.add_argument("--fracao-matriz", type=float, default=0.2, help="fração de arquivos de matriz curricular")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    caminhos = gerar_corpus(args.saida, args.paginas, args.paginas_por_arquivo,
+                            args.fracao_imagem, args.fracao_matriz, args.semente)
+    print(f"{len(caminhos)} PDF(s) com {args.paginas} página(s) em {args.saida}")
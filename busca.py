@@ -0,0 +1,348 @@
+"""
+Busca nos documentos: expansão da pergunta com sinônimos, ranking dos
+trechos no índice e montagem do contexto enviado à IA.
+"""
+import html
+import logging
+import re
+import time
+
+from cache_buscas import chave_busca, obter_cache_buscas
+from indice import fim_token, tokenizar, tokens_do_termo
+from ingestao import normalizar_texto, posicao_original
+from metricas import contar, medir, observar
+from vetorial import fundir_rankings
+
+log = logging.getLogger("gambot.busca")
+
+# Modos de busca disponíveis na interface
+MODOS_BUSCA = {
+    "palavras": "Palavras-chave (BM25)",
+    "vetorial": "Vetorial (TF-IDF local)",
+    "hibrido": "Híbrido (BM25 + vetorial)",
+}
+MODO_PADRAO = "palavras"
+
+# Quantos candidatos de cada ranking entram na fusão do modo híbrido
+CANDIDATOS_FUSAO = 50
+
+# Trecho visual: até JANELAS_TRECHO janelas de ±MARGEM_JANELA caracteres em volta dos termos
+JANELAS_TRECHO = 3
+MARGEM_JANELA = 90
+
+# Dicionário de sinônimos
+SINONIMOS = {
+    "carga horária": ["CH", "horas", "h", "carga", "horária"],
+    "disciplina": ["matéria", "componente curricular", "curso"],
+    "obrigatória": ["compulsória", "mandatória", "obrigatório"],
+    "trancamento": ["cancelamento", "suspensão", "interrupção"],
+    "matrícula": ["inscrição", "registro", "cadastro"],
+    "regulamento": ["norma", "regra", "resolução", "estatuto"],
+    "curso": ["graduação", "bacharelado", "licenciatura"],
+    "aluno": ["discente", "estudante"],
+    "professor": ["docente", "ensinante"],
+    "coordenador": ["coordenador de curso", "diretor de curso"],
+    "nota": ["conceito", "avaliação", "pontuação"],
+    "frequência": ["presença", "assiduidade"],
+    "aprovação": ["aprovado", "passou"],
+    "reprovação": ["reprovado", "não passou"],
+    "exame": ["prova", "teste", "avaliação"],
+    "calendário": ["cronograma", "agenda", "datas"],
+    "biblioteca": ["acervo", "coleção", "livros"],
+    "laboratório": ["lab", "experimental", "prática"],
+    "estágio": ["prática profissional", "experiência profissional"],
+    "tcc": ["trabalho de conclusão de curso", "monografia", "projeto final"],
+    "graduação": ["formação", "curso superior"],
+    "mestrado": ["pós-graduação", "mestrado acadêmico", "mestrado profissional"],
+    "doutorado": ["pós-graduação", "doutorado acadêmico", "doutorado profissional"],
+    "pesquisa": ["investigação", "estudo", "projeto de pesquisa"],
+    "extensão": ["projeto de extensão", "ação comunitária", "serviço à comunidade"],
+    "monitoria": ["auxílio docente", "assistência de ensino"],
+    "bolsa": ["auxílio financeiro", "financiamento", "subsídio"],
+    "edital": ["chamada", "convocação", "seleção"],
+    "processo seletivo": ["vestibular", "concurso", "seleção"],
+    "transferência": ["mudança de curso", "troca de curso", "mobilidade"],
+    "diploma": ["certificado", "certificação", "título"],
+    "histórico": ["registro acadêmico", "boletim", "notas"],
+    "secretaria": ["setor administrativo", "administração acadêmica"],
+    "coordenação": ["direção", "gerência", "administração"],
+    "reitoria": ["administração superior", "gestão universitária"],
+    "campus": ["unidade", "polo", "sede"],
+    "ativo": ["regular", "matriculado", "frequentando"],
+    "trancado": ["suspenso", "interrompido", "cancelado"],
+    "formado": ["egresso", "graduado", "diplomado"],
+    "evasão": ["abandono", "desistência", "saída"],
+    "período": ["semestre", "fase", "etapa", "nível", "periodo"],
+    "jubilamento": ["desligamento", "expulsão", "eliminação", "cancelamento de matrícula"],
+    "trancamento de matrícula": ["trancar matrícula", "suspender matrícula", "cancelar matrícula temporariamente"],
+    "histórico escolar": ["boletim", "registro acadêmico", "notas", "histórico acadêmico"],
+    "prazo": ["período", "tempo", "data limite", "vencimento", "limite"],
+    "solicitar": ["pedir", "requerer", "requisitar", "obter", "conseguir"],
+    "componente curricular": ["disciplina", "matéria", "curso", "unidade curricular"],
+    "artigo": ["art.", "art", "artigo"],
+    "parágrafo": ["§", "parágrafo único", "paragrafo"],
+    "inciso": ["inc.", "inciso", "item"],
+    "resolução": ["norma", "regra", "decisão", "deliberação"]
+}
+
+
+def _compilar_sinonimos():
+    """
+    Chaves do dicionário pela sequência de tokens (inclusive expressões como
+    "carga horária"), sem acentos nem plural. Também deixa os tokens de
+    todas as entradas já calculados para as buscas.
+    """
+    for chave, sinonimos in SINONIMOS.items():
+        tokens_do_termo(chave)
+        for sinonimo in sinonimos:
+            tokens_do_termo(sinonimo)
+    return {tuple(tokenizar(normalizar_texto(chave))): chave for chave in SINONIMOS}
+
+
+# Compilado uma vez, na importação
+CHAVES_SINONIMOS = _compilar_sinonimos()
+MAIOR_CHAVE = max(len(tokens) for tokens in CHAVES_SINONIMOS)
+
+
+PALAVRAS_IRRELEVANTES = {"quais", "qual", "como", "quando", "onde", "porque", "que", "para", "com", "dos", "das", "pelo", "pela", "estou", "quero", "saber"}
+
+
+def preparar_termos_busca(pergunta_usuario):
+    """Extrai os termos relevantes da pergunta e acrescenta os principais sinônimos."""
+    termos_busca = set()
+    palavras = pergunta_usuario.lower().split()
+    
+    for palavra in palavras:
+        limpa = re.sub(r'[^\w]', '', palavra)
+        if len(limpa) > 2 and limpa not in PALAVRAS_IRRELEVANTES:
+            termos_busca.add(limpa)
+    
+    # Chaves do dicionário presentes na pergunta: cada sequência de até MAIOR_CHAVE tokens
+    tokens = tokenizar(normalizar_texto(pergunta_usuario))
+    for inicio in range(len(tokens)):
+        for fim in range(inicio + 1, min(len(tokens), inicio + MAIOR_CHAVE) + 1):
+            chave = CHAVES_SINONIMOS.get(tuple(tokens[inicio:fim]))
+            if chave is None:
+                continue
+            if fim - inicio > 1:
+                termos_busca.add(chave) # Expressão inteira ("carga horária", "trancamento de matrícula")
+            for sin in SINONIMOS[chave][:2]: # Top 2 sinônimos
+                termos_busca.add(sin)
+    
+    return termos_busca
+
+
+def _tokens_por_termo(termos_busca):
+    """Tokens do índice de cada termo da busca (um termo pode ter várias palavras)."""
+    tokens_por_termo = {}
+    for termo in termos_busca:
+        tokens = tokens_do_termo(termo)
+        if tokens:
+            tokens_por_termo[termo] = tokens
+    return tokens_por_termo
+
+
+def _marcacoes(fragmento, posicoes):
+    """
+    Converte as posições dos tokens no texto normalizado em intervalos
+    (início, fim) do texto original do trecho, em ordem.
+    """
+    texto_norm = fragmento["texto_norm"]
+    mapa = fragmento["mapa_norm"]
+    base = fragmento["inicio_norm"]
+    inicio_trecho = fragmento["inicio"]
+    marcacoes = set()
+    for lista in posicoes.values():
+        for pos in lista:
+            fim = fim_token(texto_norm, pos)
+            marcacoes.add((
+                posicao_original(mapa, base + pos) - inicio_trecho,
+                posicao_original(mapa, base + fim - 1) + 1 - inicio_trecho,
+            ))
+    return sorted(marcacoes)
+
+
+def montar_trecho_visual(texto, marcacoes):
+    """
+    Monta o trecho exibido ao usuário: janelas em volta dos termos
+    encontrados (as que têm mais termos, na ordem do texto) com cada termo
+    destacado em <mark>. O texto é escapado para HTML.
+    """
+    if not marcacoes:
+        corte = texto[:MARGEM_JANELA * 2]
+        sufixo = "..." if len(corte) < len(texto) else ""
+        return html.escape(corte.replace("\n", " ")) + sufixo
+
+    # Janelas em volta de cada termo, unidas quando se sobrepõem
+    janelas = []
+    for inicio, fim in marcacoes:
+        de, ate = max(0, inicio - MARGEM_JANELA), min(len(texto), fim + MARGEM_JANELA)
+        if janelas and de <= janelas[-1][1]:
+            janelas[-1][1] = max(janelas[-1][1], ate)
+            janelas[-1][2].append((inicio, fim))
+        else:
+            janelas.append([de, ate, [(inicio, fim)]])
+    janelas = sorted(janelas, key=lambda j: len(j[2]), reverse=True)[:JANELAS_TRECHO]
+    janelas.sort(key=lambda j: j[0])
+
+    partes = []
+    for de, ate, dentro in janelas:
+        pedacos = ["..." if de > 0 else ""]
+        cursor = de
+        for inicio, fim in dentro:
+            if inicio < cursor:
+                continue
+            pedacos.append(html.escape(texto[cursor:inicio]))
+            pedacos.append(f"<mark>{html.escape(texto[inicio:fim])}</mark>")
+            cursor = fim
+        pedacos.append(html.escape(texto[cursor:ate]))
+        pedacos.append("..." if ate < len(texto) else "")
+        partes.append("".join(pedacos).replace("\n", " "))
+    return " ".join(partes)
+
+
+def ranquear(pergunta_usuario, termos_busca, indice, modo=MODO_PADRAO, limite=10):
+    """
+    Retorna [(id do trecho, pontos, encontros)] segundo o modo de busca
+    escolhido. `encontros` é (termos encontrados, {token: posições}) vindo
+    do BM25, ou None para trechos achados só pela busca vetorial.
+    """
+    if modo == "vetorial":
+        return [(i, p, None) for i, p in indice.vetorial.buscar(pergunta_usuario, limite)]
+    if modo == "hibrido":
+        por_palavras = indice.buscar(termos_busca, limite=CANDIDATOS_FUSAO)
+        encontros = {i: (termos, posicoes) for i, _, termos, posicoes in por_palavras}
+        por_vetor = indice.vetorial.buscar(pergunta_usuario, CANDIDATOS_FUSAO)
+        fundidos = fundir_rankings([(i, p) for i, p, _, _ in por_palavras], por_vetor, limite=limite)
+        return [(i, p, encontros.get(i)) for i, p in fundidos]
+    return [(i, p, (termos, posicoes)) for i, p, termos, posicoes in indice.buscar(termos_busca, limite=limite)]
+
+
+def buscar_inteligente(pergunta_usuario, indice, modo=MODO_PADRAO, usar_cache=True):
+    """
+    Busca por ranking: pontua os trechos com BM25 sobre o índice invertido,
+    por similaridade vetorial local ou pela fusão dos dois (modo híbrido).
+    Retorna os 10 melhores trechos, cada um com arquivo e página de origem,
+    no formato usado por extrair_contexto_para_ia. Com `usar_cache`, buscas
+    com os mesmos termos na mesma versão do índice saem do cache de buscas.
+    """
+    if not pergunta_usuario:
+        return []
+    
+    inicio_busca = time.perf_counter()
+    log.debug("Iniciando busca por ranking (%s) para: '%s'", modo, pergunta_usuario)
+    
+    termos_busca = preparar_termos_busca(pergunta_usuario)
+    
+    #confia nos sinônimos
+    log.debug("Termos considerados: %s", termos_busca)
+    
+    if indice is None:
+        log.debug("Índice ainda não está pronto.")
+        return []
+    
+    if modo != "palavras" and indice.vetorial is None:
+        log.warning("Índice vetorial indisponível, usando palavras-chave.")
+        modo = "palavras"
+    
+    if usar_cache:
+        cache = obter_cache_buscas()
+        chave = chave_busca(termos_busca, modo, pergunta_usuario)
+        guardados = cache.buscar(indice.versao, chave)
+        if guardados is not None:
+            observar("busca_total", time.perf_counter() - inicio_busca, modo=modo)
+            contar("buscas", modo=modo)
+            return guardados
+    
+    rotulo_pontos = {"vetorial": "Similaridade", "hibrido": "Fusão"}.get(modo, "Relevância")
+    casas = 1 if rotulo_pontos == "Relevância" else 3
+    melhores_trechos = []
+    tokens_por_termo = None
+    
+    with medir("pontuacao", modo=modo):
+        ranking = ranquear(pergunta_usuario, termos_busca, indice, modo)
+    
+    for id_trecho, pontos, encontros in ranking:
+        fragmento = indice.fragmentos[id_trecho]
+        texto_trecho = fragmento["texto"]
+        
+        # Posições dos termos saem dos postings: o BM25 já as leu para os vencedores;
+        # só os trechos achados apenas pela busca vetorial ainda consultam o índice
+        if encontros is None:
+            if tokens_por_termo is None:
+                tokens_por_termo = _tokens_por_termo(termos_busca)
+                tokens_consulta = set().union(*tokens_por_termo.values()) if tokens_por_termo else set()
+            posicoes = indice.posicoes(id_trecho, tokens_consulta)
+            encontros = ([t for t, tokens in tokens_por_termo.items() if tokens <= posicoes.keys()], posicoes)
+        termos_encontrados_no_trecho, posicoes = encontros
+        marcacoes = _marcacoes(fragmento, posicoes)
+        
+        melhores_trechos.append({
+            "id_trecho": id_trecho, # Posição em indice.fragmentos (vale para a versão do índice da busca)
+            "arquivo": fragmento["arquivo"],
+            "pagina": fragmento["pagina"],
+            "rotulo": fragmento["rotulo"],
+            "inicio": fragmento["inicio"],
+            "pontos": pontos,
+            "termos_encontrados": termos_encontrados_no_trecho,
+            "texto_para_ia": texto_trecho, # Trecho estrutural (artigo, parágrafo, linhas da matriz) para IA
+            "marcacoes": marcacoes, # Intervalos dos termos no texto do trecho
+            "contexto": montar_trecho_visual(texto_trecho, marcacoes), # Visual curto, com <mark>
+            "tipo": f"{rotulo_pontos}: {pontos:.{casas}f}"
+        })
+    
+    segundos = time.perf_counter() - inicio_busca
+    if usar_cache:
+        cache.guardar(indice.versao, chave, melhores_trechos, segundos)
+    observar("busca_total", segundos, modo=modo)
+    contar("buscas", modo=modo)
+    log.debug("Retornando top %d trechos de %d indexados.", len(melhores_trechos), indice.total_fragmentos)
+    return melhores_trechos
+
+
+@medir("contexto")
+def extrair_contexto_para_ia(resultados, max_tokens=12000):
+    """
+    Extrai contexto enviando os trechos encontrados para a IA e remove duplicatas.
+    """
+    if not resultados:
+        return "Nenhum documento relevante encontrado."
+    
+    # um SET para evitar trechos duplicados se o mesmo trecho vier mais de uma vez
+    trechos_processados = set()
+    contextos = []
+    tokens_estimados = 0
+    
+    # Ordenar resultados (já vêm ordenados por pontuação do buscar_inteligente, mas mantemos lógica)
+    for resultado in resultados:
+        chave_unica = (resultado['arquivo'], resultado['pagina'], resultado.get('inicio', 0))
+        
+        # Se já foi esse trecho para a IA neste prompt, pula
+        if chave_unica in trechos_processados:
+            continue
+            
+        trechos_processados.add(chave_unica)
+        
+        # Pega o texto do trecho
+        texto_trecho = resultado.get("texto_para_ia", resultado.get("contexto", ""))
+        
+        # Limpeza (remove tags HTML no visual)
+        texto_limpo = re.sub(r'<[^>]+>', '', texto_trecho)
+        texto_limpo = re.sub(r'\s+', ' ', texto_limpo).strip()
+        
+        rotulo = f" | {resultado['rotulo']}" if resultado.get('rotulo') else ""
+        cabecalho = f"\n--- [Documento: {resultado['arquivo']} | Página: {resultado['pagina']}{rotulo}] ---\n"
+        bloco_completo = cabecalho + texto_limpo
+        
+        # Estimativa simples de tokens
+        tokens_bloco = len(bloco_completo) / 3.5
+        
+        if tokens_estimados + tokens_bloco <= max_tokens:
+            contextos.append(bloco_completo)
+            tokens_estimados += tokens_bloco
+        else:
+            log.debug("Limite de tokens atingido (%d).", tokens_estimados)
+            break
+    
+    log.debug("Contexto gerado com aprox. %d tokens de %d trechos únicos.", tokens_estimados, len(trechos_processados))
+    return "\n".join(contextos)
@@ -0,0 +1,129 @@
+"""
+Cache das buscas, compartilhado por todas as sessões do processo.
+
+As mesmas buscas ("trancamento", "carga horária", "Art. 15") chegam de
+vários alunos e a cada rerun do Streamlit. A chave é o conjunto de termos
+expandidos da pergunta (normalizados e ordenados), o modo de busca e a
+versão do índice: perguntas com outra redação que geram os mesmos termos
+caem na mesma entrada. Quando o índice muda de versão (PDF novo ou
+alterado), as entradas das versões anteriores são descartadas. O tamanho
+é limitado em entradas e em bytes (LRU).
+"""
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from ingestao import normalizar_texto
+from metricas import contar
+
+log = logging.getLogger("gambot.cache_buscas")
+
+MAX_ENTRADAS = int(os.environ.get("GAMBOT_CACHE_BUSCAS_MAX", "2048"))
+LIMITE_BYTES = int(float(os.environ.get("GAMBOT_CACHE_BUSCAS_MB", "32")) * 1024 * 1024)
+
+
+def chave_busca(termos_busca, modo, pergunta):
+    """
+    Chave da busca: termos sem acento e em ordem. Os modos vetorial e
+    híbrido também dependem do texto da pergunta, que entra normalizado.
+    """
+    termos = tuple(sorted({normalizar_texto(t) for t in termos_busca}))
+    if modo == "palavras":
+        return (modo, termos)
+    return (modo, termos, " ".join(normalizar_texto(pergunta).split()))
+
+
+def _tamanho(resultados):
+    """Bytes que a entrada ocupa a mais (o texto dos trechos é o mesmo objeto do índice)."""
+    tamanho = sys.getsizeof(resultados)
+    for r in resultados:
+        tamanho += sys.getsizeof(r) + sys.getsizeof(r["contexto"]) + sys.getsizeof(r["tipo"])
+        tamanho += sys.getsizeof(r["marcacoes"]) + sys.getsizeof(r["termos_encontrados"])
+    return tamanho
+
+
+class CacheBuscas:
+    """Resultados de buscar_inteligente por (versão do índice, chave), seguro para várias threads."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, limite_bytes=LIMITE_BYTES):
+        self.max_entradas = max_entradas
+        self.limite_bytes = limite_bytes
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.segundos_economizados = 0.0
+        self._versao_indice = None
+        self._entradas = OrderedDict()   # chave -> (resultados, bytes, segundos para calcular)
+        self._trava = threading.Lock()
+
+    def _sincronizar_versao(self, versao_indice):
+        """Descarta as buscas de versões anteriores do índice (PDFs reindexados)."""
+        if versao_indice != self._versao_indice:
+            if self._entradas:
+                log.info("Cache de buscas invalidado (%d entrada(s) de outra versão do índice)", len(self._entradas))
+            self._entradas.clear()
+            self.bytes = 0
+            self._versao_indice = versao_indice
+
+    def buscar(self, versao_indice, chave):
+        """Cópia dos resultados guardados para a busca, ou None."""
+        with self._trava:
+            entrada = self._entradas.get(chave) if versao_indice == self._versao_indice else None
+            if entrada is None:
+                self.falhas += 1
+            else:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                self.segundos_economizados += entrada[2]
+        contar("cache_buscas", evento="falha" if entrada is None else "acerto")
+        # Cópias rasas: quem recebe pode mexer nos dicts sem estragar a entrada
+        return None if entrada is None else [dict(r) for r in entrada[0]]
+
+    def guardar(self, versao_indice, chave, resultados, segundos):
+        resultados = [dict(r) for r in resultados]
+        tamanho = _tamanho(resultados)
+        with self._trava:
+            self._sincronizar_versao(versao_indice)
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= anterior[1]
+            self._entradas[chave] = (resultados, tamanho, segundos)
+            self.bytes += tamanho
+            while len(self._entradas) > 1 and (len(self._entradas) > self.max_entradas or self.bytes > self.limite_bytes):
+                _, removida = self._entradas.popitem(last=False)
+                self.bytes -= removida[1]
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self.bytes = 0
+            self._versao_indice = None
+
+    def metricas(self):
+        """Acertos, falhas, taxa de acerto, tempo economizado e tamanho do cache."""
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+                "segundos_economizados": self.segundos_economizados,
+                "entradas": len(self._entradas),
+                "bytes": self.bytes,
+                "versao_indice": self._versao_indice,
+            }
+
+
+_cache = None
+_trava_cache = threading.Lock()
+
+
+def obter_cache_buscas():
+    """Retorna o cache de buscas do processo."""
+    global _cache
+    with _trava_cache:
+        if _cache is None:
+            _cache = CacheBuscas()
+        return _cache
@@ -0,0 +1,175 @@
+"""
+Cache persistente das respostas da IA.
+
+A chave combina a pergunta normalizada, o hash do contexto recuperado, o
+modelo e a versão do índice. Perguntas que diferem só na redação, acentos
+ou palavras vazias caem na mesma entrada (mesma assinatura ou alta
+similaridade de termos). Só são consultadas as respostas da versão do
+índice informada; as de versões anteriores não são apagadas de uma vez
+(outro processo pode usar a mesma pasta com outra versão) e saem quando
+expiram (TTL) ou quando o cache passa do tamanho máximo (LRU).
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from ingestao import PASTA_CACHE, normalizar_texto
+from indice import tokenizar
+from metricas import contar
+
+log = logging.getLogger("gambot.cache_respostas")
+
+ARQUIVO_CACHE = os.path.join(PASTA_CACHE, "respostas.sqlite3")
+MAX_ENTRADAS = int(os.environ.get("GAMBOT_CACHE_RESPOSTAS_MAX", "5000"))
+TTL_SEGUNDOS = int(os.environ.get("GAMBOT_CACHE_RESPOSTAS_TTL", str(7 * 24 * 3600)))
+
+# Similaridade mínima (Jaccard dos termos) para considerar duas perguntas equivalentes
+LIMIAR_SIMILARIDADE = 0.75
+
+PALAVRAS_VAZIAS = {
+    "a", "o", "as", "os", "um", "uma", "de", "do", "da", "dos", "das", "em", "no", "na", "nos", "nas",
+    "e", "ou", "por", "para", "pra", "com", "sem", "que", "qual", "quais", "como", "quando", "onde",
+    "porque", "se", "eu", "meu", "minha", "me", "ao", "aos", "pelo", "pela", "sobre", "estou", "quero",
+    "saber", "gostaria", "preciso", "posso", "faco", "fazer", "sao", "ser", "tem", "ha", "existe",
+    "existem", "voce", "favor", "ola", "oi",
+}
+
+
+def termos_pergunta(pergunta):
+    """Termos significativos da pergunta, sem acento, plural simples ou palavras vazias."""
+    return {t for t in tokenizar(normalizar_texto(pergunta)) if t not in PALAVRAS_VAZIAS}
+
+
+def hash_texto(texto):
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class CacheRespostas:
+    """Cache de respostas em SQLite, seguro para várias threads do mesmo processo."""
+
+    def __init__(self, caminho=ARQUIVO_CACHE, max_entradas=MAX_ENTRADAS, ttl=TTL_SEGUNDOS):
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self.segundos_economizados = 0.0
+        self._trava = threading.Lock()
+
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                termos TEXT NOT NULL,
+                hash_contexto TEXT NOT NULL,
+                modelo TEXT NOT NULL,
+                versao_indice TEXT NOT NULL,
+                resposta TEXT NOT NULL,
+                latencia REAL NOT NULL,
+                criado_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        self._conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_respostas_contexto ON respostas (hash_contexto, modelo, versao_indice)"
+        )
+        self._conexao.commit()
+
+    @staticmethod
+    def _chave(termos, hash_contexto, modelo, versao_indice):
+        assinatura = " ".join(sorted(termos))
+        return hash_texto(f"{assinatura}|{hash_contexto}|{modelo}|{versao_indice}")
+
+    def buscar(self, pergunta, contexto, modelo, versao_indice, registrar_metricas=True):
+        """Retorna a resposta guardada para a pergunta (ou equivalente) ou None."""
+        termos = termos_pergunta(pergunta)
+        hash_contexto = hash_texto(contexto)
+        agora = time.time()
+
+        with self._trava:
+            limite_ttl = agora - self.ttl
+
+            linha = self._conexao.execute(
+                "SELECT chave, resposta, latencia FROM respostas WHERE chave = ? AND criado_em >= ?",
+                (self._chave(termos, hash_contexto, modelo, versao_indice), limite_ttl),
+            ).fetchone()
+
+            # Quase duplicata: mesmo contexto e modelo, termos parecidos
+            if linha is None and termos:
+                melhor = 0.0
+                for chave, termos_salvos, resposta, latencia in self._conexao.execute(
+                    "SELECT chave, termos, resposta, latencia FROM respostas "
+                    "WHERE hash_contexto = ? AND modelo = ? AND versao_indice = ? AND criado_em >= ?",
+                    (hash_contexto, modelo, versao_indice, limite_ttl),
+                ):
+                    outros = set(termos_salvos.split())
+                    similaridade = len(termos & outros) / len(termos | outros) if outros else 0.0
+                    if similaridade >= LIMIAR_SIMILARIDADE and similaridade > melhor:
+                        melhor = similaridade
+                        linha = (chave, resposta, latencia)
+
+            if linha is None:
+                if registrar_metricas:
+                    self.falhas += 1
+                    contar("cache_respostas", resultado="falha")
+                return None
+
+            chave, resposta, latencia = linha
+            self._conexao.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            self._conexao.commit()
+            if registrar_metricas:
+                self.acertos += 1
+                self.segundos_economizados += latencia
+                contar("cache_respostas", resultado="acerto")
+            return resposta
+
+    def guardar(self, pergunta, contexto, modelo, versao_indice, resposta, latencia):
+        """Guarda a resposta gerada e aplica os limites de TTL e tamanho."""
+        termos = termos_pergunta(pergunta)
+        hash_contexto = hash_texto(contexto)
+        agora = time.time()
+
+        with self._trava:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._chave(termos, hash_contexto, modelo, versao_indice), " ".join(sorted(termos)), hash_contexto,
+                 modelo, versao_indice, resposta, latencia, agora, agora),
+            )
+            self._conexao.execute("DELETE FROM respostas WHERE criado_em < ?", (agora - self.ttl,))
+            self._conexao.execute(
+                "DELETE FROM respostas WHERE chave IN (SELECT chave FROM respostas "
+                "ORDER BY acessado_em DESC LIMIT -1 OFFSET ?)",
+                (self.max_entradas,),
+            )
+            self._conexao.commit()
+
+    def metricas(self):
+        """Acertos, falhas, taxa de acerto, tempo economizado e tamanho do cache."""
+        with self._trava:
+            entradas = self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        consultas = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            "segundos_economizados": self.segundos_economizados,
+            "entradas": entradas,
+        }
+
+
+_cache = None
+_trava_cache = threading.Lock()
+
+
+def obter_cache_respostas():
+    """Retorna o cache de respostas do processo."""
+    global _cache
+    with _trava_cache:
+        if _cache is None:
+            _cache = CacheRespostas()
+        return _cache
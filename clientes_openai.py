@@ -0,0 +1,83 @@
+"""
+Pool de clientes da OpenAI compartilhado pelo processo.
+
+Cada chave de API ganha um único cliente (e portanto um único pool de
+conexões HTTP com keep-alive), reaproveitado entre reruns e sessões do
+Streamlit. A chave é identificada pelo hash, nunca guardada como chave
+do dicionário. A validação da chave (models.list) roda uma vez, em
+segundo plano, quando a chave aparece pela primeira vez.
+"""
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+from openai import OpenAI
+
+log = logging.getLogger("gambot.openai")
+
+# Limite de chaves diferentes mantidas em memória (chaves personalizadas dos usuários)
+MAX_CLIENTES = 32
+
+_clientes = OrderedDict()   # hash da chave -> {"cliente", "validacao"}
+_trava = threading.Lock()
+
+
+def limpar_chave(api_key):
+    """Remove espaços e extrai a chave 'sk-...' se vier no meio de um texto maior."""
+    if not api_key or not api_key.strip():
+        return None
+    chave_limpa = api_key.strip()
+    if not chave_limpa.startswith("sk-"):
+        match = re.search(r'sk-[a-zA-Z0-9]{20,}', chave_limpa)
+        if not match:
+            return None
+        chave_limpa = match.group(0)
+    return chave_limpa
+
+
+def hash_chave(chave):
+    return hashlib.sha256(chave.encode()).hexdigest()
+
+
+def _validar(entrada):
+    """Testa a conexão uma única vez por chave, sem segurar a pergunta do usuário."""
+    try:
+        entrada["cliente"].models.list(timeout=5)
+        entrada["validacao"] = "ok"
+    except Exception as e:
+        log.warning("Aviso no teste de conexão: %s", e)
+        entrada["validacao"] = f"falhou: {type(e).__name__}"
+
+
+def obter_cliente(api_key):
+    """Retorna o cliente compartilhado para a chave, criando-o na primeira vez."""
+    chave = limpar_chave(api_key)
+    if not chave:
+        return None
+
+    identificador = hash_chave(chave)
+    with _trava:
+        entrada = _clientes.get(identificador)
+        if entrada is not None:
+            _clientes.move_to_end(identificador)
+            return entrada["cliente"]
+
+        # Sem as novas tentativas do próprio SDK: quem decide é o orçamento de resiliencia.py
+        entrada = {"cliente": OpenAI(api_key=chave, max_retries=0), "validacao": "pendente"}
+        _clientes[identificador] = entrada
+        while len(_clientes) > MAX_CLIENTES:
+            _clientes.popitem(last=False)
+
+    threading.Thread(target=_validar, args=(entrada,), name="gambot-valida-chave", daemon=True).start()
+    return entrada["cliente"]
+
+
+def status_chave(api_key):
+    """'pendente', 'ok', 'falhou: ...' ou None se a chave ainda não foi usada."""
+    chave = limpar_chave(api_key)
+    if not chave:
+        return None
+    entrada = _clientes.get(hash_chave(chave))
+    return entrada["validacao"] if entrada else None
@@ -0,0 +1,127 @@
+"""
+Configuração do Gambot (chave da API, modelo e opções), compartilhada pela
+interface Streamlit, pelo servidor HTTP e pela linha de comando.
+"""
+import logging
+import os
+
+from ia import MAX_TOKENS_PADRAO, MODELO_PADRAO
+from resiliencia import HEDGE_PADRAO, ORCAMENTO_PADRAO, TENTATIVAS_PADRAO
+
+log = logging.getLogger("gambot.configuracao")
+
+
+# Arquivos .env procurados, em ordem (um valor de um arquivo posterior substitui o anterior)
+LOCAIS_ARQUIVOS = [
+    ".env",
+    "api_key.env",
+    os.path.join(os.path.dirname(__file__), ".env"),
+    os.path.join(os.path.dirname(__file__), "api_key.env"),
+    "config/.env",
+    ".env.local",
+]
+
+
+def _ler_arquivos_env(locais=LOCAIS_ARQUIVOS):
+    """{NOME: (valor, arquivo)} com as linhas NOME=valor de todos os .env encontrados."""
+    valores = {}
+    for arquivo in locais:
+        if not os.path.exists(arquivo):
+            continue
+        try:
+            log.debug("Tentando carregar de: %s", arquivo)
+            with open(arquivo, "r", encoding="utf-8") as f:
+                for linha in f:
+                    linha = linha.strip()
+                    if linha.startswith("#") or "=" not in linha:
+                        continue
+                    nome, valor = linha.split("=", 1)
+                    valores[nome.strip()] = (valor.strip().strip('"').strip("'"), arquivo)
+        except Exception as e:
+            log.warning("Erro ao ler %s: %s", arquivo, e)
+    return valores
+
+
+def _sim(valor):
+    return valor.lower() in ("1", "true", "sim")
+
+
+def _numero(valor, origem, nome, padrao, tipo=float):
+    """Número positivo da opção; um valor inválido fica com o padrão (com aviso no log)."""
+    try:
+        numero = tipo(valor)
+    except ValueError:
+        numero = None
+    if numero is None or not numero > 0:
+        log.warning("%s inválido em %s (%r); usando %s", nome, origem, valor, padrao)
+        return padrao
+    return numero
+
+
+def carregar_configuracoes(segredos=None):
+    """
+    Lê chave da API, modelo e opções. A chave vem, nesta ordem, dos segredos
+    do Streamlit (se informados), da variável de ambiente OPENAI_API_KEY ou
+    dos arquivos .env em locais comuns. As opções (MODEL, STREAMING,
+    PREAQUECER_RESPOSTAS, ORCAMENTO_IA, TENTATIVAS_IA, HEDGE_IA) são lidas à parte, da
+    variável de ambiente de mesmo nome ou dos .env, seja qual for a origem
+    da chave.
+    """
+    config = {
+        "api_key": "",
+        "modelo": MODELO_PADRAO,
+        "max_tokens": MAX_TOKENS_PADRAO,
+        "streaming": True,
+        "preaquecer_respostas": False,
+        "orcamento_ia": ORCAMENTO_PADRAO,
+        "tentativas_ia": TENTATIVAS_PADRAO,
+        "hedge_ia": HEDGE_PADRAO
+    }
+    arquivos = _ler_arquivos_env()
+
+    def opcao(nome):
+        """(valor, origem) da opção: variável de ambiente antes dos .env."""
+        if os.environ.get(nome, "").strip():
+            return os.environ[nome].strip(), "ambiente"
+        return arquivos.get(nome, (None, None))
+
+    # Tenta o Streamlit Secrets
+    try:
+        if segredos is not None and "OPENAI_API_KEY" in segredos:
+            chave = segredos["OPENAI_API_KEY"]
+            if chave and chave.strip():
+                config["api_key"] = chave.strip()
+                log.info("Chave carregada via st.secrets")
+    except Exception as e:
+        log.debug("Erro lendo st.secrets: %s", e)
+
+    # Tenta a variável de ambiente e, por fim, os arquivos .env
+    if not config["api_key"]:
+        chave, origem = opcao("OPENAI_API_KEY")
+        if chave:
+            config["api_key"] = chave
+            if origem == "ambiente":
+                log.info("Chave carregada do ambiente")
+            else:
+                log.info("Chave encontrada em %s, comprimento: %d", origem, len(chave))
+
+    valor, origem = opcao("MODEL")
+    if valor:
+        config["modelo"] = valor
+    valor, origem = opcao("STREAMING")
+    if valor:
+        config["streaming"] = valor.lower() not in ("0", "false", "nao", "não")
+    valor, origem = opcao("PREAQUECER_RESPOSTAS")
+    if valor:
+        config["preaquecer_respostas"] = _sim(valor)
+    valor, origem = opcao("ORCAMENTO_IA")
+    if valor:
+        config["orcamento_ia"] = _numero(valor, origem, "ORCAMENTO_IA", ORCAMENTO_PADRAO)
+    valor, origem = opcao("TENTATIVAS_IA")
+    if valor:
+        config["tentativas_ia"] = _numero(valor, origem, "TENTATIVAS_IA", TENTATIVAS_PADRAO, int)
+    valor, origem = opcao("HEDGE_IA")
+    if valor:
+        config["hedge_ia"] = _sim(valor)
+
+    return config
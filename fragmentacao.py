@@ -0,0 +1,111 @@
+"""
+Divisão das páginas em trechos estruturais.
+
+Os regulamentos da UFPA seguem a estrutura legal (Art., §, incisos,
+alíneas) e a matriz curricular é uma tabela com uma linha por componente
+(código + nome + carga horária). Cada trecho é a unidade de busca e de
+contexto para a IA, e guarda a página e a posição de onde saiu.
+"""
+import re
+
+# Muda quando as regras de divisão mudam (refaz os trechos sem reextrair os PDFs)
+VERSAO_FRAGMENTOS = 1
+
+# Tamanho (em caracteres) que tentamos atingir juntando trechos pequenos
+TAMANHO_ALVO = 800
+# Acima disso um trecho é subdividido (§, incisos, alíneas ou espaço em branco)
+TAMANHO_MAXIMO = 1500
+
+RE_ARTIGO = re.compile(r"^[ \t]*Art\.?[ \t]*(\d+)", re.MULTILINE)
+
+# Início de uma nova unidade: artigo, títulos/capítulos/seções, blocos/níveis e linhas da matriz
+PADROES_PRIMARIOS = [
+    RE_ARTIGO,
+    re.compile(r"^[ \t]*(?:CAP[IÍ]TULO|SE[CÇ][AÃ]O|T[IÍ]TULO|ANEXO)\b", re.MULTILINE),
+    re.compile(r"^[ \t]*#{1,6}", re.MULTILINE),
+    re.compile(r"\b\d+[ºo°]\s*(?:N[ií]vel|Per[ií]odo|Semestre)\b"),
+    # Código de componente curricular (ex.: EC01077, ECO1080, TCO1005)
+    re.compile(r"\b[A-Z]{2,3}[0-9O][0-9]{3,4}\b"),
+]
+
+# Pontos de corte dentro de um artigo longo: parágrafos, incisos e alíneas
+PADROES_SECUNDARIOS = [
+    re.compile(r"^[ \t]*(?:§[ \t]*\d+|Par[áa]grafo [úu]nico)", re.MULTILINE),
+    re.compile(r"^[ \t]*[IVXLC]+[ \t]*[-–—)]", re.MULTILINE),
+    re.compile(r"^[ \t]*[a-z]\)", re.MULTILINE),
+]
+
+
+def _posicoes(texto, padroes, inicio=0, fim=None):
+    fim = len(texto) if fim is None else fim
+    return sorted({m.start() for p in padroes for m in p.finditer(texto, inicio, fim) if inicio < m.start() < fim})
+
+
+def _cortar_por_tamanho(texto, inicio, fim):
+    """Corta um intervalo sem marcadores no último espaço antes do tamanho alvo."""
+    pedacos = []
+    while fim - inicio > TAMANHO_MAXIMO:
+        corte = texto.rfind(" ", inicio + TAMANHO_ALVO // 2, inicio + TAMANHO_ALVO)
+        if corte <= inicio:
+            corte = inicio + TAMANHO_ALVO
+        pedacos.append((inicio, corte))
+        inicio = corte
+    pedacos.append((inicio, fim))
+    return pedacos
+
+
+def _subdividir(texto, inicio, fim):
+    """Subdivide uma unidade longa nos parágrafos/incisos/alíneas e, se preciso, por tamanho."""
+    cortes = [inicio] + _posicoes(texto, PADROES_SECUNDARIOS, inicio, fim) + [fim]
+    pedacos = []
+    for a, b in zip(cortes, cortes[1:]):
+        pedacos.extend(_cortar_por_tamanho(texto, a, b))
+    return pedacos
+
+
+def fragmentar_pagina(texto, rotulo=""):
+    """
+    Divide o texto de uma página em trechos [(inicio, fim, rotulo)].
+    `rotulo` é o artigo em andamento (vindo da página anterior); o último
+    artigo visto é devolvido junto para continuar na próxima página.
+    """
+    if not texto or not texto.strip():
+        return [], rotulo
+
+    cortes = [0] + _posicoes(texto, PADROES_PRIMARIOS) + [len(texto)]
+    pedacos = []
+    for a, b in zip(cortes, cortes[1:]):
+        if not texto[a:b].strip():
+            continue
+        if b - a > TAMANHO_MAXIMO:
+            pedacos.extend(_subdividir(texto, a, b))
+        else:
+            pedacos.append((a, b))
+
+    # Junta pedaços pequenos vizinhos (ex.: linhas da matriz), sem juntar dois artigos
+    intervalos = []
+    for a, b in pedacos:
+        if intervalos and not RE_ARTIGO.match(texto, a) and b - intervalos[-1][0] <= TAMANHO_ALVO:
+            intervalos[-1] = (intervalos[-1][0], b)
+        else:
+            intervalos.append((a, b))
+
+    fragmentos = []
+    for a, b in intervalos:
+        artigos = RE_ARTIGO.findall(texto, a, b)
+        rotulo_trecho = f"Art. {artigos[0]}" if artigos else rotulo
+        fragmentos.append((a, b, rotulo_trecho))
+        if artigos:
+            rotulo = f"Art. {artigos[-1]}"
+    return fragmentos, rotulo
+
+
+def fragmentar_documento(paginas):
+    """Trechos de todas as páginas de um documento: [{"pagina", "inicio", "fim", "rotulo"}]."""
+    fragmentos = []
+    rotulo = ""
+    for pagina in paginas:
+        trechos, rotulo = fragmentar_pagina(pagina["texto"], rotulo)
+        for inicio, fim, rotulo_trecho in trechos:
+            fragmentos.append({"pagina": pagina["numero"], "inicio": inicio, "fim": fim, "rotulo": rotulo_trecho})
+    return fragmentos
@@ -0,0 +1,209 @@
+"""Geração das respostas com a API da OpenAI a partir do contexto recuperado."""
+import itertools
+import logging
+import time
+
+from metricas import contar, observar
+from resiliencia import (ORCAMENTO_PADRAO, TENTATIVAS_PADRAO, IAIndisponivel, atraso_hedge, com_hedge,
+                         executar_com_orcamento, restante, verificar_prazo)
+
+log = logging.getLogger("gambot.openai")
+
+MODELO_PADRAO = "gpt-4o-mini"
+MAX_TOKENS_PADRAO = 800
+
+
+def montar_mensagens_ia(pergunta, contexto):
+    """Monta as mensagens (sistema + usuário) enviadas ao modelo."""
+    sistema_prompt = """Você é o Gambot, um assistente virtual especializado em regulamentos e 
+    procedimentos da Universidade Federal do Pará (UFPA).
+    
+    SUA MISSÃO:
+    Responder dúvidas acadêmicas baseando-se ESTRITAMENTE nos documentos fornecidos no contexto.
+    
+    REGRAS:
+    1. Contexto é a Verdade: Use APENAS o texto fornecido abaixo.
+    2. Citação Obrigatória: Para CADA afirmação, cite a fonte (Ex: "Segundo o Regulamento, Art. 15...").
+    3. Honestidade Intelectual: Se a resposta não estiver EXPLICITAMENTE no contexto, diga: "Não encontrei essa informação específica nos documentos fornecidos". NÃO invente. Se a resposta puder ser inferida claramente a partir do texto (ex: datas, prazos implícitos), explique a inferência e cite o trecho usado.
+    4. Clareza: Responda de forma direta, organizada (use tópicos se necessário) e em tom profissional/acadêmico.
+    
+    Contexto dos documentos (Trechos extraídos dos PDFs, com documento, página e artigo):
+    {contexto}
+    """
+    
+    prompt_usuario = f"""Pergunta do usuário: {pergunta}
+
+    Com base APENAS no contexto acima, responda à pergunta. Cite artigos, parágrafos e páginas sempre que possível."""
+    
+    return [
+        {"role": "system", "content": sistema_prompt.format(contexto=contexto)},
+        {"role": "user", "content": prompt_usuario}
+    ]
+
+
+def _registrar_tokens(modelo, uso, mensagens, resposta):
+    """Conta os tokens de entrada/saída informados pela API (ou estimados, se ela não informar)."""
+    if uso is not None:
+        contar("tokens", uso.prompt_tokens, tipo="entrada", modelo=modelo, fonte="api")
+        contar("tokens", uso.completion_tokens, tipo="saida", modelo=modelo, fonte="api")
+    else:
+        caracteres = sum(len(m["content"]) for m in mensagens)
+        contar("tokens", int(caracteres / 3.5), tipo="entrada", modelo=modelo, fonte="estimativa")
+        contar("tokens", int(len(resposta or "") / 3.5), tipo="saida", modelo=modelo, fonte="estimativa")
+
+
+class MensagemErro(str):
+    """Texto do erro (exibido como antes) que diz se o app deve cair na busca tradicional."""
+    degradado = False
+
+    @classmethod
+    def degradada(cls, texto):
+        mensagem = cls(texto)
+        mensagem.degradado = True
+        return mensagem
+
+
+def _timeout(prazo):
+    """Timeout da requisição: o que sobrou do orçamento (sem prazo, o padrão do cliente)."""
+    if prazo is None:
+        return {}
+    verificar_prazo(prazo)
+    return {"timeout": restante(prazo)}
+
+
+def transmitir_resposta_ia(pergunta, contexto, cliente_openai, modelo=MODELO_PADRAO, max_tokens=MAX_TOKENS_PADRAO,
+                           prazo=None, hedge=False):
+    """
+    Gera a resposta em streaming, devolvendo cada pedaço de texto assim que chega.
+    Com `prazo` (time.monotonic), interrompe com TempoEsgotado quando ele passa;
+    com `hedge`, dispara uma segunda requisição se o primeiro pedaço demorar mais que o p95.
+    """
+    mensagens = montar_mensagens_ia(pergunta, contexto)
+    inicio = time.perf_counter()
+
+    def abrir():
+        # Abre o stream e lê até o primeiro pedaço com texto: é o que o hedge disputa
+        stream = cliente_openai.chat.completions.create(
+            model=modelo,
+            messages=mensagens,
+            temperature=0.3,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            **_timeout(prazo),
+        )
+        iterador = iter(stream)
+        lidos = []
+        for pedaco in iterador:
+            lidos.append(pedaco)
+            if pedaco.choices and pedaco.choices[0].delta.content:
+                break
+        return stream, iterador, lidos
+
+    atraso = atraso_hedge("openai_primeiro_token", modelo=modelo) if hedge else None
+    stream, iterador, lidos = com_hedge(abrir, atraso, descartar=lambda aberto: aberto[0].close())
+
+    partes = []
+    uso = None
+    try:
+        for pedaco in itertools.chain(lidos, iterador):
+            # Com include_usage o último pedaço vem sem choices, só com o uso de tokens
+            if getattr(pedaco, "usage", None) is not None:
+                uso = pedaco.usage
+            if pedaco.choices and pedaco.choices[0].delta.content:
+                if not partes:
+                    observar("openai_primeiro_token", time.perf_counter() - inicio, modelo=modelo)
+                partes.append(pedaco.choices[0].delta.content)
+                yield pedaco.choices[0].delta.content
+            if prazo is not None:
+                verificar_prazo(prazo)
+    finally:
+        stream.close()
+    observar("openai", time.perf_counter() - inicio, modelo=modelo, streaming=True)
+    _registrar_tokens(modelo, uso, mensagens, "".join(partes))
+
+
+def _resposta_completa(pergunta, contexto, cliente_openai, modelo, max_tokens, prazo=None, hedge=False):
+    mensagens = montar_mensagens_ia(pergunta, contexto)
+    inicio = time.perf_counter()
+
+    def pedir():
+        return cliente_openai.chat.completions.create(
+            model=modelo,
+            messages=mensagens,
+            temperature=0.3,
+            max_tokens=max_tokens,
+            **_timeout(prazo),
+        )
+
+    atraso = atraso_hedge("openai", modelo=modelo, streaming=False) if hedge else None
+    response = com_hedge(pedir, atraso)
+    observar("openai", time.perf_counter() - inicio, modelo=modelo, streaming=False)
+
+    resposta = response.choices[0].message.content
+    _registrar_tokens(modelo, getattr(response, "usage", None), mensagens, resposta)
+    return resposta
+
+
+def gerar_resposta_ia(pergunta, contexto, cliente_openai, modelo=MODELO_PADRAO, max_tokens=MAX_TOKENS_PADRAO, ao_receber=None,
+                      orcamento=ORCAMENTO_PADRAO, hedge=False, disjuntor=None, tentativas=TENTATIVAS_PADRAO):
+    """
+    Gera resposta usando a OpenAI API.
+    Se `ao_receber` for informado, usa streaming e chama ao_receber(texto_parcial) a cada pedaço
+    (numa nova tentativa o texto recomeça do zero).
+    Falhas passageiras são repetidas dentro de `orcamento` segundos; se mesmo assim não houver
+    resposta, o erro vem como MensagemErro com `degradado` verdadeiro. Sem `disjuntor`,
+    usa o disjuntor compartilhado do processo.
+    """
+    if not cliente_openai:
+        return None, "API Key não configurada ou inválida."
+
+    if ao_receber is not None:
+        def tentativa(prazo):
+            partes = []
+            for pedaco in transmitir_resposta_ia(pergunta, contexto, cliente_openai, modelo, max_tokens, prazo, hedge):
+                partes.append(pedaco)
+                ao_receber("".join(partes))
+            return "".join(partes)
+    else:
+        def tentativa(prazo):
+            return _resposta_completa(pergunta, contexto, cliente_openai, modelo, max_tokens, prazo, hedge)
+
+    try:
+        return executar_com_orcamento(tentativa, orcamento, tentativas, disjuntor), None
+    except IAIndisponivel as e:
+        return None, MensagemErro.degradada(str(e))
+    except Exception as e:
+        return None, _mensagem_erro(e)
+
+
+async def gerar_resposta_ia_async(pergunta, contexto, cliente_openai, modelo=MODELO_PADRAO, max_tokens=MAX_TOKENS_PADRAO):
+    """Mesma resposta de gerar_resposta_ia (sem streaming) com o cliente AsyncOpenAI, para o modo em lote."""
+    if not cliente_openai:
+        return None, "API Key não configurada ou inválida."
+    
+    try:
+        mensagens = montar_mensagens_ia(pergunta, contexto)
+        inicio = time.perf_counter()
+        response = await cliente_openai.chat.completions.create(
+            model=modelo,
+            messages=mensagens,
+            temperature=0.3,
+            max_tokens=max_tokens,
+        )
+        observar("openai", time.perf_counter() - inicio, modelo=modelo, streaming=False)
+        
+        resposta = response.choices[0].message.content
+        _registrar_tokens(modelo, getattr(response, "usage", None), mensagens, resposta)
+        return resposta, None
+    
+    except Exception as e:
+        return None, _mensagem_erro(e)
+
+
+def _mensagem_erro(e):
+    error_type = type(e).__name__
+    error_msg = str(e)
+    contar("erros_openai", tipo=error_type)
+    log.error("Erro na API OpenAI - Tipo: %s, Mensagem: %s", error_type, error_msg)
+    return f"Erro na API da OpenAI ({error_type}): {error_msg[:200]}"
@@ -0,0 +1,235 @@
+"""
+Índice invertido dos trechos dos documentos com ranking BM25.
+
+O índice é montado a partir dos trechos guardados pela ingestão: para
+cada termo guardamos a lista de trechos onde ele aparece e quantas
+vezes (postings), as posições do termo no texto normalizado do trecho,
+além do tamanho de cada trecho. Uma busca só percorre os postings dos
+termos da pergunta, não o corpus inteiro, e os destaques dos resultados
+saem das posições, sem varrer o texto de novo.
+"""
+import bisect
+import hashlib
+import heapq
+import math
+import re
+from array import array
+from functools import lru_cache
+
+from ingestao import normalizar_texto, posicao_normalizada
+
+# Parâmetros clássicos do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_RE_TOKEN = re.compile(r"\w+")
+
+
+def radical(token):
+    """Reduz o plural simples para que 'disciplinas' e 'disciplina' caiam no mesmo termo."""
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenizar(texto_norm):
+    """Quebra um texto já normalizado em termos do índice."""
+    return [radical(t) for t in _RE_TOKEN.findall(texto_norm)]
+
+
+@lru_cache(maxsize=4096)
+def tokens_do_termo(termo):
+    """Tokens de um termo da busca (palavra ou expressão), normalizado uma vez por termo."""
+    return frozenset(tokenizar(normalizar_texto(termo)))
+
+
+def fim_token(texto_norm, posicao):
+    """Posição logo depois do token que começa em `posicao`."""
+    return _RE_TOKEN.match(texto_norm, posicao).end()
+
+
+class Segmento:
+    """Parte do índice referente a um único documento (reaproveitada enquanto o PDF não muda)."""
+
+    def __init__(self, documento):
+        self.hash = documento["hash"]
+        self.fragmentos = []     # trechos do documento, na ordem do texto
+        self.comprimentos = []
+        self.postings = {}       # termo -> [(posição em self.fragmentos, frequência, posições no texto_norm)]
+        self.maximos = {}        # termo -> (maior frequência, menor trecho) entre os trechos que o contêm
+        self.total_paginas = sum(1 for p in documento["paginas"] if p["texto"])
+
+        paginas = {pagina["numero"]: pagina for pagina in documento["paginas"]}
+        for fragmento in documento["fragmentos"]:
+            pagina = paginas[fragmento["pagina"]]
+            mapa = pagina["mapa_norm"]
+            inicio_norm = posicao_normalizada(mapa, fragmento["inicio"])
+            texto = pagina["texto"][fragmento["inicio"]:fragmento["fim"]]
+            texto_norm = pagina["texto_norm"][inicio_norm:posicao_normalizada(mapa, fragmento["fim"])]
+            local = len(self.fragmentos)
+            # O mapa é o da página inteira (compartilhado pelos trechos dela)
+            self.fragmentos.append(dict(fragmento, texto=texto, texto_norm=texto_norm,
+                                        inicio_norm=inicio_norm, mapa_norm=mapa))
+
+            posicoes = {}
+            comprimento = 0
+            for m in _RE_TOKEN.finditer(texto_norm):
+                posicoes.setdefault(radical(m.group()), array("I")).append(m.start())
+                comprimento += 1
+            for token, lista in posicoes.items():
+                self.postings.setdefault(token, []).append((local, len(lista), lista))
+                maior_tf, menor = self.maximos.get(token, (0, comprimento))
+                self.maximos[token] = (max(maior_tf, len(lista)), min(menor, comprimento))
+            self.comprimentos.append(comprimento)
+
+
+class Indice:
+    """
+    Índice invertido em memória: termo -> [(id do trecho, frequência, posições)].
+    A unidade indexada é o trecho estrutural (artigo, parágrafo, linha da
+    matriz), que guarda o arquivo e a página de origem. Montado a partir dos
+    segmentos de cada documento; passando o índice anterior em `base`, só os
+    documentos novos ou alterados são tokenizados de novo.
+    """
+
+    def __init__(self, documentos, base=None):
+        anteriores = base.segmentos if base is not None else {}
+        self.segmentos = {}
+        self.segmentos_em_ordem = []
+        self.fragmentos = []     # id do trecho -> {"arquivo", "pagina", "rotulo", "inicio", "fim", "texto", "texto_norm", ...}
+        self.comprimentos = []   # id do trecho -> quantidade de termos
+        self.postings = {}
+        self.maximos = {}
+        self.total_paginas = 0
+
+        for documento in documentos:
+            segmento = anteriores.get(documento["hash"]) or self.segmentos.get(documento["hash"])
+            if segmento is None:
+                segmento = Segmento(documento)
+            self.segmentos[documento["hash"]] = segmento
+            self.segmentos_em_ordem.append(segmento)
+
+            deslocamento = len(self.fragmentos)
+            for fragmento in segmento.fragmentos:
+                self.fragmentos.append(dict(fragmento, arquivo=documento["arquivo"]))
+            self.comprimentos.extend(segmento.comprimentos)
+            self.total_paginas += segmento.total_paginas
+            for token, postings in segmento.postings.items():
+                self.postings.setdefault(token, []).extend(
+                    (deslocamento + local, tf, posicoes) for local, tf, posicoes in postings
+                )
+            for token, (maior_tf, menor) in segmento.maximos.items():
+                anterior = self.maximos.get(token)
+                self.maximos[token] = (max(maior_tf, anterior[0]), min(menor, anterior[1])) if anterior else (maior_tf, menor)
+
+        # Identifica a versão do corpus indexado (muda quando qualquer PDF muda)
+        self.versao = hashlib.sha256(
+            "|".join(f"{d['arquivo']}:{d['hash']}" for d in documentos).encode()
+        ).hexdigest()[:16]
+        self.arquivos = [d["arquivo"] for d in documentos]
+        self.total_fragmentos = len(self.fragmentos)
+        self.comprimento_medio = (sum(self.comprimentos) / self.total_fragmentos) if self.total_fragmentos else 0.0
+        # Parte do BM25 que só depende do tamanho do trecho, calculada uma vez
+        self.normas = [self._norma(c) for c in self.comprimentos]
+
+        # Busca vetorial (vetorial.IndiceVetorial), montada pelo observador antes da troca do índice
+        self.vetorial = None
+
+    # Acesso aos postings; o índice em disco (indice_disco.IndiceMapeado) lê os mesmos dados do mmap
+
+    def frequencia_documentos(self, token):
+        """Em quantos trechos o termo aparece."""
+        return len(self.postings.get(token, ()))
+
+    def postings_do_termo(self, token):
+        """[(id do trecho, frequência, posições)] em ordem de id, ou None."""
+        return self.postings.get(token)
+
+    def maximos_do_termo(self, token):
+        """(maior frequência, menor trecho) entre os trechos que contêm o termo, ou None."""
+        return self.maximos.get(token)
+
+    def idf(self, token):
+        df = self.frequencia_documentos(token)
+        return math.log(1 + (self.total_fragmentos - df + 0.5) / (df + 0.5))
+
+    def _norma(self, comprimento):
+        return BM25_K1 * (1 - BM25_B + BM25_B * comprimento / self.comprimento_medio)
+
+    def limite_superior(self, token):
+        """
+        Pontuação máxima que o termo sozinho pode dar a um trecho (maior
+        frequência no menor trecho), usada para descartar trechos cedo.
+        """
+        maior_tf, menor = self.maximos_do_termo(token) or (0, 0)
+        if not maior_tf:
+            return 0.0
+        return self.idf(token) * (BM25_K1 + 1) * maior_tf / (maior_tf + self._norma(menor))
+
+    def buscar(self, termos, limite=10):
+        """
+        Pontua os trechos com BM25 para os termos (palavras ou expressões) informados.
+        Retorna [(id do trecho, pontos, termos encontrados, {token: posições})]
+        do mais para o menos relevante.
+        """
+        if not self.total_fragmentos:
+            return []
+
+        # Cada termo pode ter mais de uma palavra (ex.: "componente curricular")
+        tokens_por_termo = {termo: tokens_do_termo(termo) for termo in termos}
+        tokens_por_termo = {termo: tokens for termo, tokens in tokens_por_termo.items() if tokens}
+        tokens_consulta = set().union(*tokens_por_termo.values()) if tokens_por_termo else set()
+
+        # Termos do mais para o menos valioso (estilo MaxScore): quando o que
+        # os termos restantes podem somar não alcança o k-ésimo melhor trecho,
+        # nenhum trecho novo entra no top-k e só os candidatos são atualizados
+        ordenados = sorted((t for t in tokens_consulta if self.frequencia_documentos(t)),
+                           key=self.limite_superior, reverse=True)
+        restante = sum(self.limite_superior(t) for t in ordenados)
+
+        pontos = {}
+        normas = self.normas
+        for token in ordenados:
+            postings = self.postings_do_termo(token)
+            peso = self.idf(token) * (BM25_K1 + 1)
+            limiar = heapq.nlargest(limite, pontos.values())[-1] if len(pontos) >= limite else 0.0
+
+            if restante > limiar:
+                for id_trecho, tf, _ in postings:
+                    pontos[id_trecho] = pontos.get(id_trecho, 0.0) + peso * tf / (tf + normas[id_trecho])
+            else:
+                # Descarta quem não alcança o limiar nem somando tudo o que falta
+                pontos = {i: p for i, p in pontos.items() if p + restante > limiar or p >= limiar}
+                if len(pontos) * 8 < len(postings):
+                    for id_trecho in pontos:
+                        j = bisect.bisect_left(postings, (id_trecho,))
+                        if j < len(postings) and postings[j][0] == id_trecho:
+                            tf = postings[j][1]
+                            pontos[id_trecho] += peso * tf / (tf + normas[id_trecho])
+                else:
+                    for id_trecho, tf, _ in postings:
+                        if id_trecho in pontos:
+                            pontos[id_trecho] += peso * tf / (tf + normas[id_trecho])
+            restante -= self.limite_superior(token)
+
+        # Heap limitado a `limite` itens em vez de ordenar todos os trechos pontuados;
+        # termos encontrados e posições só são lidos nos vencedores
+        melhores = heapq.nlargest(limite, pontos.items(), key=lambda item: item[1])
+        resultados = []
+        for id_trecho, pontuacao in melhores:
+            posicoes = self.posicoes(id_trecho, tokens_consulta)
+            termos_encontrados = [t for t, tokens in tokens_por_termo.items() if tokens <= posicoes.keys()]
+            resultados.append((id_trecho, pontuacao, termos_encontrados, posicoes))
+        return resultados
+
+    def posicoes(self, id_trecho, tokens):
+        """{token: posições no texto_norm do trecho} para os tokens que aparecem nele."""
+        encontradas = {}
+        for token in tokens:
+            postings = self.postings_do_termo(token)
+            if not postings:
+                continue
+            i = bisect.bisect_left(postings, (id_trecho,))
+            if i < len(postings) and postings[i][0] == id_trecho:
+                encontradas[token] = postings[i][2]
+        return encontradas
@@ -0,0 +1,505 @@
+"""
+Índice em disco, aberto com mmap.
+
+Formato compacto e versionado com tudo o que a busca precisa: tabela de
+termos, postings em arrays (ids, frequências e posições), tabela de
+páginas (texto, texto original com cabeçalhos e rodapés, texto normalizado,
+mapa de posições, tipo e dados do OCR), tabela de trechos e
+a matriz da busca vetorial. Os processos que abrem o mesmo arquivo (réplicas
+do Streamlit, servidor HTTP) compartilham o cache de páginas do sistema
+operacional: a abertura é quase instantânea e a memória residente não
+cresce com o número de réplicas.
+
+O arquivo é montado offline, por exemplo na construção do contêiner:
+
+    python motor.py build-index
+
+Layout: prefixo fixo (MAGICO, versão do formato, posição e tamanho do
+cabeçalho), seções alinhadas em 8 bytes e, no fim, o cabeçalho em JSON
+com os metadados e a posição/tamanho/formato de cada seção.
+"""
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Sequence
+from functools import lru_cache
+
+import numpy as np
+
+from fragmentacao import VERSAO_FRAGMENTOS
+from indice import Indice
+from ingestao import PASTA_CACHE, PASTA_DADOS, VERSAO_CACHE, calcular_hash, carregar_corpus
+from vetorial import DIMENSAO, TAMANHO_NGRAMA, IndiceVetorial
+
+log = logging.getLogger("gambot.indice_disco")
+
+MAGICO = b"GAMBOTIX"
+# Muda quando o layout do arquivo muda (arquivos antigos são recusados e o índice é montado em memória)
+VERSAO_FORMATO = 2
+
+# Nome do arquivo dentro da pasta dos PDFs
+ARQUIVO_INDICE = os.environ.get("GAMBOT_ARQUIVO_INDICE", "indice.gbi")
+
+_PREFIXO = struct.Struct("<8sIQQ")   # mágico, versão do formato, posição e tamanho do cabeçalho
+_ALINHAMENTO = 8
+
+
+def caminho_indice(pasta=PASTA_DADOS):
+    return os.path.join(pasta, ARQUIVO_INDICE)
+
+
+def _tabela_textos(textos):
+    """(posições de início em bytes, conteúdo UTF-8 concatenado) de uma lista de textos."""
+    inicios = array("Q", [0])
+    partes = []
+    total = 0
+    for texto in textos:
+        dados = texto.encode("utf-8")
+        partes.append(dados)
+        total += len(dados)
+        inicios.append(total)
+    return inicios, b"".join(partes)
+
+
+class _Escritor:
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.posicao = _PREFIXO.size
+        self.secoes = {}
+        arquivo.write(b"\0" * _PREFIXO.size)
+
+    def secao(self, nome, dados, formato):
+        preenchimento = -self.posicao % _ALINHAMENTO
+        self.arquivo.write(b"\0" * preenchimento)
+        self.posicao += preenchimento
+        dados = memoryview(dados).cast("B")
+        self.secoes[nome] = [self.posicao, len(dados), formato]
+        self.arquivo.write(dados)
+        self.posicao += len(dados)
+
+    def finalizar(self, cabecalho):
+        dados = json.dumps(dict(cabecalho, secoes=self.secoes), ensure_ascii=False).encode("utf-8")
+        self.arquivo.write(dados)
+        self.arquivo.seek(0)
+        self.arquivo.write(_PREFIXO.pack(MAGICO, VERSAO_FORMATO, self.posicao, len(dados)))
+
+
+def gravar_indice(indice, documentos, caminho, pasta=PASTA_DADOS):
+    """Grava o índice (com o vetorial já montado) no formato em disco, de forma atômica."""
+    # Páginas de todos os documentos, na ordem do índice
+    id_pagina = {}
+    paginas = []
+    inicio_documento = array("Q", [0])
+    for numero_documento, documento in enumerate(documentos):
+        for pagina in documento["paginas"]:
+            id_pagina[(documento["arquivo"], pagina["numero"])] = len(paginas)
+            paginas.append((numero_documento, pagina))
+        inicio_documento.append(len(paginas))
+
+    # Tipo da página (texto, imagem ou vazia) como número; OCR só das páginas que passaram por ele
+    tipos = {}
+    tipos_paginas = array("B", (tipos.setdefault(p.get("tipo", "texto"), len(tipos)) for _, p in paginas))
+    ocr = {str(i): p["ocr"] for i, (_, p) in enumerate(paginas) if p.get("ocr")}
+
+    mapas = array("i")
+    inicio_mapa = array("Q", [0])
+    for _, pagina in paginas:
+        for pos_norm, deslocamento in pagina["mapa_norm"]:
+            mapas.extend((pos_norm, deslocamento))
+        inicio_mapa.append(len(mapas) // 2)
+
+    rotulos = {}
+    trechos = {nome: array("I") for nome in ("pagina", "inicio", "fim", "inicio_norm", "fim_norm", "rotulo")}
+    for fragmento in indice.fragmentos:
+        trechos["pagina"].append(id_pagina[(fragmento["arquivo"], fragmento["pagina"])])
+        trechos["inicio"].append(fragmento["inicio"])
+        trechos["fim"].append(fragmento["fim"])
+        trechos["inicio_norm"].append(fragmento["inicio_norm"])
+        trechos["fim_norm"].append(fragmento["inicio_norm"] + len(fragmento["texto_norm"]))
+        trechos["rotulo"].append(rotulos.setdefault(fragmento["rotulo"], len(rotulos)))
+
+    # Termos em ordem de bytes UTF-8 (a mesma ordem usada na busca binária)
+    termos = sorted(indice.postings, key=lambda t: t.encode("utf-8"))
+    inicio_postings = array("Q", [0])
+    maior_tf, menor = array("I"), array("I")
+    ids, frequencias = array("I"), array("I")
+    posicoes, inicio_posicoes = array("I"), array("Q", [0])
+    for termo in termos:
+        for id_trecho, tf, lista in indice.postings[termo]:
+            ids.append(id_trecho)
+            frequencias.append(tf)
+            posicoes.extend(lista)
+            inicio_posicoes.append(len(posicoes))
+        inicio_postings.append(len(ids))
+        maximo, minimo = indice.maximos[termo]
+        maior_tf.append(maximo)
+        menor.append(minimo)
+
+    arquivos = []
+    for documento in documentos:
+        info = os.stat(os.path.join(pasta, documento["arquivo"]))
+        arquivos.append({
+            "arquivo": documento["arquivo"],
+            "hash": documento["hash"],
+            "tamanho": info.st_size,
+            "mtime": info.st_mtime,
+        })
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as f:
+        escritor = _Escritor(f)
+        for nome, textos in (("termos", termos), ("rotulos", list(rotulos)),
+                             ("paginas_texto", [p["texto"] for _, p in paginas]),
+                             ("paginas_bruto", [p.get("texto_bruto", "") for _, p in paginas]),
+                             ("paginas_norm", [p["texto_norm"] for _, p in paginas])):
+            inicios, conteudo = _tabela_textos(textos)
+            escritor.secao(f"{nome}_inicio", inicios, "Q")
+            escritor.secao(nome, conteudo, "B")
+        escritor.secao("termos_postings", inicio_postings, "Q")
+        escritor.secao("termos_maior_tf", maior_tf, "I")
+        escritor.secao("termos_menor", menor, "I")
+        escritor.secao("postings_ids", ids, "I")
+        escritor.secao("postings_tf", frequencias, "I")
+        escritor.secao("postings_posicoes", inicio_posicoes, "Q")
+        escritor.secao("posicoes", posicoes, "I")
+        escritor.secao("paginas_documento", array("I", (d for d, _ in paginas)), "I")
+        escritor.secao("paginas_numero", array("I", (p["numero"] for _, p in paginas)), "I")
+        escritor.secao("paginas_tipo", tipos_paginas, "B")
+        escritor.secao("paginas_mapa", inicio_mapa, "Q")
+        escritor.secao("mapas", mapas, "i")
+        escritor.secao("documentos_paginas", inicio_documento, "Q")
+        for nome, valores in trechos.items():
+            escritor.secao(f"trechos_{nome}", valores, "I")
+        escritor.secao("comprimentos", array("I", indice.comprimentos), "I")
+        escritor.secao("normas", array("d", indice.normas), "d")
+
+        vetorial = indice.vetorial
+        escritor.secao("vetorial_ponteiros", np.ascontiguousarray(vetorial.ponteiros, dtype=np.int64), "q")
+        escritor.secao("vetorial_colunas", np.ascontiguousarray(vetorial.colunas, dtype=np.int32), "i")
+        escritor.secao("vetorial_valores", np.ascontiguousarray(vetorial.valores, dtype=np.float32), "f")
+        escritor.secao("vetorial_linhas", np.ascontiguousarray(vetorial.linhas, dtype=np.int32), "i")
+        escritor.secao("vetorial_idf", np.ascontiguousarray(vetorial.idf, dtype=np.float32), "f")
+
+        escritor.finalizar({
+            "versao": indice.versao,
+            "criado_em": time.time(),
+            "ordem_bytes": sys.byteorder,
+            "versao_cache": VERSAO_CACHE,
+            "versao_fragmentos": VERSAO_FRAGMENTOS,
+            "dimensao": DIMENSAO,
+            "tamanho_ngrama": TAMANHO_NGRAMA,
+            "arquivos": arquivos,
+            "tipos_paginas": list(tipos),
+            "ocr_paginas": ocr,
+            "total_paginas": indice.total_paginas,
+            "total_fragmentos": indice.total_fragmentos,
+            "comprimento_medio": indice.comprimento_medio,
+        })
+    os.replace(temporario, caminho)
+
+
+class _Textos(Sequence):
+    """Tabela de textos UTF-8 do arquivo (decodificados só quando lidos)."""
+
+    def __init__(self, inicios, conteudo):
+        self.inicios = inicios
+        self.conteudo = conteudo
+
+    def __len__(self):
+        return len(self.inicios) - 1
+
+    def bytes(self, i):
+        return self.conteudo[self.inicios[i]:self.inicios[i + 1]].tobytes()
+
+    def __getitem__(self, i):
+        return self.bytes(i).decode("utf-8")
+
+
+class _ChavesTermos(Sequence):
+    """Termos como bytes, para a busca binária com bisect."""
+
+    def __init__(self, textos):
+        self.textos = textos
+
+    def __len__(self):
+        return len(self.textos)
+
+    def __getitem__(self, i):
+        return self.textos.bytes(i)
+
+
+class _Postings(Sequence):
+    """
+    Postings de um termo, lidos direto das fatias do arquivo: cada item é
+    (id do trecho, frequência, número do posting) e só vira tupla quando lido.
+    """
+
+    def __init__(self, ids, frequencias, inicio):
+        self.ids = ids
+        self.frequencias = frequencias
+        self.inicio = inicio
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return zip(self.ids, self.frequencias, range(self.inicio, self.inicio + len(self.ids)))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return (self.ids[i], self.frequencias[i], self.inicio + i)
+
+
+class _Trechos(Sequence):
+    """indice.fragmentos do índice em disco: monta o dicionário do trecho quando é lido."""
+
+    def __init__(self, indice):
+        self.indice = indice
+
+    def __len__(self):
+        return self.indice.total_fragmentos
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.indice.trecho(i)
+
+
+class _Paginas(Sequence):
+    """Páginas de um documento do índice em disco (documento["paginas"])."""
+
+    def __init__(self, indice, inicio, fim):
+        self.indice = indice
+        self.inicio = inicio
+        self.fim = fim
+
+    def __len__(self):
+        return self.fim - self.inicio
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.indice.pagina(self.inicio + i)
+
+
+class IndiceMapeado(Indice):
+    """
+    Mesma interface de busca do Indice, lendo termos, postings, trechos e
+    páginas direto do arquivo mapeado em memória. Não guarda segmentos: a
+    primeira reindexação depois de uma mudança nos PDFs monta o índice em
+    memória do zero.
+    """
+
+    def __init__(self, caminho):
+        with open(caminho, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _PREFIXO.size:
+            raise ValueError("Arquivo de índice incompleto")
+        magico, versao_formato, posicao, tamanho = _PREFIXO.unpack_from(self._mmap, 0)
+        if magico != MAGICO:
+            raise ValueError("Não é um arquivo de índice do Gambot")
+        if versao_formato != VERSAO_FORMATO:
+            raise ValueError(f"Formato de índice {versao_formato} (esperado {VERSAO_FORMATO})")
+        cabecalho = json.loads(self._mmap[posicao:posicao + tamanho].decode("utf-8"))
+        esperado = {
+            "ordem_bytes": sys.byteorder,
+            "versao_cache": VERSAO_CACHE,
+            "versao_fragmentos": VERSAO_FRAGMENTOS,
+            "dimensao": DIMENSAO,
+            "tamanho_ngrama": TAMANHO_NGRAMA,
+        }
+        for chave, valor in esperado.items():
+            if cabecalho.get(chave) != valor:
+                raise ValueError(f"Índice em disco desatualizado ({chave}: {cabecalho.get(chave)} != {valor})")
+
+        self.caminho = caminho
+        self.cabecalho = cabecalho
+        memoria = memoryview(self._mmap)
+        secoes = cabecalho["secoes"]
+
+        def secao(nome):
+            inicio, tamanho, formato = secoes[nome]
+            return memoria[inicio:inicio + tamanho].cast(formato)
+
+        def secao_numpy(nome, tipo):
+            inicio, tamanho, _ = secoes[nome]
+            return np.frombuffer(self._mmap, dtype=tipo, count=tamanho // np.dtype(tipo).itemsize, offset=inicio)
+
+        self._termos = _Textos(secao("termos_inicio"), secao("termos"))
+        self._chaves_termos = _ChavesTermos(self._termos)
+        self._rotulos = _Textos(secao("rotulos_inicio"), secao("rotulos"))
+        self._paginas_texto = _Textos(secao("paginas_texto_inicio"), secao("paginas_texto"))
+        self._paginas_bruto = _Textos(secao("paginas_bruto_inicio"), secao("paginas_bruto"))
+        self._paginas_norm = _Textos(secao("paginas_norm_inicio"), secao("paginas_norm"))
+        self._inicio_postings = secao("termos_postings")
+        self._maior_tf = secao("termos_maior_tf")
+        self._menor = secao("termos_menor")
+        self._ids = secao("postings_ids")
+        self._frequencias = secao("postings_tf")
+        self._inicio_posicoes = secao("postings_posicoes")
+        self._posicoes = secao("posicoes")
+        self._paginas_documento = secao("paginas_documento")
+        self._paginas_numero = secao("paginas_numero")
+        self._paginas_tipo = secao("paginas_tipo")
+        self._inicio_mapa = secao("paginas_mapa")
+        self._mapas = secao("mapas")
+        self._trechos = {nome: secao(f"trechos_{nome}")
+                         for nome in ("pagina", "inicio", "fim", "inicio_norm", "fim_norm", "rotulo")}
+
+        self.versao = cabecalho["versao"]
+        self.arquivos = [a["arquivo"] for a in cabecalho["arquivos"]]
+        self.total_paginas = cabecalho["total_paginas"]
+        self.total_fragmentos = cabecalho["total_fragmentos"]
+        self.comprimento_medio = cabecalho["comprimento_medio"]
+        self.comprimentos = secao("comprimentos")
+        self.normas = secao("normas")
+        self.fragmentos = _Trechos(self)
+        self.segmentos = {}
+        self.segmentos_em_ordem = []
+
+        inicio_documento = secao("documentos_paginas")
+        self.documentos = [
+            {"arquivo": a["arquivo"], "hash": a["hash"], "paginas": _Paginas(self, inicio_documento[i], inicio_documento[i + 1])}
+            for i, a in enumerate(cabecalho["arquivos"])
+        ]
+
+        self.vetorial = IndiceVetorial.de_arrays(
+            secao_numpy("vetorial_ponteiros", np.int64),
+            secao_numpy("vetorial_colunas", np.int32),
+            secao_numpy("vetorial_valores", np.float32),
+            secao_numpy("vetorial_linhas", np.int32),
+            secao_numpy("vetorial_idf", np.float32),
+        )
+        self._posicao_termo = lru_cache(maxsize=4096)(self._procurar_termo)
+
+    def _procurar_termo(self, token):
+        chave = token.encode("utf-8")
+        i = bisect.bisect_left(self._chaves_termos, chave)
+        if i < len(self._chaves_termos) and self._chaves_termos[i] == chave:
+            return i
+        return -1
+
+    def frequencia_documentos(self, token):
+        i = self._posicao_termo(token)
+        return self._inicio_postings[i + 1] - self._inicio_postings[i] if i >= 0 else 0
+
+    def postings_do_termo(self, token):
+        # O terceiro item é o número do posting no arquivo (as posições são lidas em posicoes())
+        i = self._posicao_termo(token)
+        if i < 0:
+            return None
+        a, b = self._inicio_postings[i], self._inicio_postings[i + 1]
+        # Fatias de memoryview não copiam: termos frequentes não viram listas a cada consulta
+        return _Postings(self._ids[a:b], self._frequencias[a:b], a)
+
+    def maximos_do_termo(self, token):
+        i = self._posicao_termo(token)
+        return (self._maior_tf[i], self._menor[i]) if i >= 0 else None
+
+    def posicoes(self, id_trecho, tokens):
+        encontradas = {}
+        for token in tokens:
+            i = self._posicao_termo(token)
+            if i < 0:
+                continue
+            a, b = self._inicio_postings[i], self._inicio_postings[i + 1]
+            j = bisect.bisect_left(self._ids, id_trecho, a, b)
+            if j < b and self._ids[j] == id_trecho:
+                encontradas[token] = self._posicoes[self._inicio_posicoes[j]:self._inicio_posicoes[j + 1]]
+        return encontradas
+
+    def _mapa(self, id_pagina):
+        a, b = self._inicio_mapa[id_pagina], self._inicio_mapa[id_pagina + 1]
+        valores = self._mapas[2 * a:2 * b]
+        return [[valores[k], valores[k + 1]] for k in range(0, len(valores), 2)]
+
+    def pagina(self, id_pagina):
+        # Mesmas chaves da página extraída: "texto_bruto" e "ocr" só quando existem
+        pagina = {
+            "numero": self._paginas_numero[id_pagina],
+            "tipo": self.cabecalho["tipos_paginas"][self._paginas_tipo[id_pagina]],
+            "texto": self._paginas_texto[id_pagina],
+            "texto_norm": self._paginas_norm[id_pagina],
+            "mapa_norm": self._mapa(id_pagina),
+        }
+        ocr = self.cabecalho["ocr_paginas"].get(str(id_pagina))
+        if ocr:
+            pagina["ocr"] = ocr
+        bruto = self._paginas_bruto[id_pagina]
+        if bruto:
+            pagina["texto_bruto"] = bruto
+        return pagina
+
+    def trecho(self, id_trecho):
+        trechos = self._trechos
+        id_pagina = trechos["pagina"][id_trecho]
+        inicio, fim = trechos["inicio"][id_trecho], trechos["fim"][id_trecho]
+        inicio_norm, fim_norm = trechos["inicio_norm"][id_trecho], trechos["fim_norm"][id_trecho]
+        return {
+            "arquivo": self.arquivos[self._paginas_documento[id_pagina]],
+            "pagina": self._paginas_numero[id_pagina],
+            "rotulo": self._rotulos[trechos["rotulo"][id_trecho]],
+            "inicio": inicio,
+            "fim": fim,
+            "texto": self._paginas_texto[id_pagina][inicio:fim],
+            "texto_norm": self._paginas_norm[id_pagina][inicio_norm:fim_norm],
+            "inicio_norm": inicio_norm,
+            "mapa_norm": self._mapa(id_pagina),
+        }
+
+    def corresponde(self, pasta, foto):
+        """True se o índice foi montado com os mesmos PDFs da foto da pasta (observador.fotografar_pasta)."""
+        registrados = {a["arquivo"]: a for a in self.cabecalho["arquivos"]}
+        if registrados.keys() != foto.keys():
+            return False
+        for nome, (tamanho, mtime) in foto.items():
+            registrado = registrados[nome]
+            if registrado["tamanho"] != tamanho:
+                return False
+            # Data diferente (ex.: cópia para o contêiner) não basta: confere o conteúdo
+            if registrado["mtime"] != mtime and calcular_hash(os.path.join(pasta, nome)) != registrado["hash"]:
+                return False
+        return True
+
+
+def abrir_indice(caminho):
+    """Abre o índice em disco ou retorna None (com aviso no log) se não existir ou não servir."""
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return IndiceMapeado(caminho)
+    except (OSError, ValueError, KeyError) as e:
+        log.warning("Índice em disco %s ignorado: %s", caminho, e)
+        return None
+
+
+def montar_indice_em_disco(pasta=PASTA_DADOS, caminho=None, trabalhadores=None):
+    """Extrai (ou lê do cache) os PDFs da pasta, monta o índice e grava o arquivo. Retorna um resumo."""
+    caminho = caminho or caminho_indice(pasta)
+    inicio = time.perf_counter()
+    documentos = carregar_corpus(pasta, os.path.join(pasta, os.path.basename(PASTA_CACHE)), trabalhadores)
+    indice = Indice(documentos)
+    indice.vetorial = IndiceVetorial(indice)
+    gravar_indice(indice, documentos, caminho, pasta)
+    return {
+        "arquivo": caminho,
+        "versao": indice.versao,
+        "arquivos": len(documentos),
+        "paginas": indice.total_paginas,
+        "trechos": indice.total_fragmentos,
+        "bytes": os.path.getsize(caminho),
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
@@ -0,0 +1,582 @@
+"""
+Camada de ingestão dos PDFs.
+
+Extrai o texto de cada PDF uma única vez e guarda um cache no disco,
+indexado pelo hash do conteúdo do arquivo. Para cada página ficam o texto
+bruto e o normalizado, com o mapa de posições do normalizado de volta ao
+original. Os cabeçalhos e rodapés que se repetem nas páginas são
+removidos, e o documento já sai dividido em trechos estruturais.
+
+Tamanho e data de modificação validam o cache rapidamente, sem recalcular
+o hash a cada busca. Cada página é classificada na extração (texto, só
+imagem ou vazia). As só com imagem não são abertas de novo; com um motor
+de OCR configurado (ocr.py), viram texto pesquisável.
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pypdf
+
+from fragmentacao import VERSAO_FRAGMENTOS, fragmentar_documento
+from metricas import configurar_logs, contar, medir, observar
+from ocr import CONFIANCA_BAIXA, MOTOR_OCR, imagens_da_pagina, reconhecer_pagina
+
+log = logging.getLogger("gambot.ingestao")
+
+PASTA_DADOS = "data"
+PASTA_CACHE = os.path.join(PASTA_DADOS, ".cache")
+# Texto reconhecido das páginas só com imagem, pelo hash das imagens (ver ocr.py)
+PASTA_OCR = "ocr"
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Muda quando o formato do cache muda, invalidando as entradas antigas.
+# As versões 1 (sem o mapa de posições), 2 (sem a limpeza de cabeçalhos e
+# rodapés) e 3 (limpeza sem os rodapés lidos por OCR) são atualizadas sem
+# reextrair o PDF, desde que toda página sem "tipo" tenha texto (o mesmo vale
+# para caches da versão 4 ainda sem "tipo").
+VERSAO_CACHE = 4
+
+# Cabeçalhos/rodapés: linhas olhadas em cada borda da página e em quantas
+# páginas (fração das que têm texto, e no mínimo) a linha precisa se repetir
+LINHAS_BORDA = 6
+FRACAO_REPETIDA = 0.5
+MIN_PAGINAS_REPETIDAS = 3
+# Linhas com pelo menos tantas letras também casam ignorando os números e pelo começo
+# (rodapés com URL e paginação lidos por OCR: "lista.jsf 110", "lista.jsf 2/10", "brisigaal...")
+MIN_LETRAS_APROXIMADA = 20
+LETRAS_PREFIXO = 16
+
+
+def _ler_trabalhadores(valor):
+    """GAMBOT_TRABALHADORES: inválido ou negativo vale 0 (um processo por núcleo)."""
+    try:
+        trabalhadores = int(valor or 0)
+    except ValueError:
+        log.warning("GAMBOT_TRABALHADORES inválido (%r); usando um processo por núcleo", valor)
+        trabalhadores = 0
+    if trabalhadores < 0:
+        log.warning("GAMBOT_TRABALHADORES negativo (%d); usando um processo por núcleo", trabalhadores)
+        trabalhadores = 0
+    return trabalhadores or (os.cpu_count() or 1)
+
+
+# Extração paralela: número de processos (0 = um por núcleo) e tamanho dos lotes de páginas
+TRABALHADORES = _ler_trabalhadores(os.environ.get("GAMBOT_TRABALHADORES"))
+PAGINAS_POR_LOTE = 25
+
+# Estatísticas da última extração, para dimensionar a máquina de ingestão
+ultima_ingestao = {}
+
+# Documentos já carregados neste processo (hash -> documento)
+_documentos_em_memoria = {}
+_trava = threading.Lock()
+
+
+def normalizar_texto(texto):
+    """Remove acentos e coloca em minúsculas para comparação."""
+    if not texto: return ""
+    return unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII').lower()
+
+
+_RE_NAO_ASCII = re.compile(r"[^\x00-\x7f]")
+
+
+def normalizar_com_mapa(texto):
+    """
+    Normaliza como normalizar_texto e devolve também o mapa de posições:
+    [[posição no texto normalizado, deslocamento]], com um par a cada vez
+    que o deslocamento até o texto original muda (acento removido, ligadura
+    expandida...). Texto sem caracteres especiais tem mapa vazio.
+    """
+    if not texto:
+        return "", []
+    partes = []
+    mapa = []
+    deslocamento = 0
+    posicao = 0
+    anterior = 0
+
+    def marcar(pos_norm, pos_original):
+        nonlocal deslocamento
+        novo = pos_original - pos_norm
+        if novo != deslocamento:
+            if mapa and mapa[-1][0] == pos_norm:
+                mapa[-1][1] = novo
+            else:
+                mapa.append([pos_norm, novo])
+            deslocamento = novo
+
+    for m in _RE_NAO_ASCII.finditer(texto):
+        partes.append(texto[anterior:m.start()].lower())
+        posicao += m.start() - anterior
+        convertido = normalizar_texto(m.group())
+        for i in range(len(convertido)):
+            marcar(posicao + i, m.start())
+        partes.append(convertido)
+        posicao += len(convertido)
+        anterior = m.end()
+        marcar(posicao, anterior)
+    partes.append(texto[anterior:].lower())
+    return "".join(partes), mapa
+
+
+def posicao_original(mapa, pos_norm):
+    """Posição no texto original do caractere `pos_norm` do texto normalizado."""
+    i = bisect.bisect_right(mapa, [pos_norm, float("inf")]) - 1
+    return pos_norm + (mapa[i][1] if i >= 0 else 0)
+
+
+def posicao_normalizada(mapa, pos_original):
+    """Primeira posição do texto normalizado que corresponde a `pos_original` ou depois dela."""
+    deslocamento = 0
+    for pos_norm, novo in mapa:
+        if pos_norm + novo >= pos_original:
+            return min(pos_original - deslocamento, pos_norm)
+        deslocamento = novo
+    return pos_original - deslocamento
+
+
+_RE_NUMERO = re.compile(r"\d+")
+_RE_NAO_PALAVRA = re.compile(r"[\W_]+")
+_RE_NAO_LETRA = re.compile(r"[^a-z]+")
+
+
+def _chaves_linha(linha, numero_pagina):
+    """
+    Linha normalizada como está e com a primeira ocorrência do número da
+    própria página trocada por "#" ("Página 3 de 10"). Linhas longas também
+    geram uma chave com todos os números trocados por "#" e outra só com as
+    primeiras letras, para os rodapés que o OCR lê diferente em cada página.
+    Linhas curtas como "3º Nível" não ganham essas chaves: são conteúdo.
+    """
+    texto = _RE_NAO_PALAVRA.sub(" ", normalizar_texto(linha)).strip()
+    chaves = {texto}
+    for m in _RE_NUMERO.finditer(texto):
+        if int(m.group()) == numero_pagina:
+            chaves.add(f"{texto[:m.start()]}#{texto[m.end():]}")
+            break
+    letras = _RE_NAO_LETRA.sub("", texto)
+    if len(letras) >= MIN_LETRAS_APROXIMADA:
+        chaves.add(("numeros", _RE_NUMERO.sub("#", texto)))
+        chaves.add(("prefixo", letras[:LETRAS_PREFIXO]))
+    return chaves
+
+
+def _bordas(linhas, numero_pagina):
+    """
+    Linhas perto do topo e do fim da página, da borda para dentro:
+    ([(chaves, índice da linha)], [(chaves, índice da linha)]). As chaves
+    incluem a posição contada da borda, para só casar linhas que ocupam o
+    mesmo lugar.
+    """
+    preenchidas = [i for i, linha in enumerate(linhas) if linha.strip()]
+    topo = [({("topo", n, chave) for chave in _chaves_linha(linhas[i], numero_pagina)}, i)
+            for n, i in enumerate(preenchidas[:LINHAS_BORDA])]
+    fim = [({("fim", n, chave) for chave in _chaves_linha(linhas[i], numero_pagina)}, i)
+           for n, i in enumerate(reversed(preenchidas[-LINHAS_BORDA:]))]
+    return topo, fim
+
+
+def remover_repeticoes(paginas):
+    """
+    Tira das páginas as linhas de cabeçalho e rodapé (timbre, "Serviço
+    Público Federal", número da resolução, paginação) que se repetem na mesma
+    posição, contada do topo ou do fim, na maioria das páginas do documento.
+    Só saem as linhas coladas à borda: a primeira linha que não se repete
+    encerra a limpeza daquela borda.
+
+    "texto", "texto_norm" e "mapa_norm" passam a ser do texto limpo, que é o
+    indexado e o enviado à IA; o original fica em "texto_bruto" (só nas
+    páginas que mudaram) para exibição. Retorna o relatório da economia.
+    """
+    brutos = [pagina.get("texto_bruto", pagina["texto"]) for pagina in paginas]
+    linhas_paginas = [texto.split("\n") for texto in brutos]
+    bordas = [_bordas(linhas, pagina["numero"]) for linhas, pagina in zip(linhas_paginas, paginas)]
+    com_texto = sum(1 for texto in brutos if texto.strip())
+    minimo = max(MIN_PAGINAS_REPETIDAS, int(com_texto * FRACAO_REPETIDA) + 1)
+
+    contagem = Counter(chave for topo, fim in bordas for chave in set().union(*(c for c, _ in topo + fim)))
+    removidas = Counter()
+    relatorio = {"linhas_removidas": 0, "bytes_originais": 0, "bytes_removidos": 0, "tokens_removidos": 0}
+
+    for pagina, bruto, linhas, (topo, fim) in zip(paginas, brutos, linhas_paginas, bordas):
+        retirar = set()
+        if com_texto >= MIN_PAGINAS_REPETIDAS:
+            for borda in (topo, fim):
+                for chaves, indice in borda:
+                    if max(contagem[chave] for chave in chaves) < minimo:
+                        break
+                    retirar.add(indice)
+        limpo = "\n".join(linha for i, linha in enumerate(linhas) if i not in retirar) if retirar else bruto
+
+        if pagina["texto"] != limpo:
+            pagina["texto"] = limpo
+            pagina["texto_norm"], pagina["mapa_norm"] = normalizar_com_mapa(limpo)
+        if limpo != bruto:
+            pagina["texto_bruto"] = bruto
+        else:
+            pagina.pop("texto_bruto", None)
+
+        relatorio["linhas_removidas"] += len(retirar)
+        relatorio["bytes_originais"] += len(bruto.encode("utf-8"))
+        relatorio["bytes_removidos"] += len(bruto.encode("utf-8")) - len(limpo.encode("utf-8"))
+        # Mesma estimativa de tokens usada quando a API não informa (3,5 caracteres por token)
+        relatorio["tokens_removidos"] += int((len(bruto) - len(limpo)) / 3.5)
+        removidas.update(linhas[i].strip() for i in retirar)
+
+    relatorio["exemplos"] = [linha for linha, _ in removidas.most_common(5)]
+    return relatorio
+
+
+def listar_pdfs(pasta=PASTA_DADOS):
+    """Lista os PDFs da pasta em ordem alfabética."""
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(f for f in os.listdir(pasta) if f.lower().endswith(".pdf"))
+
+
+def calcular_hash(caminho):
+    """Calcula o SHA-256 do conteúdo do arquivo."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def extrair_paginas(caminho, inicio=0, fim=None, motor_ocr=MOTOR_OCR, pasta_cache=PASTA_CACHE):
+    """
+    Extrai o texto bruto e normalizado das páginas [inicio, fim) de um PDF e
+    classifica cada uma ("tipo": texto, imagem ou vazia). As páginas só com
+    imagem passam pelo OCR (`motor_ocr`, com cache em pasta_cache/ocr).
+    """
+    paginas = []
+    with open(caminho, "rb") as f:
+        reader = pypdf.PdfReader(f)
+        total = len(reader.pages)
+        for i in range(inicio, total if fim is None else min(fim, total)):
+            pagina_pdf = reader.pages[i]
+            texto = pagina_pdf.extract_text() or ""
+            pagina = {"numero": i + 1, "tipo": "texto"}
+            if not texto.strip():
+                imagens = imagens_da_pagina(pagina_pdf)
+                pagina["tipo"] = "imagem" if imagens else "vazia"
+                if imagens and motor_ocr:
+                    reconhecido = reconhecer_pagina(pagina_pdf, imagens, os.path.join(pasta_cache, PASTA_OCR), motor_ocr)
+                    texto = reconhecido["texto"]
+                    # Motor indisponível não marca a página: ela é tentada de novo na próxima carga
+                    if reconhecido["confianca"] is not None:
+                        pagina["ocr"] = {"motor": motor_ocr, "confianca": reconhecido["confianca"]}
+            pagina["texto"] = texto
+            pagina["texto_norm"], pagina["mapa_norm"] = normalizar_com_mapa(texto)
+            paginas.append(pagina)
+    return paginas
+
+
+def _precisa_ocr(documento):
+    """
+    True se o documento tem páginas sem texto ainda não passadas pelo motor
+    de OCR atual (motor ligado ou trocado depois da extração). Páginas de
+    caches antigos, sem "tipo", contam se estiverem sem texto.
+    """
+    if not MOTOR_OCR:
+        return False
+    for pagina in documento["paginas"]:
+        tipo = pagina.get("tipo") or ("texto" if pagina["texto"].strip() else "imagem")
+        if tipo == "imagem" and (pagina.get("ocr") or {}).get("motor") != MOTOR_OCR:
+            return True
+    return False
+
+
+def contar_paginas(caminho):
+    """Conta as páginas de um PDF sem extrair o texto."""
+    with open(caminho, "rb") as f:
+        return len(pypdf.PdfReader(f).pages)
+
+
+def extrair_em_paralelo(caminhos, trabalhadores=None, ao_progredir=None, ao_concluir_arquivo=None,
+                        pasta_cache=PASTA_CACHE):
+    """
+    Extrai vários PDFs num pool de processos, dividindo os arquivos grandes em
+    lotes de páginas. O resultado mantém a ordem dos arquivos e das páginas,
+    independente da ordem em que os processos terminam.
+    `ao_progredir(lotes_concluidos, total_lotes)` é chamado a cada lote extraído
+    e `ao_concluir_arquivo(caminho, paginas)` assim que todos os lotes de um
+    arquivo ficam prontos.
+    """
+    trabalhadores = trabalhadores or TRABALHADORES
+    inicio_relogio = time.perf_counter()
+
+    # Monta as tarefas (arquivo, primeira página, última página, motor de OCR, cache);
+    # o OCR das páginas só com imagem roda nos mesmos processos da extração
+    tarefas = []
+    for caminho in caminhos:
+        total = contar_paginas(caminho) if trabalhadores > 1 else 0
+        if total > PAGINAS_POR_LOTE:
+            tarefas.extend((caminho, i, i + PAGINAS_POR_LOTE, MOTOR_OCR, pasta_cache)
+                           for i in range(0, total, PAGINAS_POR_LOTE))
+        else:
+            tarefas.append((caminho, 0, None, MOTOR_OCR, pasta_cache))
+
+    # Junta os lotes na ordem das tarefas (pool.map devolve nessa ordem)
+    resultado = {caminho: [] for caminho in caminhos}
+    lotes_restantes = {caminho: 0 for caminho in caminhos}
+    for caminho, *_ in tarefas:
+        lotes_restantes[caminho] += 1
+    concluidos = 0
+
+    def receber(tarefa, paginas):
+        nonlocal concluidos
+        caminho = tarefa[0]
+        resultado[caminho].extend(paginas)
+        concluidos += 1
+        lotes_restantes[caminho] -= 1
+        if ao_progredir:
+            ao_progredir(concluidos, len(tarefas))
+        if ao_concluir_arquivo and not lotes_restantes[caminho]:
+            ao_concluir_arquivo(caminho, resultado[caminho])
+
+    if trabalhadores > 1 and len(tarefas) > 1:
+        with ProcessPoolExecutor(max_workers=min(trabalhadores, len(tarefas))) as pool:
+            for tarefa, paginas in zip(tarefas, pool.map(extrair_paginas, *zip(*tarefas))):
+                receber(tarefa, paginas)
+    else:
+        for tarefa in tarefas:
+            receber(tarefa, extrair_paginas(*tarefa))
+
+    segundos = time.perf_counter() - inicio_relogio
+    total_paginas = sum(len(p) for p in resultado.values())
+    ultima_ingestao.clear()
+    ultima_ingestao.update({
+        "arquivos": len(caminhos),
+        "paginas": total_paginas,
+        "segundos": segundos,
+        "paginas_por_segundo": total_paginas / segundos if segundos > 0 else 0.0,
+        "paginas_imagem": sum(1 for p in resultado.values() for pagina in p if pagina["tipo"] == "imagem"),
+        "trabalhadores": trabalhadores,
+    })
+    observar("extracao", segundos)
+    contar("paginas_extraidas", total_paginas)
+    contar("paginas_ocr", sum(1 for p in resultado.values() for pagina in p if pagina.get("ocr")))
+    log.info("%d página(s) de %d arquivo(s) extraídas em %.2fs (%.1f páginas/s, %d processo(s))",
+             total_paginas, len(caminhos), segundos, ultima_ingestao["paginas_por_segundo"], trabalhadores)
+    return resultado
+
+
+def _gravar_json(caminho, dados):
+    """Grava o JSON num arquivo temporário e troca de forma atômica."""
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _ler_manifesto(pasta_cache):
+    return _ler_json(os.path.join(pasta_cache, ARQUIVO_MANIFESTO)) or {}
+
+
+def _resolver_hash(arquivo, pasta, manifesto):
+    """Usa o hash do manifesto se tamanho e data de modificação não mudaram."""
+    caminho = os.path.join(pasta, arquivo)
+    info = os.stat(caminho)
+    entrada = manifesto.get(arquivo)
+    if entrada and entrada["tamanho"] == info.st_size and entrada["mtime"] == info.st_mtime:
+        hash_conteudo = entrada["hash"]
+    else:
+        hash_conteudo = calcular_hash(caminho)
+    manifesto[arquivo] = {"tamanho": info.st_size, "mtime": info.st_mtime, "hash": hash_conteudo}
+    return hash_conteudo
+
+
+def _documento_em_cache(hash_conteudo, pasta_cache):
+    """Procura o documento na memória do processo e depois no disco."""
+    with _trava:
+        documento = _documentos_em_memoria.get(hash_conteudo)
+    if documento is None:
+        documento = _ler_json(os.path.join(pasta_cache, f"{hash_conteudo}.json"))
+        # A versão atual gravada por uma atualização anterior pode ter ficado sem "tipo" nas páginas
+        sem_tipo = documento and documento.get("versao") == VERSAO_CACHE and any("tipo" not in p for p in documento["paginas"])
+        if documento and (documento.get("versao") in (1, 2, 3) or sem_tipo):
+            paginas = documento["paginas"]
+            if any("tipo" not in p and not p["texto"].strip() for p in paginas):
+                # Página sem texto de antes da classificação: só o PDF diz se é imagem ou vazia
+                return None
+            # Cache antigo: classifica as páginas com texto, calcula o mapa de posições
+            # (versão 1) e tira os cabeçalhos/rodapés (ao guardar) a partir do texto já extraído
+            for pagina in paginas:
+                pagina.setdefault("tipo", "texto")
+                if documento["versao"] == 1:
+                    pagina["texto_norm"], pagina["mapa_norm"] = normalizar_com_mapa(pagina["texto"])
+            documento = _guardar_documento(hash_conteudo, paginas, pasta_cache)
+        if not documento or documento.get("versao") != VERSAO_CACHE or _precisa_ocr(documento):
+            return None
+        if documento.get("versao_fragmentos") != VERSAO_FRAGMENTOS:
+            # Regras de divisão mudaram: refaz os trechos a partir do texto já extraído
+            documento = _guardar_documento(hash_conteudo, documento["paginas"], pasta_cache)
+        with _trava:
+            _documentos_em_memoria[hash_conteudo] = documento
+    return documento
+
+
+def _guardar_documento(hash_conteudo, paginas, pasta_cache):
+    limpeza = remover_repeticoes(paginas)
+    if limpeza["linhas_removidas"]:
+        log.info("Cabeçalhos/rodapés repetidos removidos de %s: %d linha(s), %d bytes, ~%d tokens",
+                 hash_conteudo[:12], limpeza["linhas_removidas"], limpeza["bytes_removidos"], limpeza["tokens_removidos"])
+    documento = {
+        "versao": VERSAO_CACHE,
+        "hash": hash_conteudo,
+        "paginas": paginas,
+        "limpeza": limpeza,
+        "versao_fragmentos": VERSAO_FRAGMENTOS,
+        "fragmentos": fragmentar_documento(paginas),
+    }
+    os.makedirs(pasta_cache, exist_ok=True)
+    _gravar_json(os.path.join(pasta_cache, f"{hash_conteudo}.json"), documento)
+    with _trava:
+        _documentos_em_memoria[hash_conteudo] = documento
+    return documento
+
+
+def carregar_documento(arquivo, pasta=PASTA_DADOS, pasta_cache=PASTA_CACHE, manifesto=None):
+    """
+    Retorna o documento com o texto das páginas, usando o cache sempre que possível.
+    Só abre o PDF com o pypdf se o conteúdo do arquivo ainda não foi extraído.
+    """
+    if manifesto is None:
+        manifesto = _ler_manifesto(pasta_cache)
+    hash_conteudo = _resolver_hash(arquivo, pasta, manifesto)
+    documento = _documento_em_cache(hash_conteudo, pasta_cache)
+    if documento is None:
+        log.info("Extraindo texto de %s", arquivo)
+        paginas = extrair_paginas(os.path.join(pasta, arquivo), pasta_cache=pasta_cache)
+        documento = _guardar_documento(hash_conteudo, paginas, pasta_cache)
+    # O nome do arquivo não faz parte da chave do cache (o mesmo PDF pode ter dois nomes)
+    return dict(documento, arquivo=arquivo)
+
+
+@medir("carregamento_corpus")
+def carregar_corpus(pasta=PASTA_DADOS, pasta_cache=PASTA_CACHE, trabalhadores=None, ao_progredir=None,
+                    ao_carregar=None):
+    """
+    Carrega todos os PDFs da pasta a partir do cache. Os arquivos novos ou
+    alterados são extraídos juntos, em paralelo quando há mais de um processo.
+    `ao_carregar(documento)` é chamado para cada documento assim que ele fica
+    disponível (do cache na hora, os extraídos conforme cada arquivo termina).
+    """
+    manifesto = _ler_manifesto(pasta_cache)
+    manifesto_anterior = dict(manifesto)
+    documentos = {}
+    pendentes = {}
+
+    arquivos = listar_pdfs(pasta)
+    for arquivo in arquivos:
+        try:
+            hash_conteudo = _resolver_hash(arquivo, pasta, manifesto)
+            documento = _documento_em_cache(hash_conteudo, pasta_cache)
+            if documento is None:
+                pendentes[os.path.join(pasta, arquivo)] = (arquivo, hash_conteudo)
+            else:
+                documentos[arquivo] = dict(documento, arquivo=arquivo)
+                if ao_carregar:
+                    ao_carregar(documentos[arquivo])
+        except Exception as e:
+            log.error("Erro ao ler %s: %s", arquivo, e)
+
+    def guardar_extraido(caminho, paginas):
+        arquivo, hash_conteudo = pendentes[caminho]
+        documentos[arquivo] = dict(_guardar_documento(hash_conteudo, paginas, pasta_cache), arquivo=arquivo)
+        if ao_carregar:
+            ao_carregar(documentos[arquivo])
+
+    if pendentes:
+        try:
+            extraidos = extrair_em_paralelo(list(pendentes), trabalhadores, ao_progredir, guardar_extraido, pasta_cache)
+        except Exception as e:
+            # Se um arquivo derrubar o lote, extrai um por um para isolar o erro
+            log.warning("Extração em lote falhou (%s), extraindo arquivo por arquivo", e)
+            extraidos = {}
+            for caminho in pendentes:
+                if pendentes[caminho][0] in documentos:
+                    continue
+                try:
+                    extraidos[caminho] = extrair_paginas(caminho, pasta_cache=pasta_cache)
+                except Exception as e_arquivo:
+                    log.error("Erro ao ler %s: %s", pendentes[caminho][0], e_arquivo)
+        for caminho, paginas in extraidos.items():
+            if pendentes[caminho][0] not in documentos:
+                guardar_extraido(caminho, paginas)
+
+    # Remove do manifesto os arquivos que saíram da pasta ou falharam
+    manifesto = {k: v for k, v in manifesto.items() if k in documentos}
+
+    # Versões substituídas ou apagadas saem da memória (o observador chama isto a cada mudança)
+    substituidos = {e["hash"] for e in manifesto_anterior.values()} - {d["hash"] for d in documentos.values()}
+    with _trava:
+        for hash_conteudo in substituidos:
+            _documentos_em_memoria.pop(hash_conteudo, None)
+
+    if manifesto != manifesto_anterior:
+        os.makedirs(pasta_cache, exist_ok=True)
+        _gravar_json(os.path.join(pasta_cache, ARQUIVO_MANIFESTO), manifesto)
+
+    return [documentos[a] for a in arquivos if a in documentos]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extrai o texto dos PDFs para o cache de ingestão.")
+    parser.add_argument("--pasta", default=PASTA_DADOS, help="pasta com os PDFs")
+    parser.add_argument("--cache", default=PASTA_CACHE, help="pasta do cache de texto extraído")
+    parser.add_argument("--trabalhadores", type=int, default=TRABALHADORES, help="número de processos de extração")
+    args = parser.parse_args()
+    configurar_logs()
+
+    documentos = carregar_corpus(args.pasta, args.cache, args.trabalhadores)
+    print(f"{len(documentos)} documento(s) no cache, {sum(len(d['paginas']) for d in documentos)} página(s)")
+    if ultima_ingestao:
+        print(f"Extração: {ultima_ingestao['paginas_por_segundo']:.1f} páginas/s com {ultima_ingestao['trabalhadores']} processo(s)")
+
+    # Páginas só com imagem e o que o OCR conseguiu delas
+    for documento in documentos:
+        imagens = [p for p in documento["paginas"] if p.get("tipo") == "imagem"]
+        if not imagens:
+            continue
+        reconhecidas = [p for p in imagens if p["texto"].strip()]
+        linha = f"{documento['arquivo']}: {len(imagens)} página(s) só com imagem"
+        if reconhecidas:
+            confiancas = [p["ocr"]["confianca"] for p in reconhecidas]
+            baixas = [str(p["numero"]) for p in reconhecidas if p["ocr"]["confianca"] < CONFIANCA_BAIXA]
+            linha += f", {len(reconhecidas)} com texto do OCR (confiança média {sum(confiancas) / len(confiancas):.0%})"
+            if baixas:
+                linha += f"; confiança baixa nas páginas {', '.join(baixas)}"
+        elif not MOTOR_OCR:
+            linha += " (sem OCR: configure GAMBOT_OCR para torná-las pesquisáveis)"
+        print(linha)
+
+    # Economia da remoção de cabeçalhos/rodapés, por documento
+    for documento in documentos:
+        limpeza = documento.get("limpeza") or {}
+        if limpeza.get("linhas_removidas"):
+            print(f"{documento['arquivo']}: {limpeza['linhas_removidas']} linha(s) repetida(s) removida(s), "
+                  f"{limpeza['bytes_removidos']} de {limpeza['bytes_originais']} bytes "
+                  f"({limpeza['bytes_removidos'] / limpeza['bytes_originais']:.1%}), ~{limpeza['tokens_removidos']} tokens")
+            for linha in limpeza["exemplos"]:
+                print(f"    {linha[:100]}")
@@ -0,0 +1,123 @@
+"""
+Inicialização do app Streamlit, feita uma vez por processo.
+
+O Streamlit executa o app.py inteiro a cada clique. O que não depende da
+sessão (configuração, pasta de dados, observador, pré-aquecedor, motor,
+chaves dos botões do FAQ e regras das sugestões de busca) fica pronto na
+primeira execução; as seguintes só consultam. Depois de editar o .env,
+invalidar_inicializacao() faz a próxima execução reler a configuração
+(botão no painel de administração).
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from configuracao import carregar_configuracoes
+from metricas import configurar_logs, iniciar_exportacao
+from motor import obter_motor
+from observador import obter_observador
+from preaquecimento import obter_preaquecedor
+
+log = logging.getLogger("gambot.inicializacao")
+
+# Perguntas frequentes (sidebar); busca e contexto delas ficam pré-calculados
+FAQ_PERGUNTAS = {
+    "Calendário Acadêmico": "Como funciona o calendário acadêmico da UFPA?",
+    "Carga Horária": "Qual é a carga horária total do curso?",
+    "Disciplinas": "Quais são as disciplinas obrigatórias?",
+    "Trancamento": "Como faço para trancar a matrícula?",
+    "Matrícula": "Quais são os procedimentos para matrícula?",
+    "TCC": "Como funciona o Trabalho de Conclusão de Curso?",
+    "Regulamento": "Onde encontro o regulamento completo?",
+    "Estrutura": "Qual é a estrutura do curso?",
+    "Professores": "Como contatar os professores?",
+    "Avaliação": "Como são as avaliações e frequência?",
+    "Transferência": "Como solicitar transferência de curso?",
+    "Diploma": "Como solicitar segunda via do diploma?",
+    "Bolsas": "Existem bolsas de estudo disponíveis?",
+    "Campus": "Quais são os campi da UFPA?"
+}
+
+# Sugestões quando a busca não encontra nada: (padrão na pergunta em minúsculas, termos sugeridos)
+SUGESTOES_BUSCA = [
+    (re.compile(r'\b6.*(per[ií]odo|n[ií]vel)\b'), ["6º Nível", "sexto nível", "6º Período"]),
+    (re.compile(r'\bdisciplina\b'), ["Componente Curricular", "matéria", "60h Teórica"]),
+    (re.compile(r'\btrancamento\b'), ["trancamento de matrícula", "Art. 15", "cancelamento"]),
+    (re.compile(r'\bhistórico\b'), ["Histórico Escolar", "registro acadêmico", "boletim"]),
+    (re.compile(r'\bcalendário\b'), ["Calendário Acadêmico", "períodos letivos", "datas"]),
+    (re.compile(r'\bart\.\b'), ["Art. 15", "Art. 24", "Art. 1º"]),
+]
+SUGESTOES_PADRAO = ["60h Teórica", "MODULO OBRIGATÓRIA", "Art. 15", "Resolução", "CH Total", "Componente Curricular"]
+
+
+def sugerir_buscas(pergunta):
+    """Termos sugeridos para uma pergunta sem resultados."""
+    pergunta_lower = pergunta.lower()
+    sugestoes = [s for padrao, termos in SUGESTOES_BUSCA if padrao.search(pergunta_lower) for s in termos]
+    return sugestoes or list(SUGESTOES_PADRAO)
+
+
+def _inicializar(pasta, segredos):
+    inicio = time.perf_counter()
+    configurar_logs()
+    iniciar_exportacao()
+
+    if not os.path.exists(pasta):
+        os.makedirs(pasta)
+        log.info("Pasta '%s' criada", pasta)
+
+    config = carregar_configuracoes(segredos)
+    log.debug("Config carregada - Chave: %s, Modelo: %s", bool(config["api_key"]), config["modelo"])
+
+    # Indexação em segundo plano (uma thread por processo)
+    observador = obter_observador(pasta)
+    preaquecedor = obter_preaquecedor(observador, FAQ_PERGUNTAS.values(), config)
+    # O mesmo motor do servidor HTTP e da linha de comando
+    motor = obter_motor(pasta, config, preaquecedor)
+    # Motor e pré-aquecedor já existiam se a inicialização foi invalidada: passam a usar a config relida
+    motor.config = dict(config)
+    preaquecedor.config = dict(config)
+
+    faq = [
+        (rotulo, pergunta, f"faq_{hashlib.md5(rotulo.encode()).hexdigest()[:8]}")
+        for rotulo, pergunta in FAQ_PERGUNTAS.items()
+    ]
+    log.info("App inicializado em %.1f ms", (time.perf_counter() - inicio) * 1000)
+    return {
+        "config": config,
+        "observador": observador,
+        "preaquecedor": preaquecedor,
+        "motor": motor,
+        "faq": faq,   # [(rótulo do botão, pergunta, key do widget)]
+        "inicializado_em": time.time(),
+    }
+
+
+_inicializacao = None
+_trava = threading.Lock()
+
+
+def obter_inicializacao(pasta="data", segredos=None):
+    """Retorna o que o app precisa no processo, inicializando na primeira chamada."""
+    global _inicializacao
+    with _trava:
+        if _inicializacao is None:
+            _inicializacao = _inicializar(pasta, segredos)
+            log.info("=" * 60)
+            log.info("GAMBOT UFPA - Sistema Inteligente de Busca")
+            log.info("=" * 60)
+            log.info("PDFs carregados: %d", len(_inicializacao["observador"].arquivos))
+            log.info("OpenAI: %s", "Configurada" if _inicializacao["config"]["api_key"] else "Não configurada")
+            log.info("Acesse: http://localhost:8501")
+            log.info("=" * 60)
+        return _inicializacao
+
+
+def invalidar_inicializacao():
+    """A próxima chamada de obter_inicializacao relê a configuração."""
+    global _inicializacao
+    with _trava:
+        _inicializacao = None
@@ -0,0 +1,226 @@
+"""
+Respostas em lote: uma planilha de perguntas pelo mesmo caminho do
+"Perguntar à IA" (busca, contexto, cache de respostas e OpenAI).
+
+As buscas rodam em threads e as chamadas à OpenAI são concorrentes, com
+o cliente assíncrono, limitadas por quantidade simultânea e por
+requisições/tokens por minuto. Cada resposta é gravada no arquivo de
+saída (JSONL) assim que fica pronta; rodar de novo com a mesma saída
+continua de onde parou, refazendo só as perguntas que faltaram ou deram
+erro.
+
+    python motor.py batch perguntas.csv --saida respostas.jsonl --concorrencia 8 --rpm 500 --tpm 200000
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+
+from busca import MODO_PADRAO
+from cache_respostas import obter_cache_respostas
+from clientes_openai import limpar_chave
+from ia import gerar_resposta_ia_async, montar_mensagens_ia
+from metricas import contar
+
+log = logging.getLogger("gambot.lote")
+
+CONCORRENCIA_PADRAO = 8
+RPM_PADRAO = 500
+TPM_PADRAO = 200000
+
+
+def ler_perguntas(caminho):
+    """
+    Lê as perguntas de um CSV (coluna "pergunta", ou a primeira coluna) ou
+    de um JSONL ({"pergunta": ...}). A coluna/campo "id" é opcional; sem
+    ela o id é o número da linha. Retorna [{"id", "pergunta"}].
+    """
+    perguntas = []
+    with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+        if caminho.lower().endswith((".jsonl", ".json")):
+            linhas = (json.loads(linha) for linha in f if linha.strip())
+        else:
+            leitor = csv.DictReader(f)
+            coluna = "pergunta" if "pergunta" in (leitor.fieldnames or []) else (leitor.fieldnames or [None])[0]
+            linhas = ({"id": linha.get("id"), "pergunta": linha.get(coluna)} for linha in leitor)
+        for numero, linha in enumerate(linhas, 1):
+            pergunta = str(linha.get("pergunta") or "").strip()
+            if pergunta:
+                perguntas.append({"id": str(linha.get("id") or numero), "pergunta": pergunta})
+    return perguntas
+
+
+def ids_respondidos(caminho_saida):
+    """Ids já respondidos sem erro num arquivo de saída anterior (para retomar o lote)."""
+    respondidos = set()
+    if not os.path.exists(caminho_saida):
+        return respondidos
+    with open(caminho_saida, "r", encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue   # última linha cortada por uma interrupção
+            if registro.get("erro"):
+                respondidos.discard(registro.get("id"))
+            else:
+                respondidos.add(registro.get("id"))
+    return respondidos
+
+
+class LimitadorTaxa:
+    """Requisições e tokens por minuto (janela deslizante) para tarefas asyncio. Zero desliga o limite."""
+
+    def __init__(self, rpm=RPM_PADRAO, tpm=TPM_PADRAO, janela=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.janela = janela
+        self._eventos = deque()   # (instante, tokens) das requisições dentro da janela
+        self._tokens = 0
+        self._trava = asyncio.Lock()
+
+    async def aguardar(self, tokens):
+        """Espera até caber mais uma requisição de `tokens` tokens na janela."""
+        async with self._trava:
+            while True:
+                agora = time.monotonic()
+                while self._eventos and agora - self._eventos[0][0] >= self.janela:
+                    self._tokens -= self._eventos.popleft()[1]
+                cabe_requisicao = not self.rpm or len(self._eventos) < self.rpm
+                # Uma requisição maior que o limite inteiro passa sozinha, com a janela vazia
+                cabe_tokens = not self.tpm or not self._eventos or self._tokens + tokens <= self.tpm
+                if cabe_requisicao and cabe_tokens:
+                    self._eventos.append((agora, tokens))
+                    self._tokens += tokens
+                    return
+                await asyncio.sleep(max(0.01, self._eventos[0][0] + self.janela - agora))
+
+
+def estimar_tokens(pergunta, contexto, max_tokens):
+    """Tokens reservados no limite por minuto: prompt estimado (3,5 caracteres por token) + resposta máxima."""
+    caracteres = sum(len(m["content"]) for m in montar_mensagens_ia(pergunta, contexto))
+    return int(caracteres / 3.5) + max_tokens
+
+
+def _fontes(resultados):
+    fontes = []
+    for r in resultados:
+        fonte = {"arquivo": r["arquivo"], "pagina": r["pagina"], "rotulo": r.get("rotulo", "")}
+        if fonte not in fontes:
+            fontes.append(fonte)
+    return fontes
+
+
+async def _responder(item, motor, cliente, limitador, semaforo, modo):
+    """Registro da pergunta; uma falha inesperada vira um registro com erro em vez de parar o lote."""
+    inicio = time.perf_counter()
+    try:
+        return await _responder_pergunta(item, motor, cliente, limitador, semaforo, modo)
+    except Exception as e:
+        log.warning("Pergunta %s falhou: %s", item["id"], e, exc_info=True)
+        contar("respostas_ia", origem="erro")
+        return {
+            "id": item["id"],
+            "pergunta": item["pergunta"],
+            "resposta": None,
+            "erro": str(e) or type(e).__name__,
+            "fontes": [],
+            "do_cache": False,
+            "modo": modo,
+            "versao_indice": None,
+            "segundos_busca": 0.0,
+            "segundos_ia": 0.0,
+            "segundos": round(time.perf_counter() - inicio, 3),
+        }
+
+
+async def _responder_pergunta(item, motor, cliente, limitador, semaforo, modo):
+    pergunta = item["pergunta"]
+    modelo = motor.config["modelo"]
+    max_tokens = motor.config["max_tokens"]
+    async with semaforo:
+        inicio = time.perf_counter()
+        # A busca é CPU; roda numa thread para não travar as chamadas em andamento
+        busca = await asyncio.to_thread(motor.buscar, pergunta, modo)
+        segundos_busca = time.perf_counter() - inicio
+
+        # Sem índice pronto (versão None) a resposta não entra nem sai do cache
+        versao_indice = busca["versao"]
+        cache = obter_cache_respostas() if versao_indice else None
+        resposta = cache.buscar(pergunta, busca["contexto"], modelo, versao_indice) if cache else None
+        erro = None
+        do_cache = resposta is not None
+        inicio_ia = time.perf_counter()
+        if do_cache:
+            contar("respostas_ia", origem="cache")
+        else:
+            await limitador.aguardar(estimar_tokens(pergunta, busca["contexto"], max_tokens))
+            inicio_ia = time.perf_counter()
+            resposta, erro = await gerar_resposta_ia_async(pergunta, busca["contexto"], cliente, modelo, max_tokens)
+            contar("respostas_ia", origem="erro" if erro else "openai")
+            if cache and not erro:
+                cache.guardar(pergunta, busca["contexto"], modelo, versao_indice, resposta, time.perf_counter() - inicio)
+
+    return {
+        "id": item["id"],
+        "pergunta": pergunta,
+        "resposta": resposta,
+        "erro": erro,
+        "fontes": _fontes(busca["resultados"]),
+        "do_cache": do_cache,
+        "modo": modo,
+        "versao_indice": busca["versao"],
+        "segundos_busca": round(segundos_busca, 3),
+        "segundos_ia": round(time.perf_counter() - inicio_ia, 3),
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+async def responder_lote(motor, perguntas, caminho_saida, modo=MODO_PADRAO, concorrencia=CONCORRENCIA_PADRAO,
+                         rpm=RPM_PADRAO, tpm=TPM_PADRAO, api_key=None, ao_concluir=None):
+    """
+    Responde as perguntas ainda não respondidas em `caminho_saida`, gravando
+    cada resultado assim que fica pronto. `ao_concluir(registro, feitas, total)`
+    é chamado a cada resposta. Retorna o resumo do lote.
+    """
+    from openai import AsyncOpenAI
+
+    chave = limpar_chave(api_key or motor.config["api_key"])
+    if not chave:
+        raise ValueError("Configure a API Key da OpenAI para responder em lote.")
+
+    respondidos = ids_respondidos(caminho_saida)
+    pendentes = [p for p in perguntas if p["id"] not in respondidos]
+    resumo = {"total": len(perguntas), "puladas": len(perguntas) - len(pendentes), "respondidas": 0, "erros": 0}
+    inicio = time.perf_counter()
+
+    cliente = AsyncOpenAI(api_key=chave)
+    limitador = LimitadorTaxa(rpm, tpm)
+    semaforo = asyncio.Semaphore(max(1, concorrencia))
+    try:
+        with open(caminho_saida, "a", encoding="utf-8") as saida:
+            tarefas = [asyncio.create_task(_responder(p, motor, cliente, limitador, semaforo, modo)) for p in pendentes]
+            for feitas, tarefa in enumerate(asyncio.as_completed(tarefas), 1):
+                registro = await tarefa
+                # Uma linha por resposta, gravada na hora: uma interrupção perde no máximo as que estavam em andamento
+                saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                saida.flush()
+                resumo["erros" if registro["erro"] else "respondidas"] += 1
+                if ao_concluir:
+                    ao_concluir(registro, feitas, len(pendentes))
+    finally:
+        await cliente.close()
+
+    resumo["segundos"] = round(time.perf_counter() - inicio, 2)
+    return resumo
+
+
+def executar_lote(motor, caminho_entrada, caminho_saida=None, **opcoes):
+    """Versão síncrona de responder_lote lendo as perguntas do arquivo (usada pela linha de comando)."""
+    caminho_saida = caminho_saida or os.path.splitext(caminho_entrada)[0] + ".respostas.jsonl"
+    perguntas = ler_perguntas(caminho_entrada)
+    resumo = asyncio.run(responder_lote(motor, perguntas, caminho_saida, **opcoes))
+    return dict(resumo, saida=caminho_saida)
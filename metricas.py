@@ -0,0 +1,240 @@
+"""
+Métricas de desempenho e logs do Gambot.
+
+Cada etapa (carregamento do corpus, extração, indexação, pontuação,
+montagem do contexto, chamada à OpenAI) é medida com `medir("etapa")`.
+Os tempos são agregados no processo inteiro (todas as sessões do
+Streamlit, servidor HTTP e linha de comando) em histogramas no formato do
+Prometheus, e as últimas amostras de cada etapa ficam guardadas para os
+percentis do painel de administração.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+log = logging.getLogger("gambot")
+
+# Limites (segundos) dos baldes dos histogramas: de 1 ms a 1 min
+BALDES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Amostras recentes mantidas por etapa para os percentis exatos do painel
+AMOSTRAS_RECENTES = 2000
+
+# Arquivo no formato texto do Prometheus (ex.: para o textfile collector do node_exporter)
+ARQUIVO_METRICAS = os.environ.get("GAMBOT_ARQUIVO_METRICAS", "")
+INTERVALO_EXPORTACAO = float(os.environ.get("GAMBOT_INTERVALO_METRICAS", "15"))
+
+DESCRICOES = {
+    "carregamento_corpus": "Carga dos PDFs (cache ou extração)",
+    "extracao": "Extração de texto dos PDFs novos/alterados",
+    "indexacao": "Montagem do índice invertido e vetorial",
+    "pontuacao": "Ranking dos trechos de uma busca",
+    "contexto": "Montagem do contexto enviado à IA",
+    "openai": "Chamada à OpenAI (resposta completa)",
+    "openai_primeiro_token": "Tempo até o primeiro pedaço da resposta",
+    "busca_total": "Busca completa (termos, ranking e trechos)",
+    "requisicao_http": "Requisição ao servidor HTTP",
+    "rerun_app": "Execução do script do Streamlit a cada interação",
+}
+
+_trava = threading.Lock()
+_histogramas = {}   # (etapa, rótulos) -> {"baldes", "soma", "total", "recentes"}
+_contadores = {}    # (nome, rótulos) -> valor
+_inicio_processo = time.time()
+
+
+def configurar_logs(nivel=None):
+    """Configura o log do Gambot (nível pela variável GAMBOT_LOG, padrão INFO)."""
+    nivel = (nivel or os.environ.get("GAMBOT_LOG", "INFO")).upper()
+    if not log.handlers:
+        manipulador = logging.StreamHandler()
+        manipulador.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        log.addHandler(manipulador)
+        log.propagate = False
+    log.setLevel(getattr(logging, nivel, logging.INFO))
+    return log
+
+
+def _chave_rotulos(rotulos):
+    return tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def observar(etapa, segundos, **rotulos):
+    """Registra a duração de uma etapa."""
+    chave = (etapa, _chave_rotulos(rotulos))
+    with _trava:
+        histograma = _histogramas.get(chave)
+        if histograma is None:
+            histograma = _histogramas[chave] = {
+                "baldes": [0] * len(BALDES),
+                "soma": 0.0,
+                "total": 0,
+                "recentes": deque(maxlen=AMOSTRAS_RECENTES),
+            }
+        posicao = bisect.bisect_left(BALDES, segundos)
+        if posicao < len(BALDES):
+            histograma["baldes"][posicao] += 1
+        histograma["soma"] += segundos
+        histograma["total"] += 1
+        histograma["recentes"].append(segundos)
+
+
+def contar(nome, valor=1, **rotulos):
+    """Soma `valor` a um contador (ex.: tokens, buscas, acertos de cache)."""
+    chave = (nome, _chave_rotulos(rotulos))
+    with _trava:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+@contextmanager
+def medir(etapa, **rotulos):
+    """
+    Mede o bloco como uma etapa:
+
+        with medir("pontuacao", modo="hibrido"):
+            ...
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        observar(etapa, segundos, **rotulos)
+        log.debug("etapa %s %s: %.1f ms", etapa, dict(rotulos) or "", segundos * 1000)
+
+
+def total_contador(nome, **filtro):
+    """Soma de um contador em todos os rótulos que batem com o filtro (ex.: tipo="entrada")."""
+    filtro = {k: str(v) for k, v in filtro.items()}
+    with _trava:
+        return sum(valor for (n, rotulos), valor in _contadores.items()
+                   if n == nome and filtro.items() <= dict(rotulos).items())
+
+
+def _percentil(ordenadas, fracao):
+    return ordenadas[min(len(ordenadas) - 1, int(round(fracao * (len(ordenadas) - 1))))]
+
+
+def percentil(etapa, fracao, minimo=1, **filtro):
+    """
+    Percentil (segundos) das amostras recentes da etapa, juntando as séries
+    cujos rótulos batem com o filtro. None com menos de `minimo` amostras.
+    """
+    filtro = {k: str(v) for k, v in filtro.items()}
+    with _trava:
+        amostras = [s for (e, rotulos), h in _histogramas.items()
+                    if e == etapa and filtro.items() <= dict(rotulos).items() for s in h["recentes"]]
+    if len(amostras) < max(1, minimo):
+        return None
+    return _percentil(sorted(amostras), fracao)
+
+
+def resumo():
+    """
+    Resumo para o painel: {"etapas": [{etapa, rotulos, total, p50, p95, max, media}],
+    "contadores": {nome: valor}} (tempos em ms, percentis das amostras recentes).
+    """
+    with _trava:
+        series = [(etapa, dict(rotulos), h["total"], h["soma"], sorted(h["recentes"]))
+                  for (etapa, rotulos), h in _histogramas.items()]
+        contadores = dict(_contadores)
+
+    etapas = []
+    for etapa, rotulos, total, soma, ordenadas in sorted(series, key=lambda s: (s[0], sorted(s[1].items()))):
+        etapas.append({
+            "etapa": etapa,
+            "rotulos": rotulos,
+            "total": total,
+            "media": soma / total * 1000 if total else 0.0,
+            "p50": _percentil(ordenadas, 0.50) * 1000 if ordenadas else 0.0,
+            "p95": _percentil(ordenadas, 0.95) * 1000 if ordenadas else 0.0,
+            "max": ordenadas[-1] * 1000 if ordenadas else 0.0,
+        })
+
+    somados = {}
+    for (nome, rotulos), valor in contadores.items():
+        rotulo = ",".join(f"{k}={v}" for k, v in rotulos)
+        somados[f"{nome}{{{rotulo}}}" if rotulo else nome] = valor
+    return {"etapas": etapas, "contadores": somados, "desde": _inicio_processo}
+
+
+def _escapar_rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatar_rotulos(rotulos, extra=()):
+    pares = list(rotulos) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar_rotulo(v)}"' for k, v in pares) + "}"
+
+
+def texto_prometheus():
+    """Todas as métricas no formato texto de exposição do Prometheus."""
+    with _trava:
+        histogramas = {chave: (list(h["baldes"]), h["soma"], h["total"]) for chave, h in _histogramas.items()}
+        contadores = dict(_contadores)
+
+    linhas = []
+    for etapa in sorted({etapa for etapa, _ in histogramas}):
+        nome = f"gambot_{etapa}_segundos"
+        linhas.append(f"# HELP {nome} {DESCRICOES.get(etapa, etapa)}")
+        linhas.append(f"# TYPE {nome} histogram")
+        for (e, rotulos), (baldes, soma, total) in sorted(histogramas.items()):
+            if e != etapa:
+                continue
+            acumulado = 0
+            for limite, quantidade in zip(BALDES, baldes):
+                acumulado += quantidade
+                linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, [('le', limite)])} {acumulado}")
+            linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, [('le', '+Inf')])} {total}")
+            linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {soma:.6f}")
+            linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {total}")
+
+    for nome_base in sorted({nome for nome, _ in contadores}):
+        nome = f"gambot_{nome_base}_total"
+        linhas.append(f"# TYPE {nome} counter")
+        for (n, rotulos), valor in sorted(contadores.items()):
+            if n == nome_base:
+                linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {valor}")
+
+    linhas.append("# TYPE gambot_inicio_processo_segundos gauge")
+    linhas.append(f"gambot_inicio_processo_segundos {_inicio_processo:.0f}")
+    return "\n".join(linhas) + "\n"
+
+
+def gravar_arquivo(caminho):
+    """Grava as métricas no arquivo de forma atômica (leitores nunca veem arquivo pela metade)."""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(texto_prometheus())
+    os.replace(temporario, caminho)
+
+
+_exportador = None
+
+
+def iniciar_exportacao(caminho=ARQUIVO_METRICAS, intervalo=INTERVALO_EXPORTACAO):
+    """Grava o arquivo de métricas periodicamente numa thread de fundo (uma por processo)."""
+    global _exportador
+    if not caminho:
+        return None
+    with _trava:
+        if _exportador is not None:
+            return _exportador
+
+        def exportar():
+            while True:
+                try:
+                    gravar_arquivo(caminho)
+                except OSError as e:
+                    log.warning("Não foi possível gravar as métricas em %s: %s", caminho, e)
+                time.sleep(intervalo)
+
+        _exportador = threading.Thread(target=exportar, name="gambot-metricas", daemon=True)
+        _exportador.start()
+    return _exportador
@@ -0,0 +1,308 @@
+"""
+Motor de busca e resposta do Gambot, sem dependência do Streamlit.
+
+Um MotorGambot mantém o índice aquecido (via observador da pasta de PDFs)
+e expõe busca, resposta da IA e reindexação para qualquer front-end: a
+interface Streamlit, o servidor HTTP (servidor.py), a plataforma Gam.py
+ou um bot. Também pode ser usado pela linha de comando:
+
+    python motor.py search "carga horária do TCC"
+    python motor.py ask "como faço o trancamento?"
+    python motor.py batch perguntas.csv --saida respostas.jsonl
+    python motor.py ingest
+    python motor.py build-index
+    python motor.py serve --porta 8000
+"""
+import argparse
+import contextlib
+import json
+import sys
+import threading
+import time
+
+from busca import MODO_PADRAO, MODOS_BUSCA, buscar_inteligente, extrair_contexto_para_ia
+from cache_buscas import obter_cache_buscas
+from cache_respostas import obter_cache_respostas
+from clientes_openai import obter_cliente
+from configuracao import carregar_configuracoes
+from ia import gerar_resposta_ia
+from indice import Indice
+from indice_disco import montar_indice_em_disco
+from ingestao import PASTA_DADOS
+from lote import CONCORRENCIA_PADRAO, RPM_PADRAO, TPM_PADRAO, executar_lote
+from metricas import configurar_logs, contar, iniciar_exportacao
+from observador import obter_observador
+from resiliencia import ORCAMENTO_PADRAO, TENTATIVAS_PADRAO, obter_disjuntor
+from vetorial import IndiceVetorial
+
+# Espera (segundos) entre duas olhadas nos documentos já lidos durante a busca progressiva
+INTERVALO_PARCIAL = 0.1
+
+
+class MotorGambot:
+    """Pipeline de recuperação e resposta sobre um índice mantido em memória."""
+
+    def __init__(self, pasta=PASTA_DADOS, config=None, observador=None, preaquecedor=None):
+        self.config = dict(config if config is not None else carregar_configuracoes())
+        self.observador = observador or obter_observador(pasta)
+        # Opcional: busca e contexto das perguntas frequentes já calculados
+        self.preaquecedor = preaquecedor
+
+    @property
+    def pronto(self):
+        return self.observador.pronto
+
+    def aguardar_indice(self, timeout=None):
+        """Espera o primeiro índice ficar pronto. Retorna False se o tempo acabar."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while not self.observador.pronto:
+            if limite is not None and time.monotonic() >= limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def buscar(self, pergunta, modo=MODO_PADRAO):
+        """Retorna {"resultados", "contexto", "versao"} para a pergunta no índice atual."""
+        if modo not in MODOS_BUSCA:
+            raise ValueError(f"Modo de busca desconhecido: {modo}")
+        indice = self.observador.indice
+        if indice is None:
+            return {"resultados": [], "contexto": "", "versao": None}
+
+        if self.preaquecedor is not None and modo == MODO_PADRAO:
+            preaquecida = self.preaquecedor.obter(pergunta, indice.versao)
+            if preaquecida:
+                return preaquecida
+
+        resultados = buscar_inteligente(pergunta, indice, modo)
+        return {
+            "resultados": resultados,
+            "contexto": extrair_contexto_para_ia(resultados),
+            "versao": indice.versao,
+        }
+
+    def buscar_progressivo(self, pergunta, modo=MODO_PADRAO, intervalo=INTERVALO_PARCIAL):
+        """
+        Gerador de buscas. Com o índice pronto, produz só o resultado final.
+        Durante a primeira indexação, produz resultados provisórios sobre os
+        documentos já lidos, reordenados a cada documento que chega, e por fim
+        o resultado do índice completo. Cada item é o dict de buscar() com
+        "parcial", "documentos" (lidos) e "total".
+        """
+        if modo not in MODOS_BUSCA:
+            raise ValueError(f"Modo de busca desconhecido: {modo}")
+        observador = self.observador
+        parcial = None
+        while not observador.pronto:
+            if observador.progresso["erro"] and not observador.progresso["indexando"]:
+                break
+            carregados = list(observador.documentos_carregados)
+            if not carregados or (parcial is not None and len(carregados) == len(parcial.arquivos)):
+                time.sleep(intervalo)
+                continue
+            # Índice só dos documentos lidos (os segmentos dos anteriores são reaproveitados)
+            parcial = Indice(carregados, base=parcial)
+            if modo != "palavras":
+                parcial.vetorial = IndiceVetorial(parcial)
+            yield {
+                # Índice provisório: não entra no cache de buscas (seria trocado a cada documento)
+                "resultados": buscar_inteligente(pergunta, parcial, modo, usar_cache=False),
+                "contexto": "",
+                "versao": None,
+                "parcial": True,
+                "documentos": len(carregados),
+                "total": max(len(observador.foto_atual), len(carregados)),
+            }
+        busca = self.buscar(pergunta, modo)
+        total = len(self.observador.arquivos)
+        yield dict(busca, parcial=False, documentos=total, total=total)
+
+    def responder(self, pergunta, busca=None, modo=MODO_PADRAO, api_key=None, ao_receber=None):
+        """
+        Responde com a IA a partir do contexto recuperado (reaproveita `busca`
+        se já foi feita). Consulta e alimenta o cache de respostas.
+        Retorna {"resposta", "erro", "do_cache", "degradado", "segundos"}; com
+        `degradado` a OpenAI não respondeu a tempo (ou o disjuntor está aberto)
+        e quem chamou deve mostrar só os trechos da busca.
+        """
+        busca = busca or self.buscar(pergunta, modo)
+        modelo = self.config["modelo"]
+        # Sem índice pronto (versão None) a resposta não entra nem sai do cache
+        versao_indice = busca["versao"]
+        cache = obter_cache_respostas() if versao_indice else None
+        inicio = time.perf_counter()
+
+        resposta = cache.buscar(pergunta, busca["contexto"], modelo, versao_indice) if cache else None
+        if resposta is not None:
+            contar("respostas_ia", origem="cache")
+            return {"resposta": resposta, "erro": None, "do_cache": True, "degradado": False,
+                    "segundos": time.perf_counter() - inicio}
+
+        cliente = obter_cliente(api_key or self.config["api_key"])
+        if not cliente:
+            contar("respostas_ia", origem="sem_cliente")
+            return {
+                "resposta": None,
+                "erro": "Não foi possível conectar à OpenAI. Verifique sua API Key.",
+                "do_cache": False,
+                "degradado": False,
+                "segundos": 0.0,
+            }
+
+        resposta, erro = gerar_resposta_ia(
+            pergunta, busca["contexto"], cliente, modelo, self.config["max_tokens"], ao_receber=ao_receber,
+            orcamento=self.config.get("orcamento_ia", ORCAMENTO_PADRAO), hedge=self.config.get("hedge_ia", False),
+            tentativas=self.config.get("tentativas_ia", TENTATIVAS_PADRAO),
+        )
+        segundos = time.perf_counter() - inicio
+        degradado = getattr(erro, "degradado", False)
+        contar("respostas_ia", origem="degradado" if degradado else "erro" if erro else "openai")
+        if cache and not erro:
+            cache.guardar(pergunta, busca["contexto"], modelo, versao_indice, resposta, segundos)
+        return {"resposta": resposta, "erro": erro, "do_cache": False, "degradado": degradado, "segundos": segundos}
+
+    def perguntar(self, pergunta, modo=MODO_PADRAO, api_key=None, ao_receber=None):
+        """Busca e resposta numa chamada só: {"pergunta", "resultados", "resposta", ...}."""
+        busca = self.buscar(pergunta, modo)
+        resposta = self.responder(pergunta, busca, modo, api_key, ao_receber)
+        return dict(resposta, pergunta=pergunta, resultados=busca["resultados"])
+
+    def ingerir(self):
+        """Reindexa agora (só os PDFs novos ou alterados) e retorna o status."""
+        trocou = self.observador.atualizar()
+        return dict(self.status(), reindexado=trocou)
+
+    def status(self):
+        indice = self.observador.indice
+        return {
+            "pronto": indice is not None,
+            "versao": indice.versao if indice else None,
+            "arquivos": self.observador.arquivos,
+            "paginas": indice.total_paginas if indice else 0,
+            "trechos": indice.total_fragmentos if indice else 0,
+            "progresso": dict(self.observador.progresso),
+            "cache_buscas": obter_cache_buscas().metricas(),
+            "cache_respostas": obter_cache_respostas().metricas(),
+            "disjuntor_openai": obter_disjuntor().status(),
+        }
+
+
+_motor = None
+_trava = threading.Lock()
+
+
+def obter_motor(pasta=PASTA_DADOS, config=None, preaquecedor=None):
+    """Retorna o motor do processo, criando-o na primeira chamada."""
+    global _motor
+    with _trava:
+        if _motor is None:
+            _motor = MotorGambot(pasta, config, preaquecedor=preaquecedor)
+        return _motor
+
+
+def _imprimir_json(dados, saida):
+    print(json.dumps(dados, ensure_ascii=False, indent=2), file=saida)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca e respostas do Gambot sem a interface Streamlit.")
+    parser.add_argument("--pasta", default=PASTA_DADOS, help="pasta com os PDFs")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_busca = comandos.add_parser("search", help="busca trechos nos documentos")
+    p_busca.add_argument("pergunta")
+    p_busca.add_argument("--modo", choices=list(MODOS_BUSCA), default=MODO_PADRAO)
+
+    p_pergunta = comandos.add_parser("ask", help="responde com a IA a partir dos documentos")
+    p_pergunta.add_argument("pergunta")
+    p_pergunta.add_argument("--modo", choices=list(MODOS_BUSCA), default=MODO_PADRAO)
+
+    p_lote = comandos.add_parser("batch", help="responde com a IA as perguntas de um CSV/JSONL (retomável)")
+    p_lote.add_argument("entrada", help="CSV (coluna 'pergunta' e opcionalmente 'id') ou JSONL")
+    p_lote.add_argument("--saida", help="JSONL com as respostas (padrão: <entrada>.respostas.jsonl)")
+    p_lote.add_argument("--modo", choices=list(MODOS_BUSCA), default=MODO_PADRAO)
+    p_lote.add_argument("--concorrencia", type=int, default=CONCORRENCIA_PADRAO, help="chamadas simultâneas à OpenAI")
+    p_lote.add_argument("--rpm", type=int, default=RPM_PADRAO, help="requisições por minuto (0 = sem limite)")
+    p_lote.add_argument("--tpm", type=int, default=TPM_PADRAO, help="tokens por minuto (0 = sem limite)")
+
+    comandos.add_parser("ingest", help="reindexa os PDFs novos ou alterados")
+
+    p_indice = comandos.add_parser("build-index", help="grava o índice em disco (mmap) para as réplicas abrirem pronto")
+    p_indice.add_argument("--saida", help="arquivo do índice (padrão: <pasta>/indice.gbi)")
+    p_indice.add_argument("--trabalhadores", type=int, default=None, help="processos de extração")
+
+    p_servidor = comandos.add_parser("serve", help="inicia o servidor HTTP JSON")
+    p_servidor.add_argument("--host", default="127.0.0.1")
+    p_servidor.add_argument("--porta", type=int, default=8000)
+
+    args = parser.parse_args(argv)
+    configurar_logs()
+    iniciar_exportacao()
+
+    # Logs vão para stderr; stdout fica só com o resultado
+    saida = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.comando == "build-index":
+            # Offline: não inicia o observador nem abre um índice existente
+            _imprimir_json(montar_indice_em_disco(args.pasta, args.saida, args.trabalhadores), saida)
+            return 0
+
+        motor = MotorGambot(args.pasta)
+
+        if args.comando == "serve":
+            from servidor import servir
+            servir(motor, args.host, args.porta)
+            return 0
+
+        if args.comando == "ingest":
+            _imprimir_json(motor.ingerir(), saida)
+            return 0
+
+        motor.aguardar_indice()
+        if args.comando == "batch":
+            def progresso(registro, feitas, total):
+                situacao = "erro" if registro["erro"] else ("cache" if registro["do_cache"] else f"{registro['segundos']:.1f}s")
+                print(f"[{feitas}/{total}] {registro['id']}: {situacao}", file=sys.stderr)
+
+            try:
+                resumo = executar_lote(motor, args.entrada, args.saida, modo=args.modo, concorrencia=args.concorrencia,
+                                       rpm=args.rpm, tpm=args.tpm, ao_concluir=progresso)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 1
+            _imprimir_json(resumo, saida)
+            return 1 if resumo["erros"] else 0
+
+        if args.comando == "search":
+            resultados = motor.buscar(args.pergunta, args.modo)["resultados"]
+            _imprimir_json([{k: v for k, v in r.items() if k != "texto_para_ia"} for r in resultados], saida)
+            return 0
+
+        # ask: imprime a resposta conforme chega
+        impresso = 0
+        def mostrar(texto):
+            nonlocal impresso
+            if len(texto) < impresso:
+                saida.write("\n")   # nova tentativa: o texto recomeçou
+                impresso = 0
+            saida.write(texto[impresso:])
+            saida.flush()
+            impresso = len(texto)
+
+        resultado = motor.perguntar(args.pergunta, args.modo, ao_receber=mostrar)
+        if resultado["degradado"]:
+            # Sem a IA, mostra os trechos como o comando search
+            print(f"{resultado['erro']} Mostrando os trechos da busca.", file=sys.stderr)
+            _imprimir_json([{k: v for k, v in r.items() if k != "texto_para_ia"} for r in resultado["resultados"]], saida)
+            return 0
+        if resultado["erro"]:
+            print(resultado["erro"], file=sys.stderr)
+            return 1
+        print(resultado["resposta"] if not impresso else "", file=saida)
+        fontes = sorted({(r["arquivo"], r["pagina"]) for r in resultado["resultados"]})
+        print("\nFontes: " + "; ".join(f"{a}, p. {p}" for a, p in fontes), file=saida)
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Reindexação incremental em segundo plano.
+
+Uma thread observa a pasta data/ e, quando um PDF é adicionado, alterado ou
+removido, extrai e reindexa só esses arquivos. O índice novo é montado ao
+lado do antigo e trocado de uma vez, então as buscas continuam sendo
+atendidas pelo índice anterior enquanto a indexação acontece.
+
+Na partida, se houver um índice pré-montado em disco (indice_disco) feito
+com os mesmos PDFs da pasta, ele é aberto com mmap em vez de extrair e
+indexar tudo de novo.
+"""
+import logging
+import os
+import threading
+import time
+
+from ingestao import PASTA_CACHE, PASTA_DADOS, carregar_corpus
+from indice import Indice
+from indice_disco import abrir_indice, caminho_indice
+from metricas import medir
+from vetorial import IndiceVetorial
+
+log = logging.getLogger("gambot.observador")
+
+# Intervalo (segundos) entre duas verificações da pasta
+INTERVALO_VERIFICACAO = float(os.environ.get("GAMBOT_INTERVALO_OBSERVADOR", "2"))
+
+
+def fotografar_pasta(pasta):
+    """Retorna {arquivo: (tamanho, data de modificação)} dos PDFs da pasta."""
+    foto = {}
+    try:
+        entradas = os.scandir(pasta)
+    except FileNotFoundError:
+        return foto
+    with entradas:
+        for entrada in entradas:
+            if entrada.is_file() and entrada.name.lower().endswith(".pdf"):
+                info = entrada.stat()
+                foto[entrada.name] = (info.st_size, info.st_mtime)
+    return foto
+
+
+class ObservadorCorpus:
+    """Mantém o índice do corpus atualizado numa thread de fundo."""
+
+    def __init__(self, pasta=PASTA_DADOS, pasta_cache=None, intervalo=INTERVALO_VERIFICACAO, arquivo_indice=None):
+        self.pasta = pasta
+        self.pasta_cache = pasta_cache or os.path.join(pasta, os.path.basename(PASTA_CACHE))
+        self.arquivo_indice = arquivo_indice or caminho_indice(pasta)
+        self.intervalo = intervalo
+
+        # Estado servido às buscas; trocado de uma vez ao fim de cada indexação
+        self.indice = None
+        self.documentos = []
+        self.foto_indexada = {}
+
+        # Documentos já lidos durante a primeira indexação (para resultados provisórios)
+        self.documentos_carregados = []
+
+        # Última foto da pasta (pode estar à frente do índice durante a indexação)
+        self.foto_atual = fotografar_pasta(pasta)
+        self.progresso = {
+            "indexando": False,
+            "concluido": 0,
+            "total": 0,
+            "mensagem": "",
+            "atualizado_em": None,
+            "erro": None,
+        }
+
+        # Funções chamadas (na thread do observador) com o novo índice após cada troca
+        self.ao_trocar_indice = []
+
+        self._trava = threading.Lock()
+        self._trava_atualizacao = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+
+    @property
+    def pronto(self):
+        return self.indice is not None
+
+    @property
+    def arquivos(self):
+        """PDFs presentes na pasta na última verificação."""
+        return sorted(self.foto_atual)
+
+    def iniciar(self):
+        """Inicia a thread de fundo (só uma vez por observador)."""
+        with self._trava:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="gambot-observador", daemon=True)
+                self._thread.start()
+        return self
+
+    def verificar_agora(self):
+        """Antecipa a próxima verificação da pasta."""
+        self._acordar.set()
+
+    def _executar(self):
+        while True:
+            try:
+                self.atualizar()
+            except Exception as e:
+                log.exception("Erro na indexação em segundo plano: %s", e)
+                self.progresso.update(indexando=False, erro=str(e))
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+
+    def _ao_progredir(self, concluido, total):
+        self.progresso.update(concluido=concluido, total=total)
+
+    def atualizar(self):
+        """Reindexa se algum PDF mudou desde a última indexação. Retorna True se trocou o índice."""
+        # A thread de fundo e pedidos explícitos (linha de comando, HTTP) não indexam ao mesmo tempo
+        with self._trava_atualizacao:
+            return self._atualizar()
+
+    def _atualizar(self):
+        foto = fotografar_pasta(self.pasta)
+        self.foto_atual = foto
+        if self.indice is not None and foto == self.foto_indexada:
+            return False
+        if self.indice is None and self._abrir_indice_em_disco(foto):
+            return True
+
+        anterior = self.foto_indexada
+        adicionados = sorted(foto.keys() - anterior.keys())
+        removidos = sorted(anterior.keys() - foto.keys())
+        alterados = sorted(a for a in foto.keys() & anterior.keys() if foto[a] != anterior[a])
+        log.info("Corpus mudou - adicionados: %s, alterados: %s, removidos: %s", adicionados, alterados, removidos)
+
+        inicio = time.perf_counter()
+        self.progresso.update(
+            indexando=True, concluido=0, total=0, erro=None,
+            mensagem=f"{len(adicionados) + len(alterados)} arquivo(s) novo(s) ou alterado(s)",
+        )
+
+        # Sem índice ainda: publica cada documento assim que é lido, para as buscas provisórias
+        carregados = self.documentos_carregados = []
+        documentos = carregar_corpus(self.pasta, self.pasta_cache, ao_progredir=self._ao_progredir,
+                                     ao_carregar=carregados.append if self.indice is None else None)
+        with medir("indexacao"):
+            novo_indice = Indice(documentos, base=self.indice)
+            novo_indice.vetorial = IndiceVetorial(novo_indice)
+
+        segundos = time.perf_counter() - inicio
+        self._trocar(novo_indice, documentos, foto,
+                     f"{novo_indice.total_paginas} página(s), {novo_indice.total_fragmentos} trecho(s) indexados em {segundos:.1f}s")
+        log.info("Índice %s pronto com %d trecho(s) em %.2fs", novo_indice.versao, novo_indice.total_fragmentos, segundos)
+        return True
+
+    def _abrir_indice_em_disco(self, foto):
+        """Usa o índice pré-montado se ele corresponder aos PDFs da pasta. Retorna True se abriu."""
+        inicio = time.perf_counter()
+        indice = abrir_indice(self.arquivo_indice)
+        if indice is None:
+            return False
+        if not indice.corresponde(self.pasta, foto):
+            log.info("Índice em disco %s não corresponde aos PDFs da pasta; montando em memória", self.arquivo_indice)
+            return False
+        segundos = time.perf_counter() - inicio
+        self._trocar(indice, indice.documentos, foto,
+                     f"{indice.total_paginas} página(s), {indice.total_fragmentos} trecho(s) do índice em disco ({segundos:.2f}s)")
+        log.info("Índice %s aberto de %s em %.3fs", indice.versao, self.arquivo_indice, segundos)
+        return True
+
+    def _trocar(self, novo_indice, documentos, foto, mensagem):
+        # Troca atômica: quem já pegou o índice antigo termina a busca com ele
+        with self._trava:
+            self.indice = novo_indice
+            self.documentos = documentos
+            self.foto_indexada = foto
+            self.documentos_carregados = []
+
+        self.progresso.update(indexando=False, mensagem=mensagem, atualizado_em=time.time())
+        for funcao in list(self.ao_trocar_indice):
+            try:
+                funcao(novo_indice)
+            except Exception as e:
+                log.exception("Erro ao avisar troca de índice: %s", e)
+
+
+_observadores = {}
+_trava_observadores = threading.Lock()
+
+
+def obter_observador(pasta=PASTA_DADOS, pasta_cache=None):
+    """Retorna o observador do processo para a pasta, iniciando-o na primeira chamada."""
+    chave = os.path.abspath(pasta)
+    with _trava_observadores:
+        observador = _observadores.get(chave)
+        if observador is None:
+            observador = ObservadorCorpus(pasta, pasta_cache)
+            _observadores[chave] = observador
+    return observador.iniciar()
@@ -0,0 +1,138 @@
+"""
+OCR local das páginas que são só imagem (PDF escaneado).
+
+A ingestão classifica cada página uma única vez: com texto, só imagem ou
+vazia. As páginas só com imagem passam pelo motor de OCR configurado em
+GAMBOT_OCR ("tesseract", ou "pacote.modulo:funcao" para outro motor) dentro
+dos mesmos processos da extração, e o resultado fica em cache pelo hash das
+imagens da página: o mesmo escaneamento nunca é reconhecido duas vezes,
+mesmo que o PDF mude em outras páginas. Sem motor configurado, as páginas
+só com imagem ficam de fora da busca.
+
+Um motor é uma função (imagem PIL) -> (texto, confiança de 0 a 1).
+"""
+import hashlib
+import importlib
+import json
+import logging
+import os
+from functools import lru_cache
+
+log = logging.getLogger("gambot.ocr")
+
+MOTOR_OCR = os.environ.get("GAMBOT_OCR", "").strip()
+IDIOMA_TESSERACT = os.environ.get("GAMBOT_OCR_IDIOMA", "por")
+
+# Páginas reconhecidas com confiança abaixo disso aparecem no relatório da ingestão
+CONFIANCA_BAIXA = 0.6
+
+
+def _tesseract():
+    import pytesseract
+
+    def reconhecer(imagem):
+        dados = pytesseract.image_to_data(imagem, lang=IDIOMA_TESSERACT, output_type=pytesseract.Output.DICT)
+        linhas = {}
+        confiancas = []
+        for i, palavra in enumerate(dados["text"]):
+            confianca = float(dados["conf"][i])
+            if not palavra.strip() or confianca < 0:
+                continue
+            # Mantém as quebras de linha: a divisão em trechos depende delas (Art., códigos da matriz)
+            chave = (dados["block_num"][i], dados["par_num"][i], dados["line_num"][i])
+            linhas.setdefault(chave, []).append(palavra)
+            confiancas.append(confianca / 100)
+        texto = "\n".join(" ".join(palavras) for palavras in linhas.values())
+        return texto, (sum(confiancas) / len(confiancas) if confiancas else 0.0)
+
+    return reconhecer
+
+
+# nome -> função que importa o motor e devolve reconhecer(imagem)
+MOTORES = {"tesseract": _tesseract}
+
+
+@lru_cache(maxsize=None)
+def obter_motor_ocr(nome=MOTOR_OCR):
+    """Função de reconhecimento do motor `nome`, ou None (sem OCR ou motor indisponível)."""
+    if not nome:
+        return None
+    try:
+        if nome in MOTORES:
+            return MOTORES[nome]()
+        modulo, _, funcao = nome.partition(":")
+        return getattr(importlib.import_module(modulo), funcao or "reconhecer")
+    except Exception as e:
+        log.warning("Motor de OCR %r indisponível (%s: %s); páginas só com imagem ficam sem texto",
+                    nome, type(e).__name__, e)
+        return None
+
+
+def imagens_da_pagina(pagina_pdf):
+    """Objetos de imagem usados diretamente pela página (sem decodificar nenhuma)."""
+    try:
+        objetos = pagina_pdf["/Resources"]["/XObject"]
+    except (KeyError, TypeError):
+        return []
+    imagens = []
+    for referencia in objetos.get_object().values():
+        objeto = referencia.get_object()
+        if objeto.get("/Subtype") == "/Image":
+            imagens.append(objeto)
+    return imagens
+
+
+def hash_imagens(imagens):
+    """Hash dos dados das imagens como estão no arquivo (ainda comprimidos)."""
+    h = hashlib.sha256()
+    for imagem in imagens:
+        h.update(getattr(imagem, "_data", b"") or imagem.get_data())
+    return h.hexdigest()
+
+
+def _caminho_cache(pasta_ocr, hash_pagina, nome_motor):
+    return os.path.join(pasta_ocr, f"{hash_pagina}-{hashlib.sha256(nome_motor.encode()).hexdigest()[:8]}.json")
+
+
+def reconhecer_pagina(pagina_pdf, imagens, pasta_ocr, nome_motor=MOTOR_OCR):
+    """
+    Texto da página só com imagem: do cache ou do motor de OCR.
+    Retorna {"texto", "motor", "confianca", "hash_imagens"} (texto vazio se o
+    motor não está disponível ou falhou).
+    """
+    hash_pagina = hash_imagens(imagens)
+    resultado = {"texto": "", "motor": nome_motor, "confianca": None, "hash_imagens": hash_pagina}
+    caminho = _caminho_cache(pasta_ocr, hash_pagina, nome_motor)
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return dict(resultado, **json.load(f))
+    except (OSError, json.JSONDecodeError):
+        pass
+
+    reconhecer = obter_motor_ocr(nome_motor)
+    if reconhecer is None:
+        return resultado
+    textos = []
+    pesos = []
+    try:
+        # Só aqui as imagens são decodificadas, uma vez por escaneamento
+        for imagem in pagina_pdf.images:
+            texto, confianca = reconhecer(imagem.image)
+            if texto.strip():
+                textos.append(texto)
+                pesos.append((len(texto), confianca))
+    except Exception as e:
+        log.warning("OCR falhou (%s: %s)", type(e).__name__, e)
+        return resultado
+
+    caracteres = sum(n for n, _ in pesos)
+    reconhecido = {
+        "texto": "\n".join(textos),
+        "confianca": round(sum(n * c for n, c in pesos) / caracteres, 3) if caracteres else 0.0,
+    }
+    os.makedirs(pasta_ocr, exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(reconhecido, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+    return dict(resultado, **reconhecido)
@@ -0,0 +1,172 @@
+"""
+Pré-aquecimento das perguntas frequentes.
+
+Sempre que o índice é trocado, uma thread recalcula a busca e o contexto
+de cada pergunta do FAQ (e das perguntas "quentes" listadas em arquivo),
+para que o clique numa pergunta frequente seja atendido na hora.
+Opcionalmente também gera as respostas da IA e as deixa no cache de
+respostas.
+"""
+import logging
+import os
+import threading
+import time
+
+from busca import buscar_inteligente, extrair_contexto_para_ia
+from cache_respostas import obter_cache_respostas
+from clientes_openai import obter_cliente
+from ia import MAX_TOKENS_PADRAO, MODELO_PADRAO, gerar_resposta_ia
+from ingestao import normalizar_texto
+from resiliencia import ORCAMENTO_PADRAO, TENTATIVAS_PADRAO, Disjuntor, obter_disjuntor
+
+log = logging.getLogger("gambot.preaquecimento")
+
+# Uma pergunta por linha; linhas vazias e começando com '#' são ignoradas
+ARQUIVO_PERGUNTAS_QUENTES = os.environ.get("GAMBOT_PERGUNTAS_QUENTES", "perguntas_quentes.txt")
+
+
+def carregar_perguntas_quentes(caminho=ARQUIVO_PERGUNTAS_QUENTES):
+    """Lê a lista de perguntas extras a pré-aquecer (arquivo opcional)."""
+    if not caminho or not os.path.exists(caminho):
+        return []
+    with open(caminho, "r", encoding="utf-8") as f:
+        return [linha.strip() for linha in f if linha.strip() and not linha.strip().startswith("#")]
+
+
+def chave_pergunta(pergunta):
+    """Normaliza a pergunta para comparação (acentos, caixa, espaços e pontuação final)."""
+    return normalizar_texto(" ".join(pergunta.split())).strip(" ?!.")
+
+
+class Preaquecedor:
+    """Mantém busca, contexto e (opcionalmente) respostas das perguntas frequentes prontos."""
+
+    def __init__(self, observador, perguntas, config=None, arquivo_quentes=ARQUIVO_PERGUNTAS_QUENTES):
+        self.observador = observador
+        self.perguntas = list(perguntas)
+        self.config = dict(config or {})
+        self.arquivo_quentes = arquivo_quentes
+
+        self.resultados = {}   # chave da pergunta -> {"resultados", "contexto", "versao"}
+        self.situacao = {"versao": None, "perguntas": 0, "respostas": 0, "segundos": 0.0}
+
+        # Disjuntor próprio: falhas do pré-aquecimento não desligam a IA de quem está usando o app
+        self.disjuntor = Disjuntor()
+
+        self._mtime_quentes = self._ler_mtime_quentes()
+        self._pendente = threading.Event()
+        self._thread = None
+        observador.ao_trocar_indice.append(lambda indice: self._pendente.set())
+        if observador.pronto:
+            self._pendente.set()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name="gambot-preaquecimento", daemon=True)
+            self._thread.start()
+        return self
+
+    def _ler_mtime_quentes(self):
+        try:
+            return os.path.getmtime(self.arquivo_quentes)
+        except (OSError, TypeError):
+            return None
+
+    def _executar(self):
+        while True:
+            # Acorda quando o índice muda ou quando o arquivo de perguntas quentes é editado
+            if not self._pendente.wait(timeout=30):
+                mtime = self._ler_mtime_quentes()
+                if mtime == self._mtime_quentes:
+                    continue
+                self._mtime_quentes = mtime
+            self._pendente.clear()
+            try:
+                self.preaquecer(self.observador.indice)
+            except Exception as e:
+                log.exception("Erro no pré-aquecimento: %s", e)
+
+    def preaquecer(self, indice):
+        """Recalcula todas as perguntas para o índice informado."""
+        if indice is None:
+            return
+        inicio = time.perf_counter()
+        perguntas = list(dict.fromkeys(self.perguntas + carregar_perguntas_quentes(self.arquivo_quentes)))
+
+        novos = {}
+        for pergunta in perguntas:
+            resultados = buscar_inteligente(pergunta, indice)
+            novos[chave_pergunta(pergunta)] = {
+                "resultados": resultados,
+                "contexto": extrair_contexto_para_ia(resultados),
+                "versao": indice.versao,
+            }
+        self.resultados = novos
+
+        respostas = 0
+        if self.config.get("preaquecer_respostas") and self.config.get("api_key"):
+            respostas = self._gerar_respostas(perguntas, indice)
+
+        self.situacao = {
+            "versao": indice.versao,
+            "perguntas": len(novos),
+            "respostas": respostas,
+            "segundos": time.perf_counter() - inicio,
+        }
+        log.info("Pré-aquecimento de %d pergunta(s) concluído em %.2fs", len(novos), self.situacao["segundos"])
+
+    def _gerar_respostas(self, perguntas, indice):
+        """
+        Gera na IA as respostas que ainda não estão no cache de respostas.
+        Para na primeira falha por indisponibilidade (ou com a OpenAI já
+        desligada pelo disjuntor compartilhado); a próxima rodada tenta de novo.
+        """
+        cache = obter_cache_respostas()
+        cliente = obter_cliente(self.config["api_key"])
+        modelo = self.config.get("modelo", MODELO_PADRAO)
+        max_tokens = self.config.get("max_tokens", MAX_TOKENS_PADRAO)
+        orcamento = self.config.get("orcamento_ia", ORCAMENTO_PADRAO)
+        tentativas = self.config.get("tentativas_ia", TENTATIVAS_PADRAO)
+        geradas = 0
+
+        for pergunta in perguntas:
+            # Se o índice mudou no meio do caminho, a próxima rodada refaz tudo
+            if self.observador.indice is not indice or not cliente:
+                break
+            if obter_disjuntor().estado != "fechado":
+                log.info("Pré-aquecimento das respostas interrompido: OpenAI desligada pelo disjuntor")
+                break
+            contexto = self.resultados[chave_pergunta(pergunta)]["contexto"]
+            if cache.buscar(pergunta, contexto, modelo, indice.versao, registrar_metricas=False) is not None:
+                continue
+            inicio = time.perf_counter()
+            resposta, erro = gerar_resposta_ia(pergunta, contexto, cliente, modelo, max_tokens,
+                                               orcamento=orcamento, disjuntor=self.disjuntor, tentativas=tentativas)
+            if erro:
+                log.warning("Pré-aquecimento sem resposta para '%s': %s", pergunta, erro)
+                if getattr(erro, "degradado", False):
+                    break   # OpenAI fora do ar ou lenta: não insiste nas outras perguntas
+                continue
+            cache.guardar(pergunta, contexto, modelo, indice.versao, resposta, time.perf_counter() - inicio)
+            geradas += 1
+        return geradas
+
+    def obter(self, pergunta, versao):
+        """Retorna busca e contexto pré-calculados para a pergunta, se valerem para o índice atual."""
+        entrada = self.resultados.get(chave_pergunta(pergunta))
+        if entrada and entrada["versao"] == versao:
+            return entrada
+        return None
+
+
+_preaquecedor = None
+_trava = threading.Lock()
+
+
+def obter_preaquecedor(observador, perguntas, config=None):
+    """Retorna o pré-aquecedor do processo, iniciando-o na primeira chamada."""
+    global _preaquecedor
+    with _trava:
+        if _preaquecedor is None:
+            _preaquecedor = Preaquecedor(observador, perguntas, config).iniciar()
+        return _preaquecedor
@@ -0,0 +1,263 @@
+"""
+Proteções das chamadas à OpenAI feitas enquanto o usuário espera.
+
+- Orçamento: cada pergunta tem um prazo total, que vale para todas as
+  tentativas somadas; cada chamada usa como timeout o tempo que sobrou.
+- Novas tentativas: só para falhas passageiras (429, 5xx, timeout e
+  conexão), com espera exponencial aleatória ("full jitter") e
+  respeitando o Retry-After quando a API manda.
+- Hedge (opcional): se a chamada passa do p95 observado sem responder,
+  dispara uma segunda igual e fica com a que chegar primeiro.
+- Disjuntor: depois de várias perguntas seguidas sem resposta, para de
+  chamar a OpenAI por um tempo. Nesse intervalo o app mostra direto os
+  trechos da busca tradicional em vez de deixar o usuário esperando.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import openai
+
+from metricas import contar, percentil
+
+log = logging.getLogger("gambot.openai")
+
+# Prazo total (segundos) de uma resposta, somando tentativas e esperas; valores
+# padrão das opções ORCAMENTO_IA, TENTATIVAS_IA e HEDGE_IA (lidas em configuracao)
+ORCAMENTO_PADRAO = 30.0
+TENTATIVAS_PADRAO = 3
+HEDGE_PADRAO = False
+
+# Espera entre tentativas: aleatória entre 0 e min(ESPERA_MAXIMA, ESPERA_BASE * 2^tentativa)
+ESPERA_BASE = 0.5
+ESPERA_MAXIMA = 8.0
+
+# Não vale começar uma tentativa com menos tempo que isso no orçamento
+TEMPO_MINIMO_TENTATIVA = 1.0
+
+# Perguntas seguidas sem resposta que abrem o disjuntor, e quanto tempo ele fica aberto
+FALHAS_PARA_ABRIR = 3
+SEGUNDOS_ABERTO = 30.0
+
+# O hedge só é disparado depois de amostras suficientes para o p95 fazer sentido
+AMOSTRAS_MINIMAS_HEDGE = 20
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gambot-hedge")
+
+
+class IAIndisponivel(Exception):
+    """A OpenAI não respondeu dentro do orçamento (ou o disjuntor está aberto): cair na busca tradicional."""
+
+
+class TempoEsgotado(IAIndisponivel):
+    """O orçamento da pergunta acabou no meio de uma tentativa."""
+
+
+def restante(prazo):
+    """Segundos até o prazo (instante de time.monotonic)."""
+    return prazo - time.monotonic()
+
+
+def verificar_prazo(prazo):
+    if restante(prazo) <= 0:
+        raise TempoEsgotado("O tempo limite da resposta acabou.")
+
+
+def falha_transitoria(e):
+    """Falhas que podem passar sozinhas: vale tentar de novo (e contam para o disjuntor)."""
+    if isinstance(e, (IAIndisponivel, openai.APITimeoutError, openai.APIConnectionError, TimeoutError, ConnectionError)):
+        return True
+    # Erros de rede no meio do stream chegam direto da biblioteca HTTP usada pelo SDK
+    if any(classe.__name__ == "TransportError" for classe in type(e).__mro__):
+        return True
+    if isinstance(e, openai.APIStatusError):
+        if getattr(e, "code", None) == "insufficient_quota":
+            return False   # 429 por falta de crédito não passa esperando
+        return e.status_code in (408, 409, 429) or e.status_code >= 500
+    return False
+
+
+def espera_backoff(tentativa, erro=None):
+    """Espera antes da próxima tentativa; o Retry-After da API, quando vem, é o mínimo."""
+    espera = random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** tentativa))
+    resposta = getattr(erro, "response", None)
+    if resposta is not None:
+        try:
+            cabecalhos = resposta.headers
+            if cabecalhos.get("retry-after-ms"):
+                espera = max(espera, float(cabecalhos["retry-after-ms"]) / 1000)
+            elif cabecalhos.get("retry-after"):
+                espera = max(espera, float(cabecalhos["retry-after"]))
+        except (AttributeError, ValueError):
+            pass   # Retry-After em formato de data: fica a espera calculada
+    return espera
+
+
+class Disjuntor:
+    """
+    Fechado: as chamadas passam. Aberto (depois de `falhas_para_abrir`
+    falhas seguidas): recusa tudo por `segundos_aberto`. Meio aberto: deixa
+    uma chamada de teste passar; se ela responder, fecha de novo.
+    Compartilhado por todas as sessões do processo.
+    """
+
+    def __init__(self, falhas_para_abrir=FALHAS_PARA_ABRIR, segundos_aberto=SEGUNDOS_ABERTO):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.segundos_aberto = segundos_aberto
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0      # time.monotonic
+        self.teste_desde = None    # chamada de teste em andamento (meio aberto)
+        self._trava = threading.Lock()
+
+    def _estado(self, agora):
+        if self.falhas_seguidas < self.falhas_para_abrir:
+            return "fechado"
+        return "aberto" if agora < self.aberto_ate else "meio_aberto"
+
+    @property
+    def estado(self):
+        with self._trava:
+            return self._estado(time.monotonic())
+
+    def permitir(self):
+        """True se a chamada pode ir para a OpenAI agora."""
+        with self._trava:
+            agora = time.monotonic()
+            estado = self._estado(agora)
+            if estado == "fechado":
+                return True
+            # Um teste que nunca voltou (sessão interrompida) não prende o disjuntor para sempre
+            if estado == "meio_aberto" and (self.teste_desde is None or agora - self.teste_desde > self.segundos_aberto):
+                self.teste_desde = agora
+                return True
+            return False
+
+    def registrar_sucesso(self):
+        with self._trava:
+            if self.falhas_seguidas >= self.falhas_para_abrir:
+                log.info("OpenAI respondeu de novo; disjuntor fechado")
+                contar("disjuntor_openai", evento="fechado")
+            self.falhas_seguidas = 0
+            self.teste_desde = None
+
+    def registrar_falha(self):
+        with self._trava:
+            self.falhas_seguidas += 1
+            self.teste_desde = None
+            if self.falhas_seguidas >= self.falhas_para_abrir:
+                self.aberto_ate = time.monotonic() + self.segundos_aberto
+                log.warning("Disjuntor da OpenAI aberto por %.0f s (%d falhas seguidas)",
+                            self.segundos_aberto, self.falhas_seguidas)
+                contar("disjuntor_openai", evento="aberto")
+
+    def status(self):
+        with self._trava:
+            agora = time.monotonic()
+            return {
+                "estado": self._estado(agora),
+                "falhas_seguidas": self.falhas_seguidas,
+                "segundos_para_teste": max(0.0, round(self.aberto_ate - agora, 1)),
+            }
+
+
+_disjuntor = None
+_trava = threading.Lock()
+
+
+def obter_disjuntor():
+    """Retorna o disjuntor do processo, criando-o na primeira chamada."""
+    global _disjuntor
+    with _trava:
+        if _disjuntor is None:
+            _disjuntor = Disjuntor()
+        return _disjuntor
+
+
+def atraso_hedge(etapa, **rotulos):
+    """p95 recente da etapa (segundos), ou None enquanto não há amostras suficientes."""
+    return percentil(etapa, 0.95, minimo=AMOSTRAS_MINIMAS_HEDGE, **rotulos)
+
+
+def com_hedge(abrir, atraso=None, descartar=None):
+    """
+    Executa `abrir()`; se passar de `atraso` segundos sem terminar, dispara
+    uma segunda execução e devolve a primeira que der certo. O resultado da
+    perdedora vai para `descartar` (ex.: fechar o stream).
+    """
+    if not atraso:
+        return abrir()
+
+    primeira = _executor.submit(abrir)
+    if wait([primeira], timeout=atraso).done:
+        return primeira.result()
+
+    contar("hedge_openai", evento="disparado")
+    segunda = _executor.submit(abrir)
+
+    def liberar(futuro):
+        if descartar and futuro.exception() is None:
+            try:
+                descartar(futuro.result())
+            except Exception as e:
+                log.debug("Erro ao descartar a resposta do hedge: %s", e)
+
+    pendentes = {primeira, segunda}
+    erro = None
+    while pendentes:
+        feitas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+        certas = [f for f in feitas if f.exception() is None]
+        if certas:
+            vencedora = segunda if segunda in certas else certas[0]
+            for futuro in certas:
+                if futuro is not vencedora:
+                    liberar(futuro)
+            for futuro in pendentes:
+                futuro.add_done_callback(liberar)
+            if vencedora is segunda:
+                contar("hedge_openai", evento="venceu")
+            return vencedora.result()
+        erro = next(iter(feitas)).exception()
+    raise erro
+
+
+def executar_com_orcamento(tentativa, orcamento=ORCAMENTO_PADRAO, tentativas=TENTATIVAS_PADRAO, disjuntor=None):
+    """
+    Chama `tentativa(prazo)` até dar certo, dentro do orçamento e do limite
+    de tentativas, esperando entre elas. Falhas que não são passageiras
+    (chave inválida, requisição malformada) sobem na hora, como vieram.
+    Levanta IAIndisponivel se o disjuntor está aberto ou se as tentativas
+    ou o orçamento acabaram.
+    """
+    disjuntor = disjuntor or obter_disjuntor()
+    if not disjuntor.permitir():
+        contar("respostas_degradadas", motivo="disjuntor")
+        raise IAIndisponivel("A IA está instável no momento e foi desligada por alguns segundos.")
+
+    prazo = time.monotonic() + orcamento
+    ultimo_erro = None
+    for numero in range(max(1, tentativas)):
+        try:
+            resultado = tentativa(prazo)
+        except Exception as e:
+            if not falha_transitoria(e):
+                disjuntor.registrar_sucesso()   # a API respondeu; o problema é da requisição
+                raise
+            ultimo_erro = e
+            contar("tentativas_openai", motivo=type(e).__name__)
+            espera = espera_backoff(numero, e)
+            if numero + 1 >= tentativas or restante(prazo) - espera < TEMPO_MINIMO_TENTATIVA:
+                break
+            log.warning("OpenAI falhou (%s: %s); nova tentativa em %.1f s", type(e).__name__, str(e)[:120], espera)
+            time.sleep(espera)
+        else:
+            disjuntor.registrar_sucesso()
+            return resultado
+
+    disjuntor.registrar_falha()
+    motivo = "orcamento" if isinstance(ultimo_erro, TempoEsgotado) or restante(prazo) < TEMPO_MINIMO_TENTATIVA else "tentativas"
+    contar("respostas_degradadas", motivo=motivo)
+    log.error("OpenAI sem resposta depois de %d tentativa(s) (%s: %s)",
+              numero + 1, type(ultimo_erro).__name__, str(ultimo_erro)[:200])
+    raise IAIndisponivel(f"A IA não respondeu a tempo ({type(ultimo_erro).__name__}).") from ultimo_erro
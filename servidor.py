@@ -0,0 +1,147 @@
+"""
+Servidor HTTP com respostas em JSON (só biblioteca padrão).
+
+Um único processo mantém o índice aquecido e atende vários clientes
+(Gam.py, bot do Telegram, testes de carga), cada requisição numa thread.
+
+    GET  /status
+    GET  /metricas   (formato texto do Prometheus; também em /metrics)
+    GET  /buscar?pergunta=...&modo=palavras
+    POST /buscar     {"pergunta": "...", "modo": "hibrido"}
+    POST /perguntar  {"pergunta": "...", "modo": "palavras"}
+    POST /ingerir
+"""
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from busca import MODO_PADRAO
+from metricas import contar, medir, texto_prometheus
+
+log = logging.getLogger("gambot.servidor")
+
+# Tamanho máximo aceito no corpo de uma requisição
+MAX_CORPO = 64 * 1024
+
+ROTAS = ("/status", "/metricas", "/metrics", "/buscar", "/perguntar", "/ingerir")
+
+
+class ErroRequisicao(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class ManipuladorGambot(BaseHTTPRequestHandler):
+    """Traduz as rotas HTTP para os métodos do MotorGambot (self.server.motor)."""
+
+    server_version = "Gambot"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self._atender(url.path, parametros)
+
+    def do_POST(self):
+        try:
+            dados = self._ler_corpo()
+        except ErroRequisicao as e:
+            self._responder(e.status, {"erro": str(e)})
+            return
+        self._atender(urlparse(self.path).path, dados)
+
+    def _ler_corpo(self):
+        try:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ErroRequisicao(400, "Content-Length inválido")
+        if tamanho < 0:
+            raise ErroRequisicao(400, "Content-Length inválido")
+        if tamanho > MAX_CORPO:
+            raise ErroRequisicao(413, "Corpo da requisição muito grande")
+        if not tamanho:
+            return {}
+        try:
+            dados = json.loads(self.rfile.read(tamanho).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ErroRequisicao(400, "JSON inválido")
+        if not isinstance(dados, dict):
+            raise ErroRequisicao(400, "O corpo deve ser um objeto JSON")
+        return dados
+
+    def _atender(self, rota, dados):
+        # Rotas desconhecidas não viram rótulos novos nas métricas
+        with medir("requisicao_http", rota=rota if rota in ROTAS else "outra"):
+            self._despachar(rota, dados)
+
+    def _despachar(self, rota, dados):
+        motor = self.server.motor
+        try:
+            if rota == "/status":
+                self._responder(200, motor.status())
+            elif rota in ("/metricas", "/metrics"):
+                self._responder_texto(200, texto_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+            elif rota == "/ingerir" and self.command == "POST":
+                self._responder(200, motor.ingerir())
+            elif rota in ("/buscar", "/perguntar"):
+                if rota == "/perguntar" and self.command != "POST":
+                    raise ErroRequisicao(405, "Use POST em /perguntar")
+                pergunta = str(dados.get("pergunta", "")).strip()
+                modo = dados.get("modo", MODO_PADRAO)
+                if not pergunta:
+                    raise ErroRequisicao(400, "Informe a pergunta")
+                if not motor.pronto:
+                    raise ErroRequisicao(503, "Os documentos ainda estão sendo indexados")
+                try:
+                    if rota == "/buscar":
+                        busca = motor.buscar(pergunta, modo)
+                        self._responder(200, {"pergunta": pergunta, "versao": busca["versao"], "resultados": busca["resultados"]})
+                    else:
+                        resultado = motor.perguntar(pergunta, modo)
+                        # Degradado: sem resposta da IA, mas os trechos encontrados vão do mesmo jeito
+                        self._responder(502 if resultado["erro"] and not resultado["degradado"] else 200, resultado)
+                except ValueError as e:
+                    raise ErroRequisicao(400, str(e))
+            else:
+                raise ErroRequisicao(404, "Rota não encontrada")
+        except ErroRequisicao as e:
+            self._responder(e.status, {"erro": str(e)})
+        except Exception as e:
+            log.exception("Erro no servidor HTTP: %s: %s", type(e).__name__, e)
+            self._responder(500, {"erro": "Erro interno"})
+
+    def _responder(self, status, dados):
+        self._responder_texto(status, json.dumps(dados, ensure_ascii=False), "application/json; charset=utf-8")
+
+    def _responder_texto(self, status, texto, tipo):
+        corpo = texto.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+        rota = urlparse(self.path).path
+        contar("requisicoes_http", rota=rota if rota in ROTAS else "outra", status=status)
+
+    def log_message(self, formato, *args):
+        log.debug("HTTP %s - %s", self.address_string(), formato % args)
+
+
+def criar_servidor(motor, host="127.0.0.1", porta=8000):
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorGambot)
+    servidor.daemon_threads = True
+    servidor.motor = motor
+    return servidor
+
+
+def servir(motor, host="127.0.0.1", porta=8000):
+    """Atende requisições até ser interrompido (Ctrl+C)."""
+    servidor = criar_servidor(motor, host, porta)
+    print(f"Gambot servindo em http://{host}:{servidor.server_address[1]}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
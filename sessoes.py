@@ -0,0 +1,169 @@
+"""
+Memória das sessões do Streamlit.
+
+A sessão guarda só registros compactos dos resultados (versão do índice,
+id do trecho, arquivo, página, pontos e as posições dos destaques). O texto
+dos trechos fica uma única vez no processo, num armazém compartilhado por
+todas as sessões e limitado em bytes, e é resolvido na hora de exibir ou de
+montar o contexto da IA. Assim, centenas de alunos vendo o mesmo artigo do
+regulamento não guardam centenas de cópias dele.
+
+Cada sessão também registra quantos bytes o seu estado ocupa, para o
+relatório de memória do painel de administração.
+"""
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, namedtuple
+
+from busca import montar_trecho_visual
+
+# Limite do armazém de trechos (textos de todas as sessões juntas)
+LIMITE_ARMAZEM = int(float(os.environ.get("GAMBOT_MEMORIA_TRECHOS_MB", "64")) * 1024 * 1024)
+
+# Sessões sem rerun há mais tempo que isso saem do relatório (o Streamlit não avisa quando uma sessão acaba)
+SESSAO_INATIVA = 30 * 60
+
+# Aviso no lugar de um trecho que saiu do armazém e do índice atual
+TRECHO_INDISPONIVEL = "Trecho indisponível (os documentos foram reindexados); refaça a busca."
+
+# Resultado guardado na sessão: as marcações são os intervalos dos destaques, achatados (início, fim, início, fim...)
+RegistroResultado = namedtuple("RegistroResultado", "versao id_trecho arquivo pagina rotulo inicio pontos tipo marcacoes")
+
+
+def tamanho_profundo(objeto, vistos=None):
+    """Bytes ocupados pelo objeto e pelo que ele contém (dicts, listas, tuplas, conjuntos)."""
+    vistos = set() if vistos is None else vistos
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+    tamanho = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        tamanho += sum(tamanho_profundo(k, vistos) + tamanho_profundo(v, vistos) for k, v in objeto.items())
+    elif isinstance(objeto, (list, tuple, set, frozenset)):
+        tamanho += sum(tamanho_profundo(item, vistos) for item in objeto)
+    return tamanho
+
+
+class ArmazemTrechos:
+    """Textos dos trechos por (versão do índice, id do trecho), com limite de bytes (LRU)."""
+
+    def __init__(self, limite_bytes=LIMITE_ARMAZEM):
+        self.limite_bytes = limite_bytes
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self._textos = OrderedDict()
+        self._trava = threading.Lock()
+
+    def guardar(self, versao, id_trecho, texto):
+        chave = (versao, id_trecho)
+        with self._trava:
+            if chave in self._textos:
+                self._textos.move_to_end(chave)
+                return
+            self._textos[chave] = texto
+            self.bytes += sys.getsizeof(texto)
+            while self.bytes > self.limite_bytes and len(self._textos) > 1:
+                _, removido = self._textos.popitem(last=False)
+                self.bytes -= sys.getsizeof(removido)
+
+    def obter(self, versao, id_trecho):
+        chave = (versao, id_trecho)
+        with self._trava:
+            texto = self._textos.get(chave)
+            if texto is None:
+                self.falhas += 1
+                return None
+            self._textos.move_to_end(chave)
+            self.acertos += 1
+            return texto
+
+    def metricas(self):
+        with self._trava:
+            return {"trechos": len(self._textos), "bytes": self.bytes, "limite_bytes": self.limite_bytes,
+                    "acertos": self.acertos, "falhas": self.falhas}
+
+
+_armazem = None
+_sessoes = {}   # id da sessão -> {"bytes", "chaves", "visto_em"}
+_trava = threading.Lock()
+
+
+def obter_armazem():
+    """Retorna o armazém de trechos do processo, criando-o na primeira chamada."""
+    global _armazem
+    with _trava:
+        if _armazem is None:
+            _armazem = ArmazemTrechos()
+        return _armazem
+
+
+def compactar_resultados(resultados, versao):
+    """
+    Registros compactos dos resultados de buscar_inteligente para guardar na
+    sessão; os textos vão para o armazém compartilhado.
+    """
+    armazem = obter_armazem()
+    registros = []
+    for r in resultados:
+        armazem.guardar(versao, r["id_trecho"], r["texto_para_ia"])
+        registros.append(RegistroResultado(
+            versao, r["id_trecho"], r["arquivo"], r["pagina"], r["rotulo"], r["inicio"], r["pontos"], r["tipo"],
+            array("I", (posicao for intervalo in r.get("marcacoes", ()) for posicao in intervalo)),
+        ))
+    return registros
+
+
+def resolver_resultados(registros, indice=None):
+    """
+    Resultados completos (com "texto_para_ia" e o trecho visual em "contexto")
+    a partir dos registros da sessão: o texto vem do armazém ou, se já saiu
+    dele, do índice atual quando ainda é a mesma versão. "disponivel" é False
+    quando nenhum dos dois tem mais o trecho.
+    """
+    armazem = obter_armazem()
+    resultados = []
+    for registro in registros:
+        texto = armazem.obter(registro.versao, registro.id_trecho)
+        if texto is None and indice is not None and indice.versao == registro.versao:
+            texto = indice.fragmentos[registro.id_trecho]["texto"]
+            armazem.guardar(registro.versao, registro.id_trecho, texto)
+        if texto is None:
+            contexto = f"<i>{TRECHO_INDISPONIVEL}</i>"
+        else:
+            marcacoes = registro.marcacoes
+            contexto = montar_trecho_visual(texto, list(zip(marcacoes[::2], marcacoes[1::2])))
+        resultados.append(dict(registro._asdict(), texto_para_ia=texto or "", contexto=contexto, disponivel=texto is not None))
+    return resultados
+
+
+def registrar_sessao(id_sessao, estado):
+    """Guarda quantos bytes o estado da sessão ocupa (e as chaves que mais pesam)."""
+    por_chave = {}
+    vistos = set()
+    for chave, valor in estado.items():
+        por_chave[str(chave)] = tamanho_profundo(valor, vistos)
+    agora = time.time()
+    with _trava:
+        _sessoes[id_sessao] = {
+            "bytes": sum(por_chave.values()),
+            "chaves": sorted(por_chave.items(), key=lambda item: item[1], reverse=True)[:3],
+            "visto_em": agora,
+        }
+        for antiga in [s for s, info in _sessoes.items() if agora - info["visto_em"] > SESSAO_INATIVA]:
+            del _sessoes[antiga]
+
+
+def relatorio_memoria():
+    """{"sessoes": [{"sessao", "bytes", "chaves", "segundos_parada"}], "total_sessoes", "armazem"}."""
+    agora = time.time()
+    with _trava:
+        sessoes = [
+            {"sessao": s, "bytes": info["bytes"], "chaves": info["chaves"], "segundos_parada": agora - info["visto_em"]}
+            for s, info in _sessoes.items()
+        ]
+    sessoes.sort(key=lambda s: s["bytes"], reverse=True)
+    return {"sessoes": sessoes, "total_sessoes": sum(s["bytes"] for s in sessoes), "armazem": obter_armazem().metricas()}
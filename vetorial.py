@@ -0,0 +1,143 @@
+"""
+Busca vetorial local (sem rede e sem download de modelos).
+
+Cada trecho vira um vetor TF-IDF esparso no espaço de "hashing" (palavras,
+pares de palavras e pedaços de 4 letras, para aproximar variações como
+'trancar'/'trancamento'). Os vetores ficam numa matriz CSR em arrays do
+NumPy e uma consulta é um único produto matriz-vetor seguido de
+argpartition para pegar os k melhores.
+"""
+import weakref
+import zlib
+
+import numpy as np
+
+from indice import tokenizar
+from ingestao import normalizar_texto
+
+# Tamanho do espaço de hashing (potência de 2)
+DIMENSAO = 1 << 18
+TAMANHO_NGRAMA = 4
+
+# Constante da fusão por posição (Reciprocal Rank Fusion) do modo híbrido
+RRF_K = 60
+
+# Frequências por segmento (documento), reaproveitadas entre reindexações
+_tf_por_segmento = weakref.WeakKeyDictionary()
+
+
+def _hash(caracteristica):
+    # hash() do Python muda entre processos; o CRC32 é estável
+    return zlib.crc32(caracteristica.encode("utf-8")) & (DIMENSAO - 1)
+
+
+def caracteristicas(texto_norm):
+    """Palavras, pares de palavras e n-gramas de letras de um texto já normalizado."""
+    palavras = tokenizar(texto_norm)
+    itens = list(palavras)
+    itens.extend(f"{a} {b}" for a, b in zip(palavras, palavras[1:]))
+    for palavra in palavras:
+        if len(palavra) > TAMANHO_NGRAMA:
+            marcada = f"_{palavra}_"
+            itens.extend(marcada[i:i + TAMANHO_NGRAMA] for i in range(len(marcada) - TAMANHO_NGRAMA + 1))
+    return itens
+
+
+def _contar(texto_norm, cache_hash):
+    """Retorna (colunas, frequências) com tf sublinear (1 + log tf)."""
+    contagem = {}
+    for item in caracteristicas(texto_norm):
+        coluna = cache_hash.get(item)
+        if coluna is None:
+            coluna = cache_hash[item] = _hash(item)
+        contagem[coluna] = contagem.get(coluna, 0) + 1
+    colunas = np.fromiter(contagem.keys(), dtype=np.int32, count=len(contagem))
+    valores = 1.0 + np.log(np.fromiter(contagem.values(), dtype=np.float32, count=len(contagem)))
+    return colunas, valores
+
+
+def _tf_segmento(segmento, cache_hash):
+    """Matriz CSR de frequências dos trechos de um documento (calculada uma vez por segmento)."""
+    tf = _tf_por_segmento.get(segmento)
+    if tf is None:
+        linhas = [_contar(f["texto_norm"], cache_hash) for f in segmento.fragmentos]
+        ponteiros = np.zeros(len(linhas) + 1, dtype=np.int64)
+        ponteiros[1:] = np.cumsum([len(c) for c, _ in linhas])
+        colunas = np.concatenate([c for c, _ in linhas]) if linhas else np.zeros(0, dtype=np.int32)
+        valores = np.concatenate([v for _, v in linhas]) if linhas else np.zeros(0, dtype=np.float32)
+        tf = (ponteiros, colunas, valores)
+        _tf_por_segmento[segmento] = tf
+    return tf
+
+
+class IndiceVetorial:
+    """Matriz TF-IDF (CSR) alinhada com os ids de trecho do índice invertido."""
+
+    def __init__(self, indice):
+        cache_hash = {}
+        # Mesma ordem em que o índice invertido concatenou os documentos
+        partes = [_tf_segmento(segmento, cache_hash) for segmento in indice.segmentos_em_ordem]
+
+        ponteiros = [np.zeros(1, dtype=np.int64)]
+        deslocamento = 0
+        for p, _, _ in partes:
+            ponteiros.append(p[1:] + deslocamento)
+            deslocamento += int(p[-1])
+        self.ponteiros = np.concatenate(ponteiros)
+        self.colunas = np.concatenate([c for _, c, _ in partes]) if partes else np.zeros(0, dtype=np.int32)
+        valores = np.concatenate([v for _, _, v in partes]) if partes else np.zeros(0, dtype=np.float32)
+        self.total = len(self.ponteiros) - 1
+        assert self.total == indice.total_fragmentos
+
+        # Linha de cada valor não nulo (para o produto matriz-vetor com bincount)
+        self.linhas = np.repeat(np.arange(self.total, dtype=np.int32), np.diff(self.ponteiros))
+
+        # idf suavizado e normalização L2 das linhas
+        df = np.bincount(self.colunas, minlength=DIMENSAO).astype(np.float32)
+        self.idf = np.log((1.0 + self.total) / (1.0 + df)) + 1.0
+        valores = valores * self.idf[self.colunas]
+        normas = np.sqrt(np.bincount(self.linhas, weights=valores * valores, minlength=self.total))
+        normas[normas == 0] = 1.0
+        self.valores = (valores / normas[self.linhas]).astype(np.float32)
+
+    @classmethod
+    def de_arrays(cls, ponteiros, colunas, valores, linhas, idf):
+        """Recria o índice a partir de arrays já calculados (ex.: lidos do índice em disco)."""
+        vetorial = cls.__new__(cls)
+        vetorial.ponteiros, vetorial.colunas, vetorial.valores = ponteiros, colunas, valores
+        vetorial.linhas, vetorial.idf = linhas, idf
+        vetorial.total = len(ponteiros) - 1
+        return vetorial
+
+    def vetor_consulta(self, texto):
+        """Vetor denso (DIMENSAO) da consulta, com idf e norma L2."""
+        consulta = np.zeros(DIMENSAO, dtype=np.float32)
+        colunas, valores = _contar(normalizar_texto(texto), {})
+        if len(colunas):
+            consulta[colunas] = valores * self.idf[colunas]
+            norma = np.linalg.norm(consulta[colunas])
+            if norma:
+                consulta[colunas] /= norma
+        return consulta
+
+    def buscar(self, texto, limite=10):
+        """Retorna [(id do trecho, similaridade do cosseno)] em ordem decrescente."""
+        if not self.total:
+            return []
+        consulta = self.vetor_consulta(texto)
+        # Produto matriz-vetor esparso: soma valor * consulta[coluna] por linha
+        pontos = np.bincount(self.linhas, weights=self.valores * consulta[self.colunas], minlength=self.total)
+
+        k = min(limite, self.total)
+        melhores = np.argpartition(-pontos, k - 1)[:k]
+        melhores = melhores[np.argsort(-pontos[melhores])]
+        return [(int(i), float(pontos[i])) for i in melhores if pontos[i] > 0]
+
+
+def fundir_rankings(*rankings, limite=10):
+    """Combina listas [(id, pontos)] pela posição de cada id (Reciprocal Rank Fusion)."""
+    pontos = {}
+    for ranking in rankings:
+        for posicao, (id_trecho, _) in enumerate(ranking):
+            pontos[id_trecho] = pontos.get(id_trecho, 0.0) + 1.0 / (RRF_K + posicao + 1)
+    return sorted(pontos.items(), key=lambda item: item[1], reverse=True)[:limite]